@@ -0,0 +1,108 @@
+"""Benchmark the isotope ratio and uncertainty filters on a large database.
+
+A synthetic database with 10^6 grains is created that contains the columns of
+the carbon isotope ratio in the database format. The vectorized filters are
+compared to the previous implementation, which evaluated a Python expression for
+every value.
+
+Run with: `python benchmarks/bench_filters.py [number_of_grains]`
+"""
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from pgdtools import PresolarGrains
+
+RATIO = ("12C", "13C")
+VALUE = 50.0
+
+
+def synthetic_database(number_of_grains: int, seed: int = 42) -> pd.DataFrame:
+    """Create a synthetic database with carbon isotope ratios.
+
+    About 10% of the ratios are missing, half of the remaining ones have
+    symmetric, the other half asymmetric uncertainties.
+
+    :param number_of_grains: Number of grains in the synthetic database.
+    :param seed: Seed for the random number generator.
+
+    :return: Synthetic database.
+    """
+    rng = np.random.default_rng(seed)
+    ratio = rng.lognormal(np.log(50), 0.8, number_of_grains)
+    ratio[rng.random(number_of_grains) < 0.1] = np.nan
+    err = ratio * rng.uniform(0.005, 0.05, number_of_grains)
+    asym = rng.random(number_of_grains) < 0.5
+
+    df = pd.DataFrame(
+        {
+            "PGD Type": rng.choice(["M", "X", "Y", "Z", "AB"], number_of_grains),
+            "12C/13C": ratio,
+            "err[12C/13C]": np.where(asym, np.nan, err),
+            "err+[12C/13C]": np.where(asym, err * 1.1, np.nan),
+            "err-[12C/13C]": np.where(asym, err * 0.9, np.nan),
+        },
+        index=pd.Index(
+            [f"SiC-2000-SYN-{it:07d}" for it in range(number_of_grains)],
+            name="PGD ID",
+        ),
+    )
+    return df
+
+
+def filter_ratio_eval(pgd: PresolarGrains, cmp: str, value: float) -> None:
+    """Previous implementation of the ratio filter, evaluates every value."""
+    hdr = pgd._header(*RATIO).ratio[0]
+    pgd.db.dropna(subset=[hdr], inplace=True)
+    pgd.db = pgd.db[pgd.db[hdr].apply(lambda x: eval(f"x {cmp} {value}"))]
+
+
+def filter_uncertainty_eval(pgd: PresolarGrains, cmp: str, value: float) -> None:
+    """Previous implementation of the uncertainty filter, evaluates every value."""
+    hdrs = [hdr for hdr in pgd._header(*RATIO).uncertainty if hdr is not None]
+    pgd.db.dropna(subset=hdrs, how="all", inplace=True)
+    number_of_values = (~pgd.db[hdrs].isna()).sum(axis=1)
+    pgd.db = pgd.db[
+        pgd.db[hdrs].apply(lambda x: eval(f"x {cmp} {value}")).sum(axis=1)
+        == number_of_values
+    ]
+
+
+def time_filter(pgd: PresolarGrains, func, *args) -> float:
+    """Reset the database, apply a filter, and return the time in seconds."""
+    pgd.reset()
+    t0 = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - t0
+
+
+def main(number_of_grains: int = 10**6) -> None:
+    """Run the benchmark and print the results.
+
+    :param number_of_grains: Number of grains in the synthetic database.
+    """
+    pgd = PresolarGrains(synthetic_database(number_of_grains))
+    print(f"Synthetic database: {len(pgd)} grains")
+
+    cases = {
+        "ratio": (filter_ratio_eval, pgd.filter.ratio, (RATIO, "<", VALUE)),
+        "uncertainty": (
+            filter_uncertainty_eval,
+            pgd.filter.uncertainty,
+            (RATIO, "<", 1.0),
+        ),
+    }
+    for name, (func_eval, func, args) in cases.items():
+        t_eval = time_filter(pgd, func_eval, pgd, *args[1:])
+        t_vec = time_filter(pgd, func, *args)
+        print(
+            f"{name:12s} eval: {t_eval:8.3f} s, vectorized: {t_vec:8.3f} s, "
+            f"speedup: {t_eval / t_vec:8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10**6)
@@ -0,0 +1,52 @@
+"""Benchmark the time it takes to import `pgdtools`.
+
+Every measurement runs in a fresh Python interpreter. The import of the package is
+compared to importing it and accessing the database, which loads pandas and reads
+the database files.
+
+Run with: `python benchmarks/bench_import.py [repeats]`
+"""
+
+import statistics
+import subprocess
+import sys
+
+STATEMENTS = {
+    "import pgdtools": "import pgdtools",
+    "import pgdtools; len(pgdtools.pgd)": "import pgdtools; len(pgdtools.pgd)",
+}
+
+
+def time_statement(statement: str, repeats: int) -> float:
+    """Run a statement in fresh interpreters and return the median time in ms.
+
+    :param statement: Python statement to time.
+    :param repeats: Number of fresh interpreters to run the statement in.
+
+    :return: Median time in milliseconds.
+    """
+    code = (
+        "import time; t0 = time.perf_counter(); "
+        f"{statement}; "
+        "print((time.perf_counter() - t0) * 1e3)"
+    )
+    times = []
+    for _ in range(repeats):
+        ret = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+        times.append(float(ret.stdout.strip().splitlines()[-1]))
+    return statistics.median(times)
+
+
+def main(repeats: int = 5) -> None:
+    """Run the benchmark and print the results.
+
+    :param repeats: Number of repetitions per statement.
+    """
+    for name, statement in STATEMENTS.items():
+        print(f"{name:40s} {time_statement(statement, repeats):10.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
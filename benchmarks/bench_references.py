@@ -0,0 +1,58 @@
+"""Benchmark repeated access to the references of the database.
+
+Every access to `pgd.reference` creates a new `References` instance. Before the
+configuration registry was introduced, every instance parsed `references.json`
+again. This behavior is reproduced by clearing the registry before every access
+and compared to the cached access.
+
+Run with: `python benchmarks/bench_references.py [repeats]`
+"""
+
+import sys
+import time
+from typing import Callable
+
+from pgdtools import pgd
+from pgdtools.db import registry
+
+
+# statements to time
+ACCESSES = {
+    "pgd.reference": lambda: pgd.reference,
+    "pgd.reference.dict": lambda: pgd.reference.dict,
+}
+
+
+def time_access(access: Callable, repeats: int, clear: bool) -> float:
+    """Time repeated access to the references and return the mean in ms.
+
+    :param access: Function that accesses the references.
+    :param repeats: Number of accesses.
+    :param clear: Clear the registry before every access, i.e., parse the file.
+
+    :return: Mean time per access in milliseconds.
+    """
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        if clear:
+            registry.clear()
+        access()
+    return (time.perf_counter() - t0) / repeats * 1e3
+
+
+def main(repeats: int = 100) -> None:
+    """Run the benchmark and print the results.
+
+    :param repeats: Number of accesses per measurement.
+    """
+    _ = pgd.reference.dict  # load the database
+
+    print(f"{'':20s} {'parse every time':>18s} {'cached':>12s}")
+    for name, access in ACCESSES.items():
+        parse = time_access(access, repeats, clear=True)
+        cached = time_access(access, repeats, clear=False)
+        print(f"{name:20s} {parse:15.3f} ms {cached:9.3f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -1,14 +1,116 @@
-"""Package to interact with the presolar grain database."""
+"""Package to interact with the presolar grain database.
 
-from . import data, db, maintainer
-from .classify import classify_sic_grain
-from .pgdtools import PresolarGrains
+Importing the package is cheap: Submodules that depend on heavy packages (pandas,
+scipy, requests) are only imported when they are first used, and the module level
+`pgd` instance only loads the database when it is first accessed.
+"""
 
-pgd = PresolarGrains()
+import importlib
+from typing import TYPE_CHECKING
+
+from . import data
+
+if TYPE_CHECKING:  # pragma: no cover
+    from . import db, maintainer
+    from .classify import classify_sic_grain, classify_sic_grains
+    from .pgdtools import PresolarGrains
+
+# attributes that are imported on first access: name -> module
+_LAZY_ATTRIBUTES = {
+    "PresolarGrains": "pgdtools.pgdtools",
+    "classify_sic_grain": "pgdtools.classify",
+    "classify_sic_grains": "pgdtools.classify",
+    "db": "pgdtools.db",
+    "maintainer": "pgdtools.maintainer",
+}
+
+
+def __getattr__(name: str):
+    """Import lazy attributes of the package on first access.
+
+    :param name: Name of the attribute.
+
+    :return: The attribute.
+
+    :raises AttributeError: Attribute does not exist.
+    """
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    module = importlib.import_module(_LAZY_ATTRIBUTES[name])
+    value = module if module.__name__ == f"{__name__}.{name}" else getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """Return all attributes of the package, including the lazy ones."""
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
+
+class _PresolarGrainsProxy:
+    """Proxy for a `PresolarGrains` instance that is created on first access.
+
+    All attribute access, item access, and dunder methods are forwarded to the
+    `PresolarGrains` instance, which is only created (and the database loaded) when
+    the proxy is first used.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the proxy without loading anything."""
+        object.__setattr__(self, "_instance", None)
+
+    @property
+    def __class__(self):
+        """Pretend to be a `PresolarGrains` instance, e.g., for `isinstance`."""
+        return __getattr__("PresolarGrains")
+
+    def __getattr__(self, name: str):
+        """Forward attribute access to the instance."""
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name: str, value) -> None:
+        """Forward attribute setting to the instance."""
+        setattr(self._load(), name, value)
+
+    def __dir__(self):
+        """Return the attributes of the instance."""
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        """Return the string representation of the instance."""
+        return repr(self._load())
+
+    def __eq__(self, other) -> bool:
+        """Check if the databases are equal."""
+        return self._load() == other
+
+    def __len__(self) -> int:
+        """Return the number of grains in the current, filtered database."""
+        return len(self._load())
+
+    def __iter__(self):
+        """Iterate over (index, row) for all entries the filtered database."""
+        return iter(self._load())
+
+    def _load(self) -> "PresolarGrains":
+        """Create the `PresolarGrains` instance if necessary and return it.
+
+        :return: The `PresolarGrains` instance.
+        """
+        instance = object.__getattribute__(self, "_instance")
+        if instance is None:
+            instance = __getattr__("PresolarGrains")()
+            object.__setattr__(self, "_instance", instance)
+        return instance
+
+
+pgd = _PresolarGrainsProxy()
 
 __all__ = [
     "PresolarGrains",
     "classify_sic_grain",
+    "classify_sic_grains",
     "data",
     "db",
     "pgd",
@@ -5,6 +5,9 @@ from typing import Dict, Tuple, Union
 import numpy as np
 from scipy.special import erf
 
+# order of grain types, also the order of the columns in the probability matrix
+SIC_GRAIN_TYPES = ("M", "AB", "Y", "Z", "X", "C", "N", "D")
+
 
 def classify_sic_grain(
     c12_c13: Tuple[float, Union[float, Tuple[float, float]]] = None,
@@ -42,7 +45,7 @@ def classify_sic_grain(
     :return: Tuple of grain type and subtype or dictionary of probabilities.
     """
     # todo some checking of input data
-    types = ["M", "AB", "Y", "Z", "X", "C", "N", "D"]
+    types = list(SIC_GRAIN_TYPES)
     probabilities = np.zeros(len(types))
 
     if c12_c13 is None and n14_n15 is None and d29si is None and d30si is None:
@@ -91,6 +94,99 @@ def classify_sic_grain(
         return dict(zip(types, probabilities))
 
 
+def classify_sic_grains(
+    c12_c13=None,
+    n14_n15=None,
+    d29si=None,
+    d30si=None,
+    al26_al27=None,
+    rho_si=0,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Classify many measured grains at once according to the classification scheme.
+
+    This is the vectorized version of `classify_sic_grain`: All computations are done
+    on NumPy arrays for all grains at once and give exactly the same results as
+    classifying each grain individually.
+
+    Measurements are given in the same way as for `classify_sic_grain`, however,
+    values and uncertainties are array-like objects (e.g., NumPy arrays or pandas
+    Series) with one entry per grain: `(values, uncertainties)` or, for asymmetric
+    uncertainties, `(values, (uncertainties_plus, uncertainties_minus))`.
+    Asymmetric uncertainties can also be given as an array or `DataFrame` with two
+    columns, e.g., as returned by `pgd.data.ratio_xy`.
+    If only values are given (not as a tuple), no uncertainties are assumed.
+    Asymmetric uncertainties are only supported for C and N, as in the single
+    grain classification.
+
+    Grains for which a value is ``np.nan`` are treated as not measured for the given
+    isotope ratio, i.e., the same as passing ``None`` to `classify_sic_grain`.
+    Missing uncertainties are replaced in the same way as for a single grain.
+
+    :param c12_c13: Carbon 12/13 isotopic ratios and uncertainties.
+    :param n14_n15: Nitrogen 14/15 isotopic ratios and uncertainties.
+    :param d29si: Silicon 29/28 isotopic ratios as delta values in permil and
+        uncertainties.
+    :param d30si: Silicon 30/28 isotopic ratios as delta values in permil and
+        uncertainties.
+    :param al26_al27: Aluminium 26/27 isotopic ratios and uncertainties.
+    :param rho_si: Silicon correlation coefficients between d30Si and d29Si. Either
+        one value for all grains or one value per grain. ``np.nan`` is treated as 0.
+
+    :return: Tuple of three arrays: Grain types, subtypes (``None`` if no subtype),
+        and a probability matrix of shape (number of grains, 8). The columns of the
+        probability matrix are ordered as in `SIC_GRAIN_TYPES`.
+
+    :raises ValueError: No measurements are given or the lengths of the arrays
+        are not consistent.
+    """
+    msrs = [
+        msr for msr in (c12_c13, n14_n15, d29si, d30si, al26_al27) if msr is not None
+    ]
+    if not msrs:
+        raise ValueError("At least one measurement must be given.")
+
+    n_grains = np.broadcast(
+        *[np.asarray(msr[0] if isinstance(msr, tuple) else msr) for msr in msrs]
+    ).size
+
+    c12_c13 = _replace_errors_array(c12_c13, n_grains)
+    n14_n15 = _replace_errors_array(n14_n15, n_grains)
+    d29si = _replace_errors_array(d29si, n_grains, asymmetric=False)
+    d30si = _replace_errors_array(d30si, n_grains, asymmetric=False)
+    al26_al27 = _replace_errors_array(al26_al27, n_grains, asymmetric=False)
+
+    rho_si = np.nan_to_num(np.broadcast_to(np.asarray(rho_si, dtype=float), n_grains))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prob_al = _aluminium_probabilities_array(al26_al27)
+        prob_c = _carbon_probabilities_array(c12_c13)
+        prob_n = _nitrogen_probabilities_array(n14_n15)
+        prob_si = _silicon_probabilities_array(d29si, d30si, rho_si)
+
+        probabilities = np.column_stack(
+            [
+                prob_al[gtype] * prob_c[gtype] * prob_n[gtype] * prob_si[gtype]
+                for gtype in SIC_GRAIN_TYPES
+            ]
+        )
+
+    # unclassified grains: no C, N, or Si information available
+    no_data = ~(c12_c13[3] | n14_n15[3] | d29si[3] | d30si[3])
+    probabilities[no_data] = 0
+
+    probabilities = np.round(probabilities, 3)  # round to three significant digits
+    # find maximum probability by sorting from lowest to highest, row by row.
+    # preference given by numpy to first element in case of equal probabilities
+    index_max = np.argsort(1 - probabilities, axis=1)[:, 0]
+
+    gtypes = np.array(SIC_GRAIN_TYPES, dtype=object)[index_max]
+    gtypes[probabilities[np.arange(n_grains), index_max] < 0.01] = "U"
+
+    subtypes = _find_subtype_array(gtypes, c12_c13, n14_n15, d29si, d30si)
+
+    return gtypes, subtypes, probabilities
+
+
 def _aluminium_probabilities(msr: Tuple[float, float] = None) -> Dict[str, float]:
     """Calculate probabilities for aluminium isotopic data.
 
@@ -120,6 +216,29 @@ def _aluminium_probabilities(msr: Tuple[float, float] = None) -> Dict[str, float
     return prob_dict
 
 
+def _aluminium_probabilities_array(
+    msr: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+) -> Dict[str, np.ndarray]:
+    """Calculate probabilities for aluminium isotopic data of many grains.
+
+    :param msr: Aluminium 26/27 isotopic ratios as returned by `_replace_errors_array`.
+
+    :return: Dictionary of probability arrays for each grain type.
+    """
+    avail = msr[3]
+    prob_dict = {key: np.ones(avail.size) for key in SIC_GRAIN_TYPES}
+
+    prob_m = np.where(avail, _probability_value_array(msr, 0.02), 1)
+    prob_x = np.where(avail, 0.05 + 0.95 * (1 - _probability_value_array(msr, 0.01)), 1)
+
+    for key in ("M", "Y", "Z"):
+        prob_dict[key] = prob_m
+    for key in ("X", "C", "D", "N"):
+        prob_dict[key] = prob_x
+
+    return prob_dict
+
+
 def _carbon_probabilities(
     msr: Tuple[float, Union[float, Tuple[float, float]]] = None,
 ) -> Dict[str, float]:
@@ -143,6 +262,33 @@ def _carbon_probabilities(
     return prob_dict
 
 
+def _carbon_probabilities_array(
+    msr: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+) -> Dict[str, np.ndarray]:
+    """Calculate probabilities for carbon isotopic data of many grains.
+
+    :param msr: Carbon 12/13 isotopic ratios as returned by `_replace_errors_array`.
+
+    :return: Dictionary of probability arrays for each grain type.
+    """
+    avail = msr[3]
+    prob_dict = {key: np.ones(avail.size) for key in SIC_GRAIN_TYPES}
+
+    prob_m = _probability_value_array(msr, 100) - _probability_value_array(msr, 13.5)
+    prob_y = 1 - _probability_value_array(msr, 100)
+    prob_ab = 0.8 * _probability_value_array(msr, 13.5) + 0.2 * (
+        _probability_value_array(msr, 25)
+    )
+
+    prob_dict["M"] = np.where(avail, prob_m, 1)
+    prob_dict["Z"] = prob_dict["M"]
+    prob_dict["Y"] = np.where(avail, prob_y, 0)
+    prob_dict["AB"] = np.where(avail, prob_ab, 0)
+    prob_dict["N"] = prob_dict["AB"]
+
+    return prob_dict
+
+
 def _find_subtype(
     type: str,
     c12_c13: Tuple[float, Union[float, Tuple[float, float]]],
@@ -213,6 +359,60 @@ def _find_subtype(
             return "C2"
 
 
+def _find_subtype_array(
+    gtypes: np.ndarray,
+    c12_c13: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+    n14_n15: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+    d29si: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+    d30si: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+) -> np.ndarray:
+    """Find subtypes for types X, AB or C for many grains.
+
+    :param gtypes: Main grain types.
+    :param c12_c13: Carbon 12/13 isotopic ratios as returned by
+        `_replace_errors_array`.
+    :param n14_n15: Nitrogen 14/15 isotopic ratios as returned by
+        `_replace_errors_array`.
+    :param d29si: Silicon 29/28 isotopic ratios as returned by `_replace_errors_array`.
+    :param d30si: Silicon 30/28 isotopic ratios as returned by `_replace_errors_array`.
+
+    :return: Subtypes, ``None`` where no subtype is assigned.
+    """
+    subtypes = np.full(gtypes.size, None, dtype=object)
+
+    # X grains
+    is_x = (gtypes == "X") & d29si[3] & d30si[3]
+    x0 = d29si[0] > 30 + (2 / 3 - 0.05) * d30si[0]
+    x2 = d29si[0] < -30 + (2 / 3 + 0.05) * d30si[0]
+    subtypes[is_x] = "X1"
+    subtypes[is_x & x2 & ~x0] = "X2"
+    subtypes[is_x & x0] = "X0"
+
+    # AB grains
+    is_ab = (gtypes == "AB") & c12_c13[3] & n14_n15[3]
+    prob_c = _probability_value_array(c12_c13, 4.5)
+    prob_ab1 = prob_c * _probability_value_array(n14_n15, 441)
+    prob_ab2 = (1 - prob_c) * (1 - _probability_value_array(n14_n15, 272))
+    ab1 = (
+        (prob_ab1 > prob_ab2)
+        & (c12_c13[0] - c12_c13[2] <= 4.5)
+        & (n14_n15[0] - n14_n15[2] <= 441)
+    )
+    ab2 = (
+        (prob_ab1 <= prob_ab2)
+        & (c12_c13[0] + c12_c13[1] >= 4.5)
+        & (n14_n15[0] + n14_n15[1] >= 272)
+    )
+    subtypes[is_ab & ab2] = "AB2"
+    subtypes[is_ab & ab1] = "AB1"
+
+    # C grains
+    is_c = (gtypes == "C") & c12_c13[3]
+    subtypes[is_c] = np.where(c12_c13[0][is_c] >= 10, "C1", "C2")
+
+    return subtypes
+
+
 def _nitrogen_probabilities(
     msr: Tuple[float, Union[float, Tuple[float, float]]] = None,
 ) -> Dict[str, float]:
@@ -236,6 +436,29 @@ def _nitrogen_probabilities(
     return prob_dict
 
 
+def _nitrogen_probabilities_array(
+    msr: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+) -> Dict[str, np.ndarray]:
+    """Calculate probabilities for nitrogen isotopic data of many grains.
+
+    :param msr: Nitrogen 14/15 isotopic ratios as returned by `_replace_errors_array`.
+
+    :return: Dictionary of probability arrays for each grain type.
+    """
+    avail = msr[3]
+    prob_dict = {key: np.ones(avail.size) for key in SIC_GRAIN_TYPES}
+
+    prob_m = np.where(avail, 1 - _probability_value_array(msr, 200), 1)
+    prob_x = np.where(avail, _probability_value_array(msr, 441), 1)
+
+    for key in ("M", "Y", "Z"):
+        prob_dict[key] = prob_m
+    for key in ("X", "C", "D", "N"):
+        prob_dict[key] = prob_x
+
+    return prob_dict
+
+
 def _probability_chi(chi: float) -> float:
     """Calculate the probability for a given chi value.
 
@@ -274,6 +497,31 @@ def _probability_slope(
     return _probability_chi(chi)
 
 
+def _probability_slope_array(
+    xval: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+    yval: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+    comp: Tuple[float, float],
+    rhoxy: np.ndarray,
+) -> np.ndarray:
+    """Calculate the probabilities for many grains when compared to a line.
+
+    :param xval: X values as returned by `_replace_errors_array` (e.g., d30Si).
+    :param yval: Y values as returned by `_replace_errors_array` (e.g., d29Si).
+    :param comp: Intercept and slope for the given line to compare with.
+    :param rhoxy: Correlation coefficients between x and y.
+
+    :return: Probabilities of measurements in comparison with given line
+    """
+    a, b = comp
+    x, xunc = xval[:2]
+    y, yunc = yval[:2]
+
+    chi = -(y - b * x - a) / np.sqrt(
+        yunc**2 + b**2 * xunc**2 - 2 * b * xunc * yunc * rhoxy
+    )
+    return _probability_chi(chi)
+
+
 def _silicon_probabilities(
     msr_d29si: Tuple[float, Union[float, Tuple[float, float]]] = None,
     msr_d30si: Tuple[float, Union[float, Tuple[float, float]]] = None,
@@ -400,6 +648,85 @@ def _silicon_probabilities(
     return prob_dict
 
 
+def _silicon_probabilities_array(
+    msr_d29si: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+    msr_d30si: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+    rho: np.ndarray,
+) -> Dict[str, np.ndarray]:
+    """Calculate probabilities for silicon isotopic data of many grains.
+
+    The probabilities for grains with both, only d29Si, or only d30Si values are
+    calculated for all grains and then selected according to the available data.
+
+    :param msr_d29si: Silicon 29/28 isotopic ratios as delta values (permil),
+        as returned by `_replace_errors_array`.
+    :param msr_d30si: Silicon 30/28 isotopic ratios as delta values (permil),
+        as returned by `_replace_errors_array`.
+    :param rho: Correlation coefficients between d30Si and d29Si.
+
+    :return: Dictionary of probability arrays for each grain type.
+    """
+    # define parameters for the lines in silicon 3 isotope plot
+    pm0 = (-19, 1.342)
+    pm1 = (-19 + 250 * 1.342, 1.342)
+    pm2 = (-19 - 100 * 1.342, 1.342)
+    pm3 = (-19 + 200 * (1.342 + 1 / 1.342), -1 / 1.342)
+    pm4 = (-19 - 75 * (1.342 + 1 / 1.342), -1 / 1.342)
+
+    def slope(comp):
+        return _probability_slope_array(msr_d30si, msr_d29si, comp, rho)
+
+    def value_29(comp):
+        return _probability_value_array(msr_d29si, comp)
+
+    def value_30(comp):
+        return _probability_value_array(msr_d30si, comp)
+
+    both = msr_d29si[3] & msr_d30si[3]
+    only_29 = msr_d29si[3] & ~msr_d30si[3]
+    only_30 = ~msr_d29si[3] & msr_d30si[3]
+
+    prob_both = {}
+    prob_both["M"] = (slope(pm1) - slope(pm2)) * (slope(pm3) - slope(pm4))
+    prob_both["AB"] = prob_both["M"]
+    prob_both["X"] = value_29(0) * value_30(0) * (0.2 + 0.8 * slope(pm4))
+    prob_both["Y"] = (
+        slope(pm1)
+        * (1 - (1 - slope(pm3)) * (1 - value_29(200)))
+        * (1 - slope(pm4) * value_30(0))
+        * (1 - value_29(-200))
+    )
+    prob_both["Z"] = slope(pm2) * (value_29(200) - value_29(-200)) * (1 - value_30(0))
+    prob_both["C"] = (1 - value_29(200)) * (1 - value_30(200)) * (1 - slope(pm3))
+    prob_both["D"] = (
+        (1 - value_29(0)) * value_30(200) * (1 - 0.8 * slope(pm1) - 0.2 * slope(pm0))
+    )
+    prob_both["N"] = slope(pm2) * value_29(200) * (1 - value_30(0))
+
+    prob_29 = dict.fromkeys(SIC_GRAIN_TYPES, 0)
+    prob_29["M"] = value_29(200) - value_29(-120)
+    prob_29["AB"] = prob_29["M"]
+    prob_29["X"] = value_29(-120)
+    prob_29["Y"] = value_29(200) - value_29(-200)
+
+    prob_30 = dict.fromkeys(SIC_GRAIN_TYPES, 0)
+    prob_30["M"] = value_30(200) - value_30(-100)
+    prob_30["AB"] = prob_30["M"]
+    prob_30["X"] = value_30(-100)
+    prob_30["Y"] = 1 - value_30(-100)
+
+    prob_none = {"M": 1, "AB": 1, "Y": 1, "Z": 0, "X": 0.2, "N": 0, "C": 0, "D": 0}
+
+    return {
+        key: np.select(
+            [both, only_29, only_30],
+            [prob_both[key], prob_29[key], prob_30[key]],
+            default=prob_none[key],
+        )
+        for key in SIC_GRAIN_TYPES
+    }
+
+
 def _probability_value(
     msr: Tuple[float, Union[float, Tuple[float, float]]], comp: float
 ) -> float:
@@ -425,6 +752,22 @@ def _probability_value(
     return _probability_chi(chi)
 
 
+def _probability_value_array(
+    msr: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray], comp: float
+) -> np.ndarray:
+    """Calculate the probabilities `p(msr < comp)` for many grains.
+
+    :param msr: Measurements as returned by `_replace_errors_array`.
+    :param comp: Comparison value.
+
+    :return: Probabilities of measurements in comparison to comparison value.
+    """
+    mu, sigma_plus, sigma_minus, _ = msr
+    sigma = np.where(mu < comp, sigma_plus, sigma_minus)
+    chi = (comp - mu) / sigma
+    return _probability_chi(chi)
+
+
 def _replace_errors(
     msr: Union[float, Tuple[float, Union[float, Tuple[float, float]]], None],
 ) -> Union[Tuple[float, Union[float, Tuple[float, float]]], None]:
@@ -460,3 +803,48 @@ def _replace_errors(
             elif err == 1e6:
                 err = value
             return value, err
+
+
+def _replace_errors_array(
+    msr, n_grains: int, asymmetric: bool = True
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Bring measurements of many grains into a common form and replace errors.
+
+    Errors are replaced in the same way as in `_replace_errors`.
+
+    :param msr: Measurements as values only, as a tuple of values and uncertainties,
+        or as a tuple of values and a tuple of positive and negative uncertainties.
+        Asymmetric uncertainties can also be given as a two column array.
+        ``None`` if not measured.
+    :param n_grains: Number of grains.
+    :param asymmetric: Are asymmetric uncertainties allowed?
+
+    :return: Values, positive uncertainties, negative uncertainties, and a boolean
+        mask that is `True` where a value is available.
+
+    :raises ValueError: Asymmetric errors given but not allowed.
+    """
+    if msr is None:
+        nans = np.full(n_grains, np.nan)
+        return nans, nans, nans, np.zeros(n_grains, dtype=bool)
+
+    value, err = msr if isinstance(msr, tuple) else (msr, None)
+    value = np.broadcast_to(np.asarray(value, dtype=float), n_grains)
+
+    if isinstance(err, tuple) or np.ndim(err) == 2:
+        if not asymmetric:
+            raise ValueError("Asymmetric uncertainties are only supported for C and N.")
+        err_plus, err_minus = err if isinstance(err, tuple) else np.asarray(err).T
+    else:
+        err_plus = err_minus = err
+
+    errs = []
+    for err in (err_plus, err_minus):
+        err = np.array(np.broadcast_to(np.asarray(err, dtype=float), n_grains))
+        no_err = np.isnan(err) | (err == 0)
+        err_is_value = err == 1e6
+        err[no_err] = np.abs(value[no_err] / 10)
+        err[err_is_value] = value[err_is_value]
+        errs.append(err)
+
+    return value, errs[0], errs[1], ~np.isnan(value)
@@ -1,11 +1,11 @@
 """Local database management for various PGD versions."""
 
 from pgdtools.data import BIBFILE, DB_JSON, REFERENCES_JSON, TECHNIQUES_JSON
-from . import setup_local
+from . import cache, registry, setup_local
 from .config import DataBases
 from .management import current, set_current, update
 
-LOCAL_PATH = setup_local.setup_path()  # where to store data
+LOCAL_PATH = setup_local.local_path()  # where to store data, created on first write
 
 LOCAL_CURRENT = LOCAL_PATH.joinpath("current.json")  # current configuration
 
@@ -14,4 +14,4 @@ LOCAL_DB_JSON = LOCAL_PATH.joinpath(f"config/{DB_JSON.split('/')[-1]}")
 LOCAL_REF_JSON = LOCAL_PATH.joinpath(f"config/{REFERENCES_JSON.split('/')[-1]}")
 LOCAL_TECH_JSON = LOCAL_PATH.joinpath(f"config/{TECHNIQUES_JSON.split('/')[-1]}")
 
-__all__ = ["current", "DataBases", "set_current", "update"]
+__all__ = ["cache", "current", "DataBases", "registry", "set_current", "update"]
@@ -0,0 +1,163 @@
+"""Columnar cache for the downloaded database CSV files.
+
+Parsing the CSV files of the database is slow, since types have to be inferred for
+many, mostly empty, columns. The first time a CSV file is read, a typed cache in the
+Feather (Arrow IPC) format is written next to it. Later reads use this cache as long
+as the CSV file has not changed. The cache requires `pyarrow`. If it is not installed,
+the CSV files are simply read every time.
+"""
+
+import hashlib
+import importlib.util
+import json
+from pathlib import Path
+import warnings
+
+import numpy as np
+import pandas as pd
+
+CACHE_SUFFIX = ".feather"  # suffix of cache files, replaces `.csv`
+
+_METADATA_KEY = b"pgdtools"  # key for the cache metadata in the Arrow schema
+
+
+def read_csv(filepath: Path) -> pd.DataFrame:
+    """Read a database CSV file, using the columnar cache if possible.
+
+    The returned frame is identical to `pd.read_csv(filepath, index_col=0)`.
+    The cache is invalidated if the size and modification time of the CSV file
+    changed and its SHA-256 hash does not agree with the one of the cached file.
+
+    :param filepath: Path to the CSV file.
+
+    :return: Database as a DataFrame, index is the first column of the CSV file.
+    """
+    filepath = Path(filepath)
+    if not pyarrow_available():
+        return pd.read_csv(filepath, index_col=0)
+
+    cache_file = cache_path(filepath)
+    stat = filepath.stat()
+    metadata = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    table = _read_cache(cache_file)
+    if table is not None:
+        cached = json.loads(table.schema.metadata[_METADATA_KEY])
+        if all(cached[key] == metadata[key] for key in metadata):
+            return _table_to_frame(table)
+
+        metadata["sha256"] = _sha256(filepath)
+        if cached["sha256"] == metadata["sha256"]:  # only touched: update metadata
+            _write_cache(cache_file, table, metadata)
+            return _table_to_frame(table)
+
+    df = pd.read_csv(filepath, index_col=0)
+
+    import pyarrow as pa
+
+    try:
+        table = pa.Table.from_pandas(df)
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as err:
+        warnings.warn(f"Cannot cache {filepath.name}: {err}", stacklevel=2)
+        return df
+
+    metadata.setdefault("sha256", _sha256(filepath))
+    _write_cache(cache_file, table, metadata)
+    return df
+
+
+def cache_path(filepath: Path) -> Path:
+    """Return the path of the cache file for a given CSV file.
+
+    :param filepath: Path to the CSV file.
+
+    :return: Path to the cache file next to the CSV file.
+    """
+    return Path(filepath).with_suffix(CACHE_SUFFIX)
+
+
+def pyarrow_available() -> bool:
+    """Check if `pyarrow` is installed, without importing it.
+
+    :return: True if `pyarrow` can be imported.
+    """
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _read_cache(cache_file: Path):
+    """Read a cache file if it exists and is valid.
+
+    :param cache_file: Path to the cache file.
+
+    :return: Arrow table or None if the cache does not exist or cannot be read.
+    """
+    if not cache_file.is_file():
+        return None
+
+    import pyarrow as pa
+    from pyarrow import feather
+
+    try:
+        table = feather.read_table(cache_file)
+    except (OSError, pa.ArrowException):
+        return None
+
+    if table.schema.metadata is None or _METADATA_KEY not in table.schema.metadata:
+        return None
+    return table
+
+
+def _sha256(filepath: Path) -> str:
+    """Calculate the SHA-256 hash of a file.
+
+    :param filepath: Path to the file.
+
+    :return: Hex digest of the hash.
+    """
+    sha = hashlib.sha256()
+    with open(filepath, "rb") as fin:
+        for chunk in iter(lambda: fin.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _table_to_frame(table) -> pd.DataFrame:
+    """Convert a cached Arrow table back to the frame that `pd.read_csv` returns.
+
+    Arrow stores missing strings as null, which pandas returns as `None`. These
+    are replaced with `np.nan` to be identical to reading the CSV file.
+
+    :param table: Arrow table.
+
+    :return: DataFrame.
+    """
+    df = table.to_pandas()
+    obj_cols = df.select_dtypes(include="object").columns
+    df[obj_cols] = df[obj_cols].fillna(np.nan)
+    return df
+
+
+def _write_cache(cache_file: Path, table, metadata: dict) -> None:
+    """Write an Arrow table with metadata to the cache file.
+
+    The file is first written to a temporary file and then moved into place, such
+    that an interrupted write never leaves a corrupt cache behind. If the cache
+    cannot be written, e.g., due to missing permissions, a warning is issued.
+
+    :param cache_file: Path to the cache file.
+    :param table: Arrow table to write.
+    :param metadata: Metadata of the CSV file to store with the table.
+    """
+    from pyarrow import feather
+
+    schema_metadata = dict(table.schema.metadata or {})
+    schema_metadata[_METADATA_KEY] = json.dumps(metadata).encode()
+    table = table.replace_schema_metadata(schema_metadata)
+
+    tmp_file = cache_file.with_name(f".{cache_file.name}.tmp")
+    try:
+        feather.write_feather(table, tmp_file)
+        tmp_file.replace(cache_file)
+    except OSError as err:
+        tmp_file.unlink(missing_ok=True)
+        warnings.warn(f"Cannot write cache file {cache_file}: {err}", stacklevel=3)
@@ -1,7 +1,6 @@
 """Classes to deal with the configuration files."""
 
 from datetime import datetime
-import json
 from typing import Any, List
 
 from pgdtools import db
@@ -31,7 +30,14 @@ class DataBases:
                 f"`pgdtools.db.update()` first."
             )
 
-        self._dbs = json.load(open(db.LOCAL_DB_JSON, "r"))
+        # copy of the shared configuration, entries are formatted below
+        self._dbs = {
+            key: {
+                **value,
+                "versions": [dict(version) for version in value["versions"]],
+            }
+            for key, value in db.registry.databases().items()
+        }
 
         # formatting of the dictionary entries
         for key in self._dbs:
@@ -120,13 +126,22 @@ class DataBases:
 
         :return: List of URLs for all databases chosen as a list of strings.
         """
+        return [version["URL"] for version in self.versions(all=all)]
+
+    def versions(self, all=False) -> List[dict]:
+        """Return a list of version entries for all types of databases.
+
+        :param all: If True, return all versions of the database.
+            Otherwise, return the latest versions.
+
+        :return: List of version entries for all databases chosen.
+        """
         ret_val = []
         for key in self._dbs:
             db = self.database(key)
             if all:
-                for version in db.versions:
-                    ret_val.append(version["URL"])
+                ret_val.extend(db.versions)
             else:
-                ret_val.append(db.version_latest["URL"])
+                ret_val.append(db.version_latest)
 
         return ret_val
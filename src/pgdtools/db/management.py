@@ -1,14 +1,23 @@
 """Management routines for the databases."""
 
+from concurrent.futures import ThreadPoolExecutor
+import itertools
 import json
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Tuple, Union
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from pgdtools import data
 from pgdtools import db
 
+MAX_WORKERS = 4  # maximum number of parallel downloads
+
+PART_SUFFIX = ".part"  # suffix of partially downloaded files
+
+VALIDATORS_SUFFIX = ".http.json"  # suffix of files with HTTP cache validators
+
 
 def current() -> Dict[str, Path]:
     """Get the current database version.
@@ -70,8 +79,10 @@ def set_current(db_name: str, keyword: str, value: Any) -> None:
         raise ValueError("Database could not be found.") from err
 
     # download the file if it is not already available
-    if not db.LOCAL_PATH.joinpath(f"csv/{Path(url).name}").is_file():
-        _download_file(url, db.LOCAL_PATH.joinpath(f"csv/{Path(url).name}"))
+    local_file = db.LOCAL_PATH.joinpath(f"csv/{Path(url).name}")
+    sha256 = db_to_set.get("SHA256")
+    if not _is_valid(local_file, sha256):
+        _download_file(url, local_file, sha256=sha256)
 
     # update the current database
     curr[db_name] = Path(db.LOCAL_PATH.joinpath(f"csv/{Path(url).name}"))
@@ -79,11 +90,17 @@ def set_current(db_name: str, keyword: str, value: Any) -> None:
     curr_to_write = {k: str(v.absolute()) for k, v in curr.items()}
 
     # write the current database to file
+    db.LOCAL_CURRENT.parent.mkdir(parents=True, exist_ok=True)
     with open(db.LOCAL_CURRENT, "w") as fout:
         json.dump(curr_to_write, fout, indent=4)
 
 
-def update(get_all: bool = False, clean: bool = False, get_config: bool = True) -> None:
+def update(
+    get_all: bool = False,
+    clean: bool = False,
+    get_config: bool = True,
+    offline: bool = False,
+) -> None:
     """Get the latest database(s) from the internet.
 
     This upgrades the local installation of `pgdtools` and gets the latest database(s)
@@ -93,26 +110,42 @@ def update(get_all: bool = False, clean: bool = False, get_config: bool = True)
     The update will set the current database to the latest version after it is
     downloaded.
 
+    Databases are downloaded in parallel. Files that are already available locally
+    are not downloaded again, unless their checksum, if recorded in `db.json`, does
+    not match. Interrupted downloads are resumed the next time.
+    Configuration files are only downloaded again if they changed on GitHub.
+
     :param get_all: If True, get all versions of the database and store them locally.
     :param clean: If True, remove all existing databases before downloading.
     :param get_config: If True, get the latest configuration files from GitHub.
+    :param offline: If True, do not access the network and only use the local
+        configuration files and databases.
+
+    :raises FileNotFoundError: Offline mode, but a database is not available locally.
     """
     if clean:
         _clean_local_db()
 
-    if get_config:
+    if get_config and not offline:
         _get_online_config()
-
-    print("Configuration files updated.")
+        print("Configuration files updated.")
 
     data_bases = db.DataBases()
 
-    urls = data_bases.urls(all=get_all)
+    downloads = []
+    for version in data_bases.versions(all=get_all):
+        local_file = db.LOCAL_PATH.joinpath(f"csv/{Path(version['URL']).name}")
+        if _is_valid(local_file, version.get("SHA256")):
+            print(f"Database {local_file.name} already available.")
+        else:
+            downloads.append((version["URL"], local_file, version.get("SHA256")))
 
-    for url in urls:
-        fname = Path(url).name
-        _download_file(url, db.LOCAL_PATH.joinpath(f"csv/{fname}"))
-        print(f"Database {fname} downloaded.")
+    if offline and downloads:
+        missing = ", ".join(local_file.name for _, local_file, _ in downloads)
+        raise FileNotFoundError(f"Offline mode, databases not available: {missing}.")
+
+    for local_file in _download_files(downloads):
+        print(f"Database {local_file.name} downloaded.")
 
     latest_version_dict = {}
     for db_name in data_bases.dbs:
@@ -122,13 +155,20 @@ def update(get_all: bool = False, clean: bool = False, get_config: bool = True)
             ).absolute()
         )
 
+    db.LOCAL_CURRENT.parent.mkdir(parents=True, exist_ok=True)
     with open(db.LOCAL_CURRENT, "w") as fout:
         json.dump(latest_version_dict, fout, indent=4)
 
 
 def _clean_local_db() -> None:
-    """Clean the local database folder: delete all csv files in csv folder."""
-    files_to_delete = db.LOCAL_PATH.joinpath("csv").glob("*.csv")
+    """Clean the local database folder: delete all csv, cache, and partial files."""
+    csv_folder = db.LOCAL_PATH.joinpath("csv")
+    files_to_delete = itertools.chain(
+        csv_folder.glob("*.csv"),
+        csv_folder.glob(f"*{db.cache.CACHE_SUFFIX}"),
+        csv_folder.glob(f"*{PART_SUFFIX}"),
+        csv_folder.glob(f"*{PART_SUFFIX}{VALIDATORS_SUFFIX}"),
+    )
     for file in files_to_delete:
         file.unlink()
 
@@ -137,34 +177,216 @@ def _get_online_config() -> None:
     """Get the database, bibliography, references, and techniques from GitHub.
 
     Here we get the latest configuration from GitHub (database folder) and store
-    it locally in the `pgdtools` user folder in a config folder.
+    it locally in the `pgdtools` user folder in a config folder. Files that are
+    available locally are revalidated, i.e., only downloaded if they changed.
     """
     conf_local_zip = zip(
         [data.BIBFILE, data.DB_JSON, data.REFERENCES_JSON, data.TECHNIQUES_JSON],
         [db.LOCAL_BIB, db.LOCAL_DB_JSON, db.LOCAL_REF_JSON, db.LOCAL_TECH_JSON],
     )
-    for url, local_file in conf_local_zip:
-        _download_file(url, local_file)
-
-
-def _download_file(url: str, local_file: Path) -> None:
+    with requests.Session() as session:
+        for url, local_file in conf_local_zip:
+            _download_file(url, local_file, session=session, revalidate=True)
+
+
+def _download_file(
+    url: str,
+    local_file: Path,
+    sha256: str = None,
+    session: Union[requests.Session, None] = None,
+    revalidate: bool = False,
+) -> None:
     """Download a file from the internet and store it locally.
 
     This routine uses the `requests` library and downloads files as a stream in order
-    to preserve memory. The file is stored locally at the given path.
+    to preserve memory. The file is first written to a partial file next to the
+    given path and only moved into place once the download is complete and
+    verified, such that an interrupted download never leaves a corrupt file behind.
+    If a partial file from an earlier download exists, the download is resumed.
+    The ETag or Last-Modified date of the response that the partial file was
+    started with is sent as `If-Range`, such that the server sends the whole file
+    if it changed in the meantime. Without such a validator, the download restarts.
+
+    If `revalidate` is True, the HTTP cache validators of the response (ETag and
+    Last-Modified) are stored next to the local file. The next download sends them
+    as a conditional request and the file is not downloaded again if it did not
+    change on the server.
 
     :param url: URL of the file to download.
     :param local_file: Path to the local file.
+    :param sha256: SHA-256 hash of the file. If given, the download is verified.
+    :param session: Session to use for the download, e.g., to share connections.
+    :param revalidate: If True, only download the file if it changed on the server.
 
     :raises FileNotFoundError: If the file is not found at the given URL.
     :raises ConnectionError: If the connection to the URL fails in any other way.
+    :raises IOError: If the checksum of the downloaded file does not match.
     """
-    with requests.get(url, stream=True) as rin:
+    session = requests if session is None else session
+    part_file = _part_path(local_file)
+    part_file.parent.mkdir(parents=True, exist_ok=True)
+
+    validators_file = _validators_path(local_file)
+    part_validators_file = part_file.with_name(f"{part_file.name}{VALIDATORS_SUFFIX}")
+
+    offset = part_file.stat().st_size if part_file.is_file() else 0
+    if_range = _if_range_header(part_validators_file) if offset else None
+    if offset and if_range is None:  # unknown version of the partial file
+        part_file.unlink()
+        offset = 0
+
+    if offset:
+        headers = {"Range": f"bytes={offset}-", "If-Range": if_range}
+    elif revalidate and local_file.is_file():
+        headers = _conditional_headers(validators_file)
+    else:
+        headers = {}
+
+    with session.get(url, stream=True, headers=headers) as rin:
+        if rin.status_code == 304:  # not modified
+            return
+
+        content_range = rin.headers.get("Content-Range", "")
+        resumed = rin.status_code == 206 and content_range.startswith(
+            f"bytes {offset}-"
+        )
+        if offset and not resumed and rin.status_code != 200:  # cannot resume
+            part_file.unlink()
+            return _download_file(
+                url, local_file, sha256=sha256, session=session, revalidate=revalidate
+            )
+
         if rin.status_code == 404:
             raise FileNotFoundError(f"File not found at {url}.")
-        elif rin.status_code != 200:
+        elif rin.status_code not in (200, 206):
             raise ConnectionError(f"Connection error {rin.status_code} for url {url}.")
 
-        with open(local_file, "wb") as floc:
+        validators = {
+            key: rin.headers[key]
+            for key in ("ETag", "Last-Modified")
+            if key in rin.headers
+        }
+        if not resumed:
+            part_validators_file.write_text(json.dumps(validators))
+
+        with open(part_file, "ab" if resumed else "wb") as floc:
             for chunk in rin.iter_content(chunk_size=8192):
                 floc.write(chunk)
+
+    part_validators_file.unlink()
+    if sha256 is not None and db.cache._sha256(part_file) != sha256:
+        part_file.unlink()
+        raise IOError(f"Checksum of file downloaded from {url} does not match.")
+
+    part_file.replace(local_file)
+
+    if revalidate:
+        validators_file.write_text(json.dumps(validators))
+
+
+def _conditional_headers(validators_file: Path) -> Dict[str, str]:
+    """Create the headers for a conditional request from stored cache validators.
+
+    :param validators_file: Path to the file with the stored validators.
+
+    :return: Headers for the request, empty if no valid validators are stored.
+    """
+    try:
+        validators = json.loads(validators_file.read_text())
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+    headers = {}
+    if "ETag" in validators:
+        headers["If-None-Match"] = validators["ETag"]
+    if "Last-Modified" in validators:
+        headers["If-Modified-Since"] = validators["Last-Modified"]
+    return headers
+
+
+def _if_range_header(validators_file: Path) -> Union[str, None]:
+    """Create the `If-Range` header to resume a download from stored validators.
+
+    Only strong ETags can be used for range requests, otherwise the Last-Modified
+    date is used.
+
+    :param validators_file: Path to the file with the stored validators.
+
+    :return: Value of the header, None if no suitable validator is stored.
+    """
+    try:
+        validators = json.loads(validators_file.read_text())
+    except (OSError, json.JSONDecodeError):
+        return None
+
+    etag = validators.get("ETag")
+    if etag is not None and not etag.startswith("W/"):
+        return etag
+    return validators.get("Last-Modified")
+
+
+def _download_files(downloads: List[Tuple[str, Path, Union[str, None]]]) -> List[Path]:
+    """Download multiple files in parallel.
+
+    All downloads share one session, such that connections to the same host are
+    reused. If a download fails, the error is raised after all other downloads
+    finished.
+
+    :param downloads: List of tuples of URL, local file, and SHA-256 hash (or None)
+        of the files to download, see `_download_file`.
+
+    :return: Paths of the downloaded files, in the order of the given downloads.
+    """
+    if not downloads:
+        return []
+
+    workers = min(MAX_WORKERS, len(downloads))
+    with requests.Session() as session, ThreadPoolExecutor(workers) as pool:
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        futures = [
+            pool.submit(_download_file, url, local_file, sha256=sha256, session=session)
+            for url, local_file, sha256 in downloads
+        ]
+        for future in futures:
+            future.result()
+
+    return [local_file for _, local_file, _ in downloads]
+
+
+def _is_valid(local_file: Path, sha256: Union[str, None]) -> bool:
+    """Check if a local file is available and valid.
+
+    Since files are only moved into place after a complete download, an existing file
+    is valid if no checksum is given.
+
+    :param local_file: Path to the local file.
+    :param sha256: SHA-256 hash of the file or None.
+
+    :return: True if the file exists and matches the checksum, if given.
+    """
+    if not local_file.is_file():
+        return False
+    return sha256 is None or db.cache._sha256(local_file) == sha256
+
+
+def _part_path(local_file: Path) -> Path:
+    """Return the path of the partial file for a download.
+
+    :param local_file: Path to the local file.
+
+    :return: Path to the hidden partial file next to the local file.
+    """
+    return local_file.with_name(f".{local_file.name}{PART_SUFFIX}")
+
+
+def _validators_path(local_file: Path) -> Path:
+    """Return the path of the file with the HTTP cache validators for a download.
+
+    :param local_file: Path to the local file.
+
+    :return: Path to the hidden validators file next to the local file.
+    """
+    return local_file.with_name(f".{local_file.name}{VALIDATORS_SUFFIX}")
@@ -0,0 +1,112 @@
+"""Process-wide registry for the JSON configuration files.
+
+The configuration files `db.json`, `references.json`, and `techniques.json` are
+read by many objects, e.g., every access to `pgd.reference` creates a new
+`References` instance. The registry parses each file only once and returns the
+same read-only view until the file changes on disk, which is detected from its
+modification time and size. Public properties, e.g., `pgd.reference.dict`, return
+mutable copies of the entries they expose, see `to_dict`.
+"""
+
+import json
+from pathlib import Path
+import threading
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Tuple
+
+from pgdtools import db
+
+# path -> ((modification time, size), read-only content)
+_REGISTRY: Dict[Path, Tuple[Tuple[int, int], Mapping]] = {}
+_LOCK = threading.Lock()
+
+
+def clear() -> None:
+    """Clear the registry, such that all files are read again on next access."""
+    with _LOCK:
+        _REGISTRY.clear()
+
+
+def databases() -> Mapping:
+    """Return the content of the local `db.json` file.
+
+    :return: Read-only view of the database configuration.
+
+    :raises FileNotFoundError: If the file does not exist.
+    """
+    return load_json(db.LOCAL_DB_JSON)
+
+
+def load_json(filepath: Path) -> Mapping:
+    """Load a JSON file, using the registry if the file did not change.
+
+    :param filepath: Path to the JSON file.
+
+    :return: Read-only view of the JSON content: Dictionaries are returned as
+        mapping proxies, lists as tuples.
+
+    :raises FileNotFoundError: If the file does not exist.
+    """
+    filepath = Path(filepath).absolute()
+    stat = filepath.stat()
+    version = (stat.st_mtime_ns, stat.st_size)
+
+    with _LOCK:
+        entry = _REGISTRY.get(filepath)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    with open(filepath, "r") as fin:
+        content = _read_only(json.load(fin))
+
+    with _LOCK:
+        _REGISTRY[filepath] = (version, content)
+    return content
+
+
+def references() -> Mapping:
+    """Return the content of the local `references.json` file.
+
+    :return: Read-only view of the references.
+
+    :raises FileNotFoundError: If the file does not exist.
+    """
+    return load_json(db.LOCAL_REF_JSON)
+
+
+def techniques() -> Mapping:
+    """Return the content of the local `techniques.json` file.
+
+    :return: Read-only view of the techniques.
+
+    :raises FileNotFoundError: If the file does not exist.
+    """
+    return load_json(db.LOCAL_TECH_JSON)
+
+
+def to_dict(obj: Any) -> Any:
+    """Recursively convert a read-only object of the registry into a mutable copy.
+
+    :param obj: Read-only object as returned from the registry.
+
+    :return: Mapping proxies as dictionaries, tuples as lists, others unchanged.
+    """
+    if isinstance(obj, Mapping):
+        return {key: to_dict(value) for key, value in obj.items()}
+    if isinstance(obj, tuple):
+        return [to_dict(value) for value in obj]
+    return obj
+
+
+def _read_only(obj: Any) -> Any:
+    """Recursively convert dictionaries and lists into read-only objects.
+
+    :param obj: Parsed JSON object.
+
+    :return: Dictionaries as mapping proxies, lists as tuples, others unchanged.
+    """
+    if isinstance(obj, dict):
+        return MappingProxyType({key: _read_only(value) for key, value in obj.items()})
+    if isinstance(obj, list):
+        return tuple(_read_only(value) for value in obj)
+    return obj
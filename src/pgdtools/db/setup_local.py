@@ -4,18 +4,28 @@ from pathlib import Path
 import sys
 
 
-def setup_path() -> Path:
-    """Set up the path to store data in the user's home directory.
+def local_path() -> Path:
+    """Get the path to store data in the user's home directory.
 
-    If the folder already exists, all is good and can continue to function.
+    This does not create any folders, see `setup_path` for that.
 
     :return: Path to the database folder.
     """
     current_platform = sys.platform
     if current_platform == "win32" or current_platform == "cygwin":
-        app_local_path = Path.home().joinpath("AppData/Roaming/pgdtools/")
+        return Path.home().joinpath("AppData/Roaming/pgdtools/")
     else:
-        app_local_path = Path.home().joinpath(".config/pgdtools/")
+        return Path.home().joinpath(".config/pgdtools/")
+
+
+def setup_path() -> Path:
+    """Set up the path to store data in the user's home directory.
+
+    If the folder already exists, all is good and can continue to function.
+
+    :return: Path to the database folder.
+    """
+    app_local_path = local_path()
 
     app_local_path.mkdir(parents=True, exist_ok=True)
 
@@ -5,6 +5,7 @@ used with `pgdtools`.
 """
 
 from datetime import datetime
+import hashlib
 import json
 from pathlib import Path
 from typing import Union
@@ -28,6 +29,10 @@ def append_to_db_json(
     Information is read from the `VersionHistory` tab. From here the `Date`,
     `Grains`, `Change`, and `Known issues` are read.
 
+    If the CSV file of the database, i.e., the Excel filename with the extension
+    `csv`, exists next to the Excel file, its SHA-256 hash is recorded as well,
+    such that downloads can be verified.
+
     Currently, only releases on Zenodo are supported for SiC and Graphite grains.
     If the DOI does not contain the word `zenodo`, it refers likely to another archive
     (Astromat - IEDA) and the `zenodo_record` number is required.
@@ -120,18 +125,23 @@ def append_to_db_json(
             warnings.warn(f"DOI {doi} already exists in db.json.", stacklevel=2)
             return
 
+    entry = {
+        "Change": change,
+        "Date": date.strftime("%Y-%m-%d"),
+        "DOI": doi,
+        "Grains": grains,
+        "Known issues": known_issues,
+        "Released on": released_on,
+        "URL": url,
+    }
+
+    # checksum of the csv file, if available
+    csv_file = excel_file.with_suffix(".csv")
+    if csv_file.is_file():
+        entry["SHA256"] = hashlib.sha256(csv_file.read_bytes()).hexdigest()
+
     # now add the entry to the db
-    db[db_key]["versions"].append(
-        {
-            "Change": change,
-            "Date": date.strftime("%Y-%m-%d"),
-            "DOI": doi,
-            "Grains": grains,
-            "Known issues": known_issues,
-            "Released on": released_on,
-            "URL": url,
-        }
-    )
+    db[db_key]["versions"].append(entry)
 
     # save out the json file
     with open(db_json, "w") as fout:
@@ -3,13 +3,33 @@
 All sub functions and tools live in the `sub_tools` folder and are imported here."""
 
 from enum import Enum
+from typing import Callable, Dict, List, Tuple, Union
 
+import numpy as np
 import pandas as pd
 
 import pgdtools.sub_tools.headers
+import pgdtools.sub_tools.references
+import pgdtools.sub_tools.techniques
+import pgdtools.sub_tools.utilities as utl
+import pgdtools.sub_tools.virtual
 from pgdtools import db
 from pgdtools.sub_tools import Data, Filters, Format, Info, References, Techniques
 
+# metadata columns that are stored as categoricals in compact mode
+_CATEGORICAL_COLUMNS = (
+    "PGD Type",
+    "PGD Subtype",
+    "Type",
+    "Reference",
+    "Technique",
+    "Source",
+    "Morphology",
+)
+
+# numeric columns with a lower fraction of values are stored sparse in compact mode
+_SPARSE_MAX_DENSITY = 0.5
+
 
 class PresolarGrains:
     """Presolar grain database class.
@@ -39,11 +59,39 @@ class PresolarGrains:
         SiC = "SiC"
         Graphite = "Gra"
 
-    def __init__(self):
+    def __init__(self, frame: pd.DataFrame = None, compact: bool = False):
         """Initialize the presolar grain class.
 
-        Load the default database into self.db and self._db as a backup.
+        Load the default database into self._db, which is never modified. The current
+        selection is stored as row positions into this database and only
+        materialized as a frame when `self.db` is accessed. Once materialized,
+        subsequent filters select rows of that frame, such that columns added to it
+        are kept. Filters that have not been applied yet, see `pgd.filter.lazy()`,
+        are stored as a list of functions that return a boolean mask for a given
+        frame.
+
+        :param frame: Database to use instead of the current local database, e.g.,
+            a subset of the database or synthetic data. The index must be the
+            PGD ID and the columns must follow the database format.
+        :param compact: Store the database in a compact form to save memory: Mostly
+            empty numeric columns are stored as sparse columns and metadata columns
+            as categoricals. Data returned from `pgd.data` is always dense.
         """
+        self._lazy = 0  # depth of nested lazy filter contexts
+        self._pending: List[Callable[[pd.DataFrame], np.ndarray]] = []
+        self._schema_cache = None  # (columns, schema) of the last parsed header
+        self._ref_keys_cache = None  # (index, reference keys) of the last source
+        self._id_parts_cache = None  # (index, parsed PGD IDs) of the last source
+        self._tech_keys_cache = None  # (frame, technique keys, offsets) of last source
+        self._tree_cache: Dict[tuple, tuple] = {}  # KD-trees for `pgd.data.nearest`
+        self._virtual_cache = None  # (source, {header: virtual columns}) of last source
+        self._classification_cache = None  # (database, classification of SiC grains)
+
+        if frame is not None:
+            self._db = _compact(frame) if compact else frame.copy(deep=True)
+            self.reset()
+            return
+
         try:
             curr_db = db.current()
         except FileNotFoundError:
@@ -59,9 +107,11 @@ class PresolarGrains:
         for key in keys:
             filepaths.append(curr_db[key])
 
-        dfs = [pd.read_csv(filepath, index_col=0) for filepath in filepaths]
-        self.db = pd.concat(dfs)
-        self._db = self.db.copy(deep=True)
+        dfs = [db.cache.read_csv(filepath) for filepath in filepaths]
+        self._db = pd.concat(dfs)
+        if compact:
+            self._db = _compact(self._db)
+        self.reset()
 
     def __repr__(self):
         """Return a string representation of the class."""
@@ -73,12 +123,192 @@ class PresolarGrains:
 
     def __len__(self):
         """Return the number of grains in the current, filtered database."""
-        return len(self.db)
+        return len(self._index)
 
     def __iter__(self):
         """Iterate over (index, row) for all entries the filtered database."""
         return self.db.iterrows()
 
+    @property
+    def db(self) -> pd.DataFrame:
+        """Get the current, filtered database.
+
+        Pending filters are applied and the selected rows are materialized as a new
+        frame, which is kept until the selection changes. Subsequent filters select
+        rows of this frame, such that changes to it, e.g., added columns, are kept.
+        Without a selection, a shallow copy of the full database is returned, which
+        shares its data with the full database: Columns can be added or dropped, but
+        values should not be modified in place.
+
+        :return: Current database.
+        """
+        self._apply_pending()
+        if self._frame is None:
+            if self._rows is None:
+                self._frame = self._source.copy(deep=False)
+            else:
+                self._frame = self._source.take(self._rows)
+        return self._frame
+
+    @db.setter
+    def db(self, value: pd.DataFrame) -> None:
+        """Set the current database, pending filters are discarded.
+
+        Subsequent filters select rows of the given frame, `reset()` restores the
+        full database.
+
+        :param value: New database.
+        """
+        self._pending = []
+        self._source = value
+        self._rows = None
+        self._frame = value
+
+    @property
+    def _columns(self) -> pd.Index:
+        """Get the columns of the current database without materializing it.
+
+        :return: Column names.
+        """
+        frame = self._source if self._frame is None else self._frame
+        return frame.columns
+
+    @property
+    def _schema(self) -> "pgdtools.sub_tools.headers.HeaderSchema":
+        """Get the parsed header of the current database.
+
+        The schema is only rebuilt if the columns of the database change, e.g.,
+        when classification results are added.
+
+        :return: Header schema.
+        """
+        columns = self._columns
+        if self._schema_cache is None or self._schema_cache[0] is not columns:
+            schema = pgdtools.sub_tools.headers.HeaderSchema(columns)
+            self._schema_cache = (columns, schema)
+        return self._schema_cache[1]
+
+    @property
+    def _id_parts(self) -> pd.DataFrame:
+        """Get the parsed PGD IDs of the current selection.
+
+        :return: Components of the PGD IDs, see `utilities.id_parts`.
+        """
+        self._apply_pending()
+        parts = self._id_parts_of(self._source)
+        return parts if self._rows is None else parts.iloc[self._rows]
+
+    def _id_parts_of(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Get the parsed PGD IDs of all grains of a frame.
+
+        The IDs are parsed once for the frame that the current selection refers to.
+        Other frames, e.g., a materialized selection, are sliced from it if possible.
+
+        :param frame: Database or selection of the database.
+
+        :return: Components of the PGD IDs, see `utilities.id_parts`.
+        """
+        index = self._source.index
+        if self._id_parts_cache is None or self._id_parts_cache[0] is not index:
+            self._id_parts_cache = (index, utl.id_parts(index))
+
+        parts = self._id_parts_cache[1]
+        if frame is self._frame and self._rows is not None:
+            parts = parts.iloc[self._rows]
+        elif frame is not self._frame and frame is not self._source:
+            return utl.id_parts(frame.index)
+        return parts if parts.index.equals(frame.index) else utl.id_parts(frame.index)
+
+    @property
+    def _reference_keys(self) -> pd.Series:
+        """Get the reference keys of the current selection.
+
+        The keys are derived once for all grains of the database and then selected
+        for the current selection, see `References` for details.
+
+        :return: Categorical reference keys, the index is the PGD ID.
+        """
+        self._apply_pending()
+        index = self._source.index
+        if self._ref_keys_cache is None or self._ref_keys_cache[0] is not index:
+            keys = pgdtools.sub_tools.references.reference_keys(index)
+            self._ref_keys_cache = (index, pd.Series(keys, index=index))
+
+        keys = self._ref_keys_cache[1]
+        return keys if self._rows is None else keys.iloc[self._rows]
+
+    @property
+    def _technique_keys(self) -> pd.Series:
+        """Get the technique keys of the current selection in long format.
+
+        The techniques are split once for all grains of the database and then
+        selected for the current selection, see `Techniques` for details.
+
+        :return: Categorical technique keys, the index is the PGD ID. Grains that
+            were measured with multiple techniques appear once per technique.
+        """
+        self._apply_pending()
+        keys = self._technique_entries(self._source)
+        starts = self._tech_keys_cache[2]
+        if self._rows is not None:
+            counts = starts[self._rows + 1] - starts[self._rows]
+            ends = np.cumsum(counts)
+            entries = np.repeat(starts[self._rows] - ends + counts, counts)
+            keys = keys.iloc[entries + np.arange(len(entries))]
+
+        index = self._source.index[keys.index.to_numpy()]
+        return pd.Series(keys.to_numpy(), index=index, name=keys.name)
+
+    def _technique_entries(self, frame: pd.DataFrame) -> pd.Series:
+        """Get the technique keys of all grains of a frame in long format.
+
+        The keys are cached for the frame that the current selection refers to.
+
+        :param frame: Database or selection of the database.
+
+        :return: Categorical technique keys, the index is the position of the grain
+            in the frame. Entries of the same grain are adjacent.
+        """
+        if self._tech_keys_cache is not None and self._tech_keys_cache[0] is frame:
+            return self._tech_keys_cache[1]
+
+        keys = pgdtools.sub_tools.techniques.technique_keys(frame["Technique"])
+        if frame is self._source:
+            # offsets of the first entry of every grain, plus the number of entries
+            starts = np.searchsorted(keys.index.to_numpy(), np.arange(len(frame) + 1))
+            self._tech_keys_cache = (frame, keys, starts)
+        return keys
+
+    def _gather(self, columns: List[str]) -> pd.DataFrame:
+        """Get columns of the current selection without materializing all columns.
+
+        Pending filters are applied.
+
+        :param columns: Columns to get, can contain virtual columns.
+
+        :return: Frame with the given columns, the index is the PGD ID.
+        """
+        self._apply_pending()
+        if self._frame is not None:
+            return self._with_virtual(self._frame, columns)[columns]
+        frame = self._with_virtual(self._source, columns)[columns]
+        return frame if self._rows is None else frame.iloc[self._rows]
+
+    @property
+    def _index(self) -> pd.Index:
+        """Get the PGD IDs of the current selection without materializing it.
+
+        Pending filters are applied.
+
+        :return: Index of the current selection.
+        """
+        self._apply_pending()
+        if self._frame is not None:
+            return self._frame.index
+        if self._rows is None:
+            return self._source.index
+        return self._source.index[self._rows]
+
     # SUB TOOL ACCESS #
 
     @property
@@ -163,18 +393,256 @@ class PresolarGrains:
         """
         return Techniques(self)
 
-    def _header(self, iso1: str, iso2: str) -> "pgdtools.sub_tools.headers.Headers":
+    def _correlation(
+        self, rat_x: Tuple[str, str], rat_y: Tuple[str, str]
+    ) -> Union[str, None]:
+        """Get the header of the correlation coefficient between two isotope ratios.
+
+        Correlation coefficients are stored for the nominators of two isotope
+        ratios in the database. Virtual ratios have no correlation coefficients.
+
+        :param rat_x: First isotope ratio.
+        :param rat_y: Second isotope ratio.
+
+        :return: Header of the correlation coefficient or None if not available.
+        """
+        virtual = self._schema.virtual
+        if any(self._header(*rat).ratio[0] in virtual for rat in (rat_x, rat_y)):
+            return None
+        return self._header(rat_x[0], rat_y[0]).correlation
+
+    def _header(
+        self, iso1: str, iso2: str, delta: bool = None
+    ) -> "pgdtools.sub_tools.headers.Headers":
         """Access the headers class for a given isotope ratio.
 
         :param iso1: Nominator isotope.
         :param iso2: Denominator isotope.
+        :param delta: Request the delta value or the isotope ratio, see `Headers`.
 
         :return: Headers class
         """
-        return pgdtools.sub_tools.headers.Headers(self, iso1, iso2)
+        return pgdtools.sub_tools.headers.Headers(self, iso1, iso2, delta)
 
     # METHODS #
 
+    def classify(self) -> pd.DataFrame:
+        """Classify all SiC grains in the current selection.
+
+        Grains are classified according to the scheme of Stephan et al. (2024),
+        see `pgdtools.classify_sic_grains` for details. The isotope ratios are taken
+        from the database, missing correlation coefficients are assumed to be zero.
+        The following columns are added to the current selection and returned:
+        - Computed Type
+        - Computed Subtype
+        - Computed p(M), Computed p(AB), ... (one probability per grain type)
+
+        Grains that are not SiC grains are not classified and contain empty values.
+        All SiC grains of the database are classified the first time this method is
+        called, the results are then cached for the full database.
+        Calling this method again, e.g., after filtering or resetting the database,
+        is therefore cheap.
+
+        :return: Classification results for the current selection, the index is
+            the PGD ID.
+
+        Example:
+            >>> from pgdtools import pgd
+            >>> classes = pgd.classify()
+            >>> assert "Computed Type" in pgd.db.columns
+        """
+        cache = self._classification_cache
+        if cache is None or cache[0] is not self._db:
+            cache = self._classification_cache = (self._db, self._classify_all_sic())
+        classification = cache[1]
+
+        ret_frame = classification.reindex(self.db.index)
+        self.db = self.db.drop(columns=ret_frame.columns, errors="ignore").join(
+            ret_frame
+        )
+        return ret_frame
+
     def reset(self):
-        """Reset the database."""
-        self.db = self._db.copy(deep=True)
+        """Reset the database.
+
+        Only the selection is reset, the full database is not copied.
+        """
+        self._pending = []
+        self._source = self._db  # frame that the selected rows refer to
+        self._rows = None  # row positions of the selection, None selects all rows
+        self._frame = None  # materialized selection, created on access
+
+    def _apply_mask(self, func: Callable[[pd.DataFrame], np.ndarray]) -> None:
+        """Filter the database with a boolean mask.
+
+        In lazy mode, the filter is only stored and applied together with all other
+        pending filters when the database is accessed the next time.
+
+        :param func: Function that takes the current database and returns a boolean
+            mask of the rows to keep.
+        """
+        self._pending.append(func)
+        if not self._lazy:
+            self._apply_pending()
+
+    def _apply_pending(self) -> None:
+        """Apply all pending filters to the selected rows.
+
+        The masks are evaluated on the materialized selection if it exists and
+        otherwise on the frame that the rows refer to, such that no copy is made.
+        """
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, []
+        frame = self._source if self._frame is None else self._frame
+        mask = np.logical_and.reduce(
+            [np.asarray(func(frame), dtype=bool) for func in pending]
+        )
+        if self._frame is None and self._rows is not None:
+            mask = mask[self._rows]
+        self._select(np.flatnonzero(mask))
+
+    def _select(self, positions: np.ndarray) -> None:
+        """Select rows of the current selection by their positions.
+
+        :param positions: Positions of the rows to keep, relative to the current
+            selection.
+        """
+        if self._frame is not None:  # keep changes made to the materialized frame
+            self._source, self._rows = self._frame, positions
+        else:
+            self._rows = positions if self._rows is None else self._rows[positions]
+        self._frame = None
+
+    def _select_ids(self, ids: List[str]) -> None:
+        """Select grains of the current selection by PGD ID, in the given order.
+
+        :param ids: PGD IDs to select.
+
+        :raises KeyError: A PGD ID is not in the current selection.
+        """
+        index = self._index
+        positions = pd.Series(np.arange(len(index)), index=index).loc[ids]
+        self._select(positions.to_numpy())
+
+    def _virtual_columns(
+        self, frame: pd.DataFrame, ratio: "pgdtools.sub_tools.virtual.VirtualRatio"
+    ) -> pd.DataFrame:
+        """Get the virtual columns of a derived isotope ratio for all grains of a frame.
+
+        The columns are computed once for the frame that the current selection
+        refers to. Other frames, e.g., a materialized selection, are sliced from
+        it if possible.
+
+        :param frame: Database or selection of the database.
+        :param ratio: Virtual ratio to compute.
+
+        :return: Virtual columns, see `VirtualRatio.compute`.
+        """
+        source = self._source
+        if self._virtual_cache is None or self._virtual_cache[0] is not source:
+            self._virtual_cache = (source, {})
+        if frame is not self._frame and frame is not source:
+            return ratio.compute(frame)
+
+        cache = self._virtual_cache[1]
+        if ratio.header not in cache:
+            cache[ratio.header] = ratio.compute(source)
+        columns = cache[ratio.header]
+        if frame is self._frame and self._rows is not None:
+            columns = columns.iloc[self._rows]
+        return columns if columns.index.equals(frame.index) else ratio.compute(frame)
+
+    def _with_virtual(self, frame: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+        """Get a frame that contains the given columns, including virtual columns.
+
+        :param frame: Database or selection of the database.
+        :param columns: Columns that are needed.
+
+        :return: The frame itself if all columns are stored, otherwise a frame
+            with the given stored and virtual columns.
+        """
+        virtual = self._schema.virtual
+        ratios = {
+            virtual[col].header: virtual[col]
+            for col in columns
+            if col in virtual and col not in frame.columns
+        }
+        if not ratios:
+            return frame
+
+        stored = [col for col in dict.fromkeys(columns) if col in frame.columns]
+        parts = [self._virtual_columns(frame, ratio) for ratio in ratios.values()]
+        return pd.concat([frame[stored]] + parts, axis=1)
+
+    def _classify_all_sic(self) -> pd.DataFrame:
+        """Classify all SiC grains of the full database.
+
+        :return: Classification results with the PGD ID as index.
+        """
+        # imported here, since scipy is slow to import and not needed otherwise
+        from pgdtools.classify import SIC_GRAIN_TYPES, classify_sic_grains
+
+        self._apply_pending()
+        selection = self._source, self._rows, self._frame
+        self.reset()
+        self._select(
+            np.flatnonzero(self._db.index.str.startswith(self.DataBase.SiC.value))
+        )
+        try:
+            c12_c13, n14_n15, d29si, d30si, al26_al27 = (
+                self.data.ratio(rat, dropnan=False)
+                for rat in (
+                    ("12C", "13C"),
+                    ("14N", "15N"),
+                    ("29Si", "28Si"),
+                    ("30Si", "28Si"),
+                    ("26Al", "27Al"),
+                )
+            )
+            rho_hdr = self._header("30Si", "29Si").correlation
+            rho_si = 0 if rho_hdr is None else utl.dense(self.db[rho_hdr])
+            index = self.db.index
+        finally:
+            self._source, self._rows, self._frame = selection
+
+        gtypes, subtypes, probabilities = classify_sic_grains(
+            (c12_c13[0], (c12_c13[1], c12_c13[2])),
+            (n14_n15[0], (n14_n15[1], n14_n15[2])),
+            d29si[:2],
+            d30si[:2],
+            al26_al27[:2],
+            rho_si=rho_si,
+        )
+
+        ret_frame = pd.DataFrame(
+            probabilities,
+            index=index,
+            columns=[f"Computed p({gtype})" for gtype in SIC_GRAIN_TYPES],
+        )
+        ret_frame.insert(0, "Computed Type", gtypes)
+        ret_frame.insert(
+            1, "Computed Subtype", np.where(pd.isna(subtypes), np.nan, subtypes)
+        )
+        return ret_frame
+
+
+def _compact(frame: pd.DataFrame) -> pd.DataFrame:
+    """Create a compact copy of a database frame.
+
+    Numeric columns in which less than half of the grains have a value are
+    converted to sparse columns, metadata columns to categoricals.
+
+    :param frame: Database frame.
+
+    :return: Compact copy of the frame.
+    """
+    dtypes = {}
+    for column in frame.select_dtypes(include="number").columns:
+        if frame[column].notna().mean() < _SPARSE_MAX_DENSITY:
+            dtypes[column] = pd.SparseDtype(frame[column].dtype, np.nan)
+    for column in _CATEGORICAL_COLUMNS:
+        if column in frame.columns:
+            dtypes[column] = "category"
+    return frame.astype(dtypes)
@@ -1,10 +1,18 @@
 """Sub tool to retrieve data from the filtered database."""
 
-from typing import Tuple, Union
+import itertools
+from typing import List, Tuple, Union
 
+import numpy as np
 import pandas as pd
 
 import pgdtools
+import pgdtools.sub_tools.resampling
+import pgdtools.sub_tools.utilities as utl
+
+
+# maximum number of KD-trees that are cached for `Data.nearest`
+MAX_CACHED_TREES = 8
 
 
 class Data:
@@ -30,6 +38,14 @@ class Data:
 
         self.parent = parent
 
+    @property
+    def arrays(self) -> "Arrays":
+        """Retrieve data of the filtered database as NumPy arrays.
+
+        :return: Arrays class.
+        """
+        return Arrays(self.parent)
+
     @property
     def notes(self):
         """Retrieve the notes from the filtered database.
@@ -82,14 +98,84 @@ class Data:
 
         :return: Two columns of size information.
         """
-        ret_db = self.parent.db[["Size a (µm)", "Size b (µm)"]].copy()
+        ret_db = utl.dense(self.parent.db[["Size a (µm)", "Size b (µm)"]]).copy()
         ret_db["Size b (µm)"] = ret_db["Size b (µm)"].fillna(ret_db["Size a (µm)"])
         return ret_db
 
     # METHODS
 
+    def nearest(
+        self,
+        composition: Union[List[float], np.ndarray],
+        ratios: List[Tuple[str, str]],
+        k: int = 10,
+        scale: Union[List[float], np.ndarray] = None,
+    ) -> pd.DataFrame:
+        """Find the grains with the most similar isotopic composition.
+
+        Grains are compared in the space of the given isotope ratios, where every
+        axis is divided by a scale, such that distances are in units of typical
+        uncertainties. Only grains of the current selection that have values for
+        all given ratios are considered. The search uses a KD-tree, which is built
+        once per set of ratios and selection.
+
+        Example:
+            >>> from pgdtools import pgd
+            >>> ratios = [("12C", "13C"), ("14N", "15N"), ("29Si", "28Si")]
+            >>> pgd.data.nearest([50, 300, 100], ratios, k=5)
+
+        :param composition: Values of the isotope ratios, in the order of `ratios`,
+            for one grain or, as a 2D array, for many grains (one row per grain).
+        :param ratios: Isotope ratios to compare. Each ratio is a tuple of two
+            strings, example: ("29Si", "28Si").
+        :param k: Number of grains to find.
+        :param scale: Scale of every axis. Defaults to the median uncertainty of
+            the respective ratio in the selection.
+
+        :return: For one grain, a DataFrame with the PGD IDs of the nearest grains as
+            index, the distance in the column "Distance", and the values of the
+            ratios. For many grains, a DataFrame with the query number and the rank
+            as index and the columns "PGD ID" and "Distance".
+
+        :raises ValueError: Composition does not match the ratios or no grain has
+            values for all ratios.
+        """
+        composition = np.asarray(composition, dtype=float)
+        single = composition.ndim == 1
+        composition = np.atleast_2d(composition)
+        if composition.ndim != 2 or composition.shape[1] != len(ratios):
+            raise ValueError("Composition must have one value per isotope ratio.")
+
+        tree, values, default_scale = self._tree(ratios)
+        if scale is None:
+            scale = default_scale
+        else:  # the cached tree is only valid for the default scale
+            scale = np.asarray(scale, dtype=float)
+            tree = _build_tree(values, scale)
+
+        k = min(k, len(values))
+        distances, positions = tree.query(composition / scale, k=k)
+        distances = np.reshape(distances, (len(composition), k))
+        positions = np.reshape(positions, (len(composition), k))
+
+        if single:
+            ret_frame = values.iloc[positions[0]].copy()
+            ret_frame.insert(0, "Distance", distances[0])
+            return ret_frame
+
+        index = pd.MultiIndex.from_product(
+            [range(len(composition)), range(k)], names=["Query", "Rank"]
+        )
+        return pd.DataFrame(
+            {
+                "PGD ID": values.index.to_numpy()[positions.ravel()],
+                "Distance": distances.ravel(),
+            },
+            index=index,
+        )
+
     def ratio(
-        self, rat: Tuple[str, str], dropnan: bool = True
+        self, rat: Tuple[str, str], dropnan: bool = True, delta: bool = None
     ) -> Tuple[
         pd.Series,
         pd.Series,
@@ -97,29 +183,37 @@ class Data:
     ]:
         """Retrieve a given isotope ratio from the database.
 
+        Isotope ratios that are not in the database are derived from the ones that
+        are, with propagated uncertainties, e.g., ("13C", "12C") from the 12C/13C
+        ratio. See `pgdtools.sub_tools.virtual` for details.
+
+        Example:
+            >>> from pgdtools import pgd
+            >>> d29si_d30si, unc_plus, unc_minus = pgd.data.ratio(("29Si", "30Si"))
+
         :param rat: Isotope ratio to retrieve. Tuple of two strings.
             Each string represents an isotope. Example: ("29Si", "28Si").
         :param dropnan: Drop rows with NaN values for the given isotope ratio.
             Defaults to `True`.
+        :param delta: Retrieve the delta value (`True`) or the isotope ratio
+            (`False`), converted with the solar isotope ratio if necessary.
+            By default, the ratio is returned as it is stored in the database.
 
         :return: Series with the isotope ratio.
+
+        :raises ValueError: Isotope ratio is not available and cannot be derived.
         """
         if len(rat) != 2:
             raise ValueError("Isotope ratio names must be a tuple of length 2.")
 
-        parent_header = self.parent._header(rat[0], rat[1])
+        parent_header = self.parent._header(rat[0], rat[1], delta)
         iso_rat, _ = parent_header.ratio
         iso_unc_none = parent_header.uncertainty
         iso_unc = [v for v in iso_unc_none if v is not None]
 
-        if iso_rat is None:
-            raise ValueError(
-                f"Isotope ratio {rat[0]}/{rat[1]} not available in the database."
-            )
-
         all_hdrs = [iso_rat] + iso_unc
 
-        df = self.parent.db[all_hdrs]
+        df = utl.dense(self.parent._gather(all_hdrs))
 
         if dropnan:
             df = df.dropna(how="all")
@@ -181,23 +275,16 @@ class Data:
                 is available but no values have been reported (i.e., entries are left
                 empty), these empties are replaced with 0 (no correlation).
         """
-        dat_x = self.ratio(rat_x, dropnan=False)
-        dat_y = self.ratio(rat_y, dropnan=False)
-
-        corr_header = self.parent._header(rat_x[0], rat_y[0]).correlation
-        corr_ser = self.parent.db[corr_header] if corr_header is not None else None
+        df = self.ratios([rat_x, rat_y])
+        iso_x = self.parent._header(rat_x[0], rat_x[1]).ratio[0]
+        iso_y = self.parent._header(rat_y[0], rat_y[1]).ratio[0]
+        corr_header = self.parent._correlation(rat_x, rat_y)
 
-        df = pd.DataFrame(dat_x + dat_y).transpose()
-        if corr_ser is not None:
-            df = df.join(corr_ser.fillna(0).to_frame())
-
-        df = df.dropna()
-
-        xdat = df.iloc[:, 0]
-        ydat = df.iloc[:, 3]
-        xunc = df.iloc[:, [1, 2]]
-        yunc = df.iloc[:, [4, 5]]
-        corr = None if corr_ser is None else df.iloc[:, 6]
+        xdat = df[iso_x]
+        ydat = df[iso_y]
+        xunc = df[[f"err+[{iso_x}]", f"err-[{iso_x}]"]]
+        yunc = df[[f"err+[{iso_y}]", f"err-[{iso_y}]"]]
+        corr = None if corr_header is None else df[corr_header]
 
         if simplify_unc:
             if xunc.iloc[:, 0].equals(xunc.iloc[:, 1]):
@@ -208,3 +295,371 @@ class Data:
                 yunc.name = yunc.name.replace("err-", "err")
 
         return xdat, xunc, ydat, yunc, corr
+
+    def ratios(
+        self, rats: List[Tuple[str, str]], corr: bool = True, as_numpy: bool = False
+    ) -> Union[pd.DataFrame, Tuple[np.ndarray, ...]]:
+        """Retrieve many isotope ratios, their uncertainties, and correlations at once.
+
+        All columns are gathered from the database at once and only grains that
+        have values and uncertainties for all ratios are returned, as in
+        `ratio_xy`. Asymmetric uncertainties are filled with the symmetric
+        uncertainty as in `ratio`. Correlation coefficients between two ratios are
+        looked up for the nominators of the ratios, missing values are replaced
+        with 0 (no correlation).
+
+        Example:
+            >>> from pgdtools import pgd
+            >>> rats = [("46Ti", "48Ti"), ("47Ti", "48Ti"), ("49Ti", "48Ti")]
+            >>> df = pgd.data.ratios(rats)
+
+        :param rats: Isotope ratios to retrieve. Each ratio is a tuple of two
+            strings, example: ("29Si", "28Si").
+        :param corr: Also return the correlation coefficients.
+        :param as_numpy: Return NumPy arrays instead of a DataFrame.
+
+        :return: By default, a DataFrame with the PGD ID as index and, for every
+            ratio, the columns `RATIO`, `err+[RATIO]`, and `err-[RATIO]`, where
+            `RATIO` is the header of the ratio in the database. Correlation
+            coefficients follow as columns named as in the database, for all pairs
+            of ratios for which they are available.
+            With `as_numpy=True`, a tuple of arrays is returned: PGD IDs of shape
+            (n,), values, positive, and negative uncertainties of shape (n, N), and,
+            if `corr=True`, correlation matrices of shape (n, N, N).
+        """
+        iso_rats = [self.parent._header(rat[0], rat[1]).ratio[0] for rat in rats]
+        iso_uncs = [self.parent._header(rat[0], rat[1]).uncertainty for rat in rats]
+        iso_corrs = {}
+        if corr:
+            for (it, rat_a), (jt, rat_b) in itertools.combinations(enumerate(rats), 2):
+                header = self.parent._correlation(rat_a, rat_b)
+                if header is not None:
+                    iso_corrs[(it, jt)] = header
+
+        columns = iso_rats + [hdr for unc in iso_uncs for hdr in unc if hdr]
+        columns += list(iso_corrs.values())
+        df = utl.dense(self.parent._gather(list(dict.fromkeys(columns))))
+
+        values = df[iso_rats].to_numpy(dtype=float, na_value=np.nan)
+        uncertainties = [utl.uncertainty_arrays(df, unc) for unc in iso_uncs]
+        unc_plus = np.column_stack([unc[0] for unc in uncertainties])
+        unc_minus = np.column_stack([unc[1] for unc in uncertainties])
+
+        valid = ~np.isnan(np.hstack([values, unc_plus, unc_minus])).any(axis=1)
+        values, unc_plus, unc_minus = values[valid], unc_plus[valid], unc_minus[valid]
+        index = df.index[valid]
+        rhos = {
+            pair: np.nan_to_num(
+                df[header].to_numpy(dtype=float, na_value=np.nan)[valid]
+            )
+            for pair, header in iso_corrs.items()
+        }
+
+        if as_numpy:
+            ret_arrays = (index.to_numpy(), values, unc_plus, unc_minus)
+            if not corr:
+                return ret_arrays
+            rho = np.zeros((len(index), len(rats), len(rats)))
+            rho[:, np.arange(len(rats)), np.arange(len(rats))] = 1
+            for (it, jt), rho_pair in rhos.items():
+                rho[:, it, jt] = rho[:, jt, it] = rho_pair
+            return ret_arrays + (rho,)
+
+        data = {}
+        for it, iso_rat in enumerate(iso_rats):
+            data[iso_rat] = values[:, it]
+            data[f"err+[{iso_rat}]"] = unc_plus[:, it]
+            data[f"err-[{iso_rat}]"] = unc_minus[:, it]
+        for pair, header in iso_corrs.items():
+            data[header] = rhos[pair]
+        return pd.DataFrame(data, index=index)
+
+    def resample(
+        self,
+        ratios: List[Tuple[str, str]],
+        n_draws: int = 1000,
+        seed: int = None,
+        chunk_size: int = None,
+    ) -> "pgdtools.sub_tools.resampling.Samples":
+        """Resample the isotope ratios of all grains within their uncertainties.
+
+        Samples are drawn from split-normal distributions with the positive and
+        negative uncertainties, correlated with the correlation coefficients of the
+        database, see `pgdtools.sub_tools.resampling`. Only grains with values and
+        uncertainties for all ratios are resampled, as in `ratios`.
+        The samples are generated in chunks of grains when they are iterated over
+        or reduced, e.g., to means, quantiles, or class frequencies.
+
+        Example:
+            >>> from pgdtools import pgd
+            >>> from pgdtools.sub_tools.resampling import Quantiles
+            >>> rats = [("29Si", "28Si"), ("30Si", "28Si")]
+            >>> samples = pgd.data.resample(rats, n_draws=10000, seed=42)
+            >>> quantiles = samples.reduce(Quantiles([0.025, 0.975]))
+
+        :param ratios: Isotope ratios to resample. Each ratio is a tuple of two
+            strings, example: ("29Si", "28Si").
+        :param n_draws: Number of samples per grain.
+        :param seed: Seed of the random number generator. The samples are
+            reproducible for the same seed and chunk size.
+        :param chunk_size: Number of grains per chunk, see `Samples`.
+
+        :return: Samples that are generated chunk by chunk.
+
+        :raises ValueError: No grain has values for all ratios.
+        """
+        ids, values, unc_plus, unc_minus, rho = self.ratios(ratios, as_numpy=True)
+        if len(ids) == 0:
+            raise ValueError("No grain in the selection has values for all ratios.")
+
+        headers = [self.parent._header(*rat).ratio[0] for rat in ratios]
+        return pgdtools.sub_tools.resampling.Samples(
+            ids, headers, values, unc_plus, unc_minus, rho, n_draws, seed, chunk_size
+        )
+
+    def _tree(self, ratios: List[Tuple[str, str]]) -> tuple:
+        """Get the KD-tree of the current selection for the given ratios.
+
+        Trees are cached in the parent class for the selection that they were
+        built for.
+
+        :param ratios: Isotope ratios that span the space of the tree.
+
+        :return: KD-tree, values of the grains in the tree, and the scale.
+
+        :raises ValueError: No grain has values for all ratios.
+        """
+        parent = self.parent
+        parent._apply_pending()
+        key = tuple(parent._header(*rat).ratio[0] for rat in ratios)
+        cached = parent._tree_cache.get(key)
+        if (
+            cached is not None
+            and cached[0] is parent._source
+            and cached[1] is parent._rows
+        ):
+            return cached[2:]
+
+        values = []
+        uncertainties = []
+        for rat in ratios:
+            ratio, unc_plus, unc_minus = self.ratio(rat, dropnan=False)
+            values.append(ratio)
+            uncertainties.append((unc_plus + unc_minus) / 2)
+        values = pd.concat(values, axis=1).dropna()
+        if values.empty:
+            raise ValueError("No grain in the selection has values for all ratios.")
+
+        scale = np.array([np.nanmedian(unc.loc[values.index]) for unc in uncertainties])
+        scale[~(scale > 0)] = 1  # no uncertainties available: do not scale
+        tree = _build_tree(values, scale)
+
+        if len(parent._tree_cache) >= MAX_CACHED_TREES:
+            parent._tree_cache.pop(next(iter(parent._tree_cache)))
+        parent._tree_cache[key] = (parent._source, parent._rows, tree, values, scale)
+        return tree, values, scale
+
+
+class Arrays:
+    """Retrieve data of the filtered database as NumPy arrays.
+
+    Columns are returned as contiguous float64 arrays. If no filter selected rows,
+    these are read-only views of the columns of the database, i.e., no data are
+    copied. Otherwise, the selected rows are copied out of the columns once.
+    Contrary to `Data`, no rows are dropped: All arrays have the length of the
+    current selection and the values are missing (NaN) where the returned validity
+    mask is `False`.
+
+    The arrays can also be handed off to other libraries without a copy via the
+    `table` method or the DataFrame interchange protocol, e.g., to polars:
+
+    Example:
+        >>> import polars as pl
+        >>> from pgdtools import pgd
+        >>> df = pl.from_dataframe(pgd.data.arrays)
+    """
+
+    def __init__(self, parent: "pgdtools.PresolarGrains") -> None:
+        """Initialize the Arrays class.
+
+        :param parent: Parent class, must be of type ``PresolarGrains``.
+
+        :raises TypeError: Parent class is not of type ``PresolarGrains``.
+        """
+        if not isinstance(parent, pgdtools.PresolarGrains):
+            raise TypeError("Parent class must be of type PresolarGrains.")
+
+        self.parent = parent
+
+    def __dataframe__(self, nan_as_null: bool = False, allow_copy: bool = True):
+        """Return the DataFrame interchange object of all numeric columns.
+
+        :param nan_as_null: Passed on to the interchange object of the Arrow table.
+        :param allow_copy: Passed on to the interchange object of the Arrow table.
+
+        :return: Interchange object, see `table` for the columns.
+        """
+        return self.table().__dataframe__(
+            nan_as_null=nan_as_null, allow_copy=allow_copy
+        )
+
+    # METHODS
+
+    def column(self, header: str) -> np.ndarray:
+        """Retrieve one numeric column of the filtered database.
+
+        :param header: Header of the column in the database or of a virtual column,
+            see `pgdtools.sub_tools.virtual`.
+
+        :return: Contiguous float64 array of the column, read-only if it is a view.
+        """
+        parent = self.parent
+        parent._apply_pending()
+        frame = parent._source if parent._frame is None else parent._frame
+        frame = parent._with_virtual(frame, [header])
+        values = utl.dense(frame[header]).to_numpy(dtype=np.float64)
+        if parent._frame is None and parent._rows is not None:
+            return values[parent._rows]
+        values = values.view()
+        values.flags.writeable = False
+        return values
+
+    def ratio(
+        self, rat: Tuple[str, str]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Retrieve a given isotope ratio and its uncertainties.
+
+        Asymmetric uncertainties are filled with the symmetric uncertainty as in
+        `Data.ratio`. If no asymmetric uncertainties are available, the positive and
+        negative uncertainties are the same array.
+
+        :param rat: Isotope ratio to retrieve. Tuple of two strings.
+            Each string represents an isotope. Example: ("29Si", "28Si").
+
+        :return: Values, positive uncertainties, negative uncertainties, and a
+            boolean mask that is `True` where a value is available.
+
+        :raises ValueError: Isotope ratio is not available in the database.
+        """
+        values, uncertainties = self._ratio(rat)
+        return values, uncertainties[0], uncertainties[1], ~np.isnan(values)
+
+    def ratio_xy(
+        self, rat_x: Tuple[str, str], rat_y: Tuple[str, str]
+    ) -> Tuple[np.ndarray, ...]:
+        """Retrieve two isotope ratios, their uncertainties, and their correlation.
+
+        :param rat_x: Isotope ratio for the x-axis. Tuple of two strings.
+        :param rat_y: Isotope ratio for the y-axis. Tuple of two strings.
+
+        :return: Values, positive, and negative uncertainties of `rat_x`, the same
+            for `rat_y`, the correlation coefficients (0 if not available), and a
+            boolean mask that is `True` where both values and all uncertainties are
+            available.
+
+        :raises ValueError: Isotope ratio is not available in the database.
+        """
+        xdat, xunc = self._ratio(rat_x)
+        ydat, yunc = self._ratio(rat_y)
+        corr_header = self.parent._correlation(rat_x, rat_y)
+        if corr_header is None:
+            corr = np.zeros_like(xdat)
+        else:
+            corr = np.nan_to_num(self.column(corr_header))
+
+        valid = ~np.isnan(np.vstack((xdat, ydat) + xunc + yunc)).any(axis=0)
+        return xdat, xunc[0], xunc[1], ydat, yunc[0], yunc[1], corr, valid
+
+    def size(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Retrieve the grain sizes in µm.
+
+        As in `Data.size_all`, `Size b` is set equal to `Size a` where it is not
+        available.
+
+        :return: Size a, size b, and a boolean mask that is `True` where a size is
+            available.
+        """
+        size_a = self.column("Size a (µm)")
+        size_b = self.column("Size b (µm)")
+        size_b = np.where(np.isnan(size_b), size_a, size_b)
+        return size_a, size_b, ~np.isnan(size_a)
+
+    def table(self, columns: List[str] = None):
+        """Retrieve columns of the filtered database as an Arrow table.
+
+        The numeric columns are wrapped without a copy, missing values stay NaN
+        and are not converted to nulls. The PGD IDs are added as the first column
+        "PGD ID". The table supports the DataFrame interchange protocol and can be
+        read by, e.g., polars or DuckDB without a copy.
+
+        :param columns: Numeric columns to get. Defaults to all float columns.
+
+        :return: Arrow table of type `pyarrow.Table`.
+
+        :raises ImportError: `pyarrow` is not installed.
+        """
+        if not pgdtools.db.cache.pyarrow_available():
+            raise ImportError(
+                "pyarrow is required for Arrow tables, install it with "
+                "`pip install pgdtools[cache]`."
+            )
+        import pyarrow as pa
+
+        if columns is None:
+            columns = [
+                col
+                for col, dtype in self.parent._source.dtypes.items()
+                if pd.api.types.is_float_dtype(getattr(dtype, "subtype", dtype))
+            ]
+
+        arrays = [pa.array(self.parent._index.to_numpy(dtype=str))]
+        arrays += [pa.array(self.column(col), from_pandas=False) for col in columns]
+        return pa.Table.from_arrays(arrays, names=["PGD ID"] + list(columns))
+
+    def _ratio(
+        self, rat: Tuple[str, str]
+    ) -> Tuple[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+        """Get the values and the positive and negative uncertainties of a ratio.
+
+        :param rat: Isotope ratio to retrieve. Tuple of two strings.
+
+        :return: Values and a tuple of the positive and negative uncertainties.
+
+        :raises ValueError: Isotope ratio is not available in the database.
+        """
+        if len(rat) != 2:
+            raise ValueError("Isotope ratio names must be a tuple of length 2.")
+
+        header = self.parent._header(rat[0], rat[1])
+        iso_rat = header.ratio[0]
+        if iso_rat is None:
+            raise ValueError(
+                f"Isotope ratio {rat[0]}/{rat[1]} not available in the database."
+            )
+
+        sym, plus, minus = (
+            None if hdr is None else self.column(hdr) for hdr in header.uncertainty
+        )
+        uncertainties = []
+        for unc in (plus, minus):
+            if unc is None:
+                uncertainties.append(sym)
+            elif sym is None:
+                uncertainties.append(unc)
+            else:
+                uncertainties.append(np.where(np.isnan(unc), sym, unc))
+        return self.column(iso_rat), tuple(uncertainties)
+
+
+def _build_tree(values: pd.DataFrame, scale: np.ndarray):
+    """Build a KD-tree of scaled values.
+
+    :param values: Values of the grains, one column per ratio.
+    :param scale: Scale of every column.
+
+    :return: KD-tree of type `scipy.spatial.cKDTree`.
+    """
+    # imported here, since scipy is slow to import and not needed otherwise
+    from scipy.spatial import cKDTree
+
+    return cKDTree(values.to_numpy(dtype=float) / scale)
@@ -1,15 +1,34 @@
 """Sub tool to add filtering capabilities."""
 
-from typing import List, Union, Tuple
+from contextlib import contextmanager
+import operator
+from typing import Callable, Dict, Iterator, List, Union, Tuple
+
+import numpy as np
+import pandas as pd
 
 import pgdtools
+import pgdtools.sub_tools.query
 import pgdtools.sub_tools.utilities as utl
 
+# vectorized comparison operators, keys are the valid comparators
+_COMPARATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
 
 class Filters:
     """Filtering class to filter the data set.
 
     Note that this class will filter the dataset in the parent class!
+
+    By default, every filter is applied immediately. Inside a `lazy()` context,
+    filters are only recorded and applied all at once when the data is accessed.
     """
 
     def __init__(self, parent: "pgdtools.PresolarGrains") -> None:
@@ -24,6 +43,24 @@ class Filters:
 
         self.parent = parent
 
+    def author_code(self, codes: Union[str, List[str]], exclude: bool = False) -> None:
+        """Filter the data set based on the author code in the PGD ID.
+
+        The author code is the third component of the PGD ID, e.g., "AMA" for the
+        grain `SiC-1992-AMA-000001`.
+
+        :param codes: Author code or codes to filter the data set on.
+        :param exclude: Exclude the given author codes from the data set.
+        """
+        if isinstance(codes, str):
+            codes = [codes]
+
+        def mask(df: pd.DataFrame) -> np.ndarray:
+            """Select grains with the given author codes."""
+            return self.parent._id_parts_of(df)["Author"].isin(codes).to_numpy()
+
+        self._apply(mask, exclude)
+
     def db(
         self,
         dbs: Union[
@@ -44,31 +81,29 @@ class Filters:
         if not all(isinstance(db, pgdtools.PresolarGrains.DataBase) for db in dbs):
             raise TypeError("Database must be of type PresolarGrains.DataBase.")
 
-        if exclude:
-            self.parent.db = self.parent.db[
-                ~self.parent.db.index.to_series().apply(
-                    lambda x: any(x.startswith(db.value) for db in dbs)
-                )
-            ]
-        else:
-            self.parent.db = self.parent.db[
-                self.parent.db.index.to_series().apply(
-                    lambda x: any(x.startswith(db.value) for db in dbs)
-                )
-            ]
+        values = [db.value for db in dbs]
+
+        def mask(df: pd.DataFrame) -> np.ndarray:
+            """Select grains in the given databases."""
+            return self.parent._id_parts_of(df)["Database"].isin(values).to_numpy()
+
+        self._apply(mask, exclude)
 
     def pgd_id(self, ids: Union[str, List[str]], exclude: bool = False) -> None:
         """Filter the data set based on PGD IDs.
 
+        Selected grains are returned in the order of the given IDs. This filter is
+        therefore always applied immediately, also in lazy mode.
+
         :param ids: PGD ID (single or multiple) to filter the data set on.
         :param exclude: Exclude the given IDs from the data set.
         """
         if isinstance(ids, str):
             ids = [ids]
         if exclude:
-            self.parent.db = self.parent.db[~self.parent.db.index.isin(ids)]
+            self._apply(lambda df: df.index.isin(ids), exclude)
         else:
-            self.parent.db = self.parent.db.loc[ids]
+            self.parent._select_ids(ids)
 
     def pgd_type(self, tp: Union[str, List[str]], exclude: bool = False) -> None:
         """Filter for a given PGD type or types.
@@ -88,8 +123,38 @@ class Filters:
         """
         self._filter_column("PGD Subtype", st, exclude)
 
+    def query(self, expr: str) -> Dict[str, Union[str, List[str]]]:
+        """Filter the data set with a query expression.
+
+        The whole expression is evaluated as one vectorized mask, which is faster
+        than chaining the individual filters. Isotope ratios and other columns are
+        written as in the database header. See `pgdtools.sub_tools.query` for the
+        full syntax.
+
+        Example:
+            >>> from pgdtools import pgd
+            >>> pgd.filter.query(
+            >>>     "PGD Type == 'X' and d(29Si/28Si) between -500 and 0 "
+            >>>     "and err(d(29Si/28Si)) < 50"
+            >>> )
+
+        :param expr: Query expression.
+
+        :return: Columns that the terms of the expression were resolved to.
+
+        :raises ValueError: Invalid expression or term not found in the database.
+        """
+        query = pgdtools.sub_tools.query.Query(self.parent, expr)
+        self._apply(query.mask)
+        return query.resolved
+
     def ratio(
-        self, rat: Tuple[str, str], cmp: str, value: float, exclude: bool = False
+        self,
+        rat: Tuple[str, str],
+        cmp: str,
+        value: float,
+        exclude: bool = False,
+        delta: bool = None,
     ) -> None:
         """Filter the data set based on a given isotope ratio.
 
@@ -106,22 +171,46 @@ class Filters:
             "<", "<=", ">", ">=", "==", "!=".
         :param value: Value to compare the isotope ratio against.
         :param exclude: Exclude the given isotope ratio value range from the data set.
+        :param delta: Compare the delta value (`True`) or the isotope ratio
+            (`False`), see `pgd.data.ratio`. By default, the ratio is compared as it
+            is stored in the database.
         """
-        cmp = _check_comparator(cmp)
+        compare = _COMPARATORS[_check_comparator(cmp)]
         utl.check_iso_rat(rat)
-        iso_rat = self.parent._header(rat[0], rat[1]).ratio
-
-        # drop rows with NaN values for the given isotope ratio
-        self.parent.db.dropna(subset=[iso_rat[0]], inplace=True)
-
-        if exclude:
-            self.parent.db = self.parent.db[
-                ~self.parent.db[iso_rat[0]].apply(lambda x: eval(f"x {cmp} {value}"))
-            ]
-        else:
-            self.parent.db = self.parent.db[
-                self.parent.db[iso_rat[0]].apply(lambda x: eval(f"x {cmp} {value}"))
-            ]
+        iso_rat = self.parent._header(rat[0], rat[1], delta).ratio
+
+        def mask(df: pd.DataFrame) -> np.ndarray:
+            """Select grains by ratio, rows with NaN values are always dropped."""
+            df = self.parent._with_virtual(df, [iso_rat[0]])
+            values = df[iso_rat[0]].to_numpy()
+            return ~np.isnan(values) & (compare(values, value) != exclude)
+
+        self._apply(mask)
+
+    @contextmanager
+    def lazy(self) -> Iterator[None]:
+        """Record filters and apply them all at once when the data is accessed.
+
+        Inside this context, filters are not applied to the database immediately.
+        Instead, their boolean masks are stored and combined into a single mask,
+        such that the database is only sliced once, namely the next time it is
+        accessed, e.g., via `pgd.data`, `pgd.info`, `pgd.reference`, `pgd.db`, or
+        by iterating over the grains. Pending filters are kept when the context
+        is left.
+
+        Example:
+            >>> from pgdtools import pgd
+            >>> with pgd.filter.lazy():
+            >>>     pgd.filter.db(pgd.DataBase.SiC)
+            >>>     pgd.filter.pgd_type("X")
+            >>>     pgd.filter.ratio(("12C", "13C"), "<", 50)
+            >>> ratios = pgd.data.ratio(("12C", "13C"))  # filters applied here
+        """
+        self.parent._lazy += 1
+        try:
+            yield
+        finally:
+            self.parent._lazy -= 1
 
     def reference(self, refs: Union[str, List[str]], exclude=False) -> None:
         """Filter the data set based on (a) given reference(s).
@@ -135,6 +224,138 @@ class Filters:
         """
         self._filter_column("Reference", refs, exclude=exclude)
 
+    def region2d(
+        self,
+        rat_x: Tuple[str, str],
+        rat_y: Tuple[str, str],
+        shape: Union[Tuple[float, float], List[Tuple[float, float]]],
+        n_sigma: float = 2,
+        width: float = 0,
+        within: bool = False,
+        exclude: bool = False,
+    ) -> None:
+        """Filter grains by the position of their error ellipse in a 2D plot.
+
+        The error ellipse of every grain is given by its uncertainties in x and y,
+        scaled by `n_sigma`, and the correlation coefficient between the two
+        ratios (0 if not available), as returned by `pgd.data.ratio_xy`.
+        By default, grains whose ellipse intersects the shape are selected,
+        with `within=True` only grains whose ellipse lies completely within it.
+        For asymmetric uncertainties, the side facing the shape is used.
+
+        The shape is either a line or a polygon:
+        - Line: Tuple `(intercept, slope)` of the line `y = intercept + slope * x`.
+          If `width` is given, the line is widened to the band of all points with
+          a vertical distance of at most `width` from the line.
+        - Polygon: List of (x, y) vertices.
+
+        Note: rows without values or uncertainties for either ratio are dropped
+        from the dataset before filtering. This behavior is independent of the
+        value of `exclude`.
+
+        Example:
+            >>> from pgdtools import pgd
+            >>> mainstream = (-19, 1.342)  # d29Si versus d30Si
+            >>> pgd.filter.region2d(("30Si", "28Si"), ("29Si", "28Si"), mainstream)
+
+        :param rat_x: Isotope ratio on the x-axis. Tuple of two strings.
+            Each string represents an isotope. Example: ("30Si", "28Si").
+        :param rat_y: Isotope ratio on the y-axis. Tuple of two strings.
+        :param shape: Line as `(intercept, slope)` or polygon as list of vertices.
+        :param n_sigma: Size of the error ellipse in standard deviations.
+        :param width: Half width of the band around a line, in units of y.
+        :param within: Select grains whose error ellipse lies within the shape
+            instead of grains whose error ellipse intersects it.
+        :param exclude: Exclude the selected grains from the data set.
+
+        :raises ValueError: The shape is neither a line nor a polygon.
+        """
+        shape = np.asarray(shape, dtype=float)
+        if shape.shape != (2,) and (shape.ndim != 2 or shape.shape[1:] != (2,)):
+            raise ValueError("Shape must be (intercept, slope) or a list of vertices.")
+        if shape.ndim == 2 and len(shape) < 3:
+            raise ValueError("A polygon must have at least three vertices.")
+
+        utl.check_iso_rat(rat_x)
+        utl.check_iso_rat(rat_y)
+        header_x = self.parent._header(rat_x[0], rat_x[1])
+        header_y = self.parent._header(rat_y[0], rat_y[1])
+        iso_corr = self.parent._correlation(rat_x, rat_y)
+        columns = [header_x.ratio[0], header_y.ratio[0], iso_corr]
+        columns += header_x.uncertainty + header_y.uncertainty
+
+        def mask(df: pd.DataFrame) -> np.ndarray:
+            """Select grains by the position of their error ellipse."""
+            df = self.parent._with_virtual(df, [col for col in columns if col])
+            xval = utl.dense(df[header_x.ratio[0]]).to_numpy(float, na_value=np.nan)
+            yval = utl.dense(df[header_y.ratio[0]]).to_numpy(float, na_value=np.nan)
+            xunc = utl.uncertainty_arrays(df, header_x.uncertainty)
+            yunc = utl.uncertainty_arrays(df, header_y.uncertainty)
+            rho = np.zeros(len(df))
+            if iso_corr is not None:
+                rho = utl.dense(df[iso_corr]).to_numpy(float, na_value=np.nan)
+                rho = np.nan_to_num(rho)
+
+            valid = ~np.isnan(np.stack([xval, yval, *xunc, *yunc])).any(axis=0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                if shape.ndim == 1:
+                    selected = _ellipse_band(
+                        xval, xunc, yval, yunc, rho, shape, width, n_sigma, within
+                    )
+                else:
+                    selected = _ellipse_polygon(
+                        xval, xunc, yval, yunc, rho, shape, n_sigma, within
+                    )
+            return valid & (selected != exclude)
+
+        self._apply(mask)
+
+    def relative_uncertainty(
+        self, rat: Tuple[str, str], cmp: str, value: float, exclude: bool = False
+    ) -> None:
+        """Filter the data set based on the relative uncertainty of an isotope ratio.
+
+        The relative uncertainty is the uncertainty divided by the absolute value of
+        the ratio. For delta values, the relative uncertainty of the underlying
+        ratio is used, i.e., the uncertainty divided by `|delta + 1000|`.
+        For asymmetric uncertainties, both sides must fulfill the condition (or,
+        with `exclude`, none of them), as in the `uncertainty` filter.
+
+        Note: rows without a value or without an uncertainty for the given ratio
+        will be dropped from the dataset before filtering. This behavior is
+        independent of the value of `exclude`.
+
+        :param rat: Isotope ratio to filter the data set on. Tuple of two strings.
+            Each string represents an isotope. Example: ("29Si", "28Si").
+        :param cmp: Comparison operator to use. Available operators are:
+            "<", "<=", ">", ">=", "==", "!=".
+        :param value: Value to compare the relative uncertainty against, e.g., 0.05
+            for 5%.
+        :param exclude: Exclude the given relative uncertainty range from the
+            data set.
+        """
+        compare = _COMPARATORS[_check_comparator(cmp)]
+        utl.check_iso_rat(rat)
+        header = self.parent._header(rat[0], rat[1])
+        (iso_rat, delta), iso_unc = header.ratio, header.uncertainty
+        columns = [iso_rat] + [col for col in iso_unc if col]
+
+        def mask(df: pd.DataFrame) -> np.ndarray:
+            """Select grains by relative uncertainty, drop rows without values."""
+            df = self.parent._with_virtual(df, columns)
+            values = utl.dense(df[iso_rat]).to_numpy(dtype=float, na_value=np.nan)
+            if delta:
+                values = values + 1000.0
+            unc_plus, unc_minus = utl.uncertainty_arrays(df, iso_unc)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                relative = np.stack([unc_plus, unc_minus]) / np.abs(values)
+
+            number_of_matches = compare(relative, value).sum(axis=0)
+            selected = number_of_matches == (0 if exclude else 2)
+            return ~np.isnan(relative).any(axis=0) & selected
+
+        self._apply(mask)
+
     def reset(self) -> None:
         """Reset all the filters and re-instate the original database.
 
@@ -143,6 +364,75 @@ class Filters:
         """
         self.parent.reset()
 
+    def significance(
+        self,
+        rat: Tuple[str, str],
+        n_sigma: float,
+        reference: float = 0,
+        exclude: bool = False,
+    ) -> None:
+        """Filter for grains whose isotope ratio differs significantly from a reference.
+
+        A grain is selected if its value differs from the reference by more than
+        `n_sigma` times its uncertainty. For asymmetric uncertainties, the side that
+        faces the reference is used, i.e., the negative uncertainty for values
+        above the reference and the positive uncertainty for values below.
+
+        Note: rows without a value or without an uncertainty for the given ratio
+        will be dropped from the dataset before filtering. This behavior is
+        independent of the value of `exclude`.
+
+        Example:
+            >>> from pgdtools import pgd
+            >>> pgd.filter.significance(("29Si", "28Si"), 3)  # 3 sigma from solar
+
+        :param rat: Isotope ratio to filter the data set on. Tuple of two strings.
+            Each string represents an isotope. Example: ("29Si", "28Si").
+        :param n_sigma: Number of standard deviations the value must differ by.
+        :param reference: Reference value, defaults to 0, i.e., solar for delta
+            values. For isotope ratios, the reference ratio must be given.
+        :param exclude: Exclude the significantly different grains, i.e., select
+            the grains that agree with the reference within `n_sigma`.
+        """
+        utl.check_iso_rat(rat)
+        header = self.parent._header(rat[0], rat[1])
+        iso_rat, iso_unc = header.ratio[0], header.uncertainty
+        columns = [iso_rat] + [col for col in iso_unc if col]
+
+        def mask(df: pd.DataFrame) -> np.ndarray:
+            """Select significant grains, rows without values are always dropped."""
+            df = self.parent._with_virtual(df, columns)
+            values = utl.dense(df[iso_rat]).to_numpy(dtype=float, na_value=np.nan)
+            unc_plus, unc_minus = utl.uncertainty_arrays(df, iso_unc)
+            deviation = values - reference
+            unc = np.where(deviation > 0, unc_minus, unc_plus)
+
+            selected = np.abs(deviation) > n_sigma * unc
+            return ~np.isnan(deviation) & ~np.isnan(unc) & (selected != exclude)
+
+        self._apply(mask)
+
+    def technique(self, techs: Union[str, List[str]], exclude: bool = False) -> None:
+        """Filter the data set based on (a) given technique(s).
+
+        Grains that were measured with multiple techniques are selected if any of
+        their techniques is given. The techniques must be the PGD Technique keys,
+        see `pgd.technique.dict`, e.g., "WU NanoSIMS".
+
+        :param techs: Technique or techniques to filter the data set on.
+        :param exclude: Exclude grains measured with any of the given techniques.
+        """
+        if isinstance(techs, str):
+            techs = [techs]
+
+        def mask(df: pd.DataFrame) -> np.ndarray:
+            """Select grains measured with any of the given techniques."""
+            keys = self.parent._technique_entries(df)
+            found = keys.isin(techs).to_numpy()
+            return np.bincount(keys.index, weights=found, minlength=len(df)) > 0
+
+        self._apply(mask, exclude)
+
     def uncertainty(
         self, rat: Tuple[str, str], cmp: str, value: float, exclude: bool = False
     ) -> None:
@@ -166,33 +456,50 @@ class Filters:
             isotope ratio names are not valid, not of length 2, or the chosen
             isotope ratio is not available in the database.
         """
-        cmp = _check_comparator(cmp)
+        compare = _COMPARATORS[_check_comparator(cmp)]
         utl.check_iso_rat(rat)
         iso_unc = self.parent._header(rat[0], rat[1]).uncertainty
 
         iso_unc = [v for v in iso_unc if v is not None]
 
-        # drop rows with NaN values for the given isotope ratio
-        self.parent.db.dropna(subset=iso_unc, how="all", inplace=True)
+        def mask(df: pd.DataFrame) -> np.ndarray:
+            """Select grains by uncertainty, rows without values are always dropped."""
+            values = self.parent._with_virtual(df, iso_unc)[iso_unc].to_numpy()
+            number_of_values = (~np.isnan(values)).sum(axis=1)
+            number_of_matches = compare(values, value).sum(axis=1)
 
-        number_of_values = (~self.parent.db[iso_unc].isna()).sum(axis=1)
+            if exclude:
+                selected = number_of_matches == 0
+            else:
+                selected = number_of_matches == number_of_values
+            return (number_of_values > 0) & selected
 
-        if exclude:
-            self.parent.db = self.parent.db[
-                ~(
-                    self.parent.db[iso_unc]
-                    .apply(lambda x: eval(f"x {cmp} {value}"))
-                    .sum(axis=1)
-                    > 0
-                )
-            ]
-        else:
-            self.parent.db = self.parent.db[
-                self.parent.db[iso_unc]
-                .apply(lambda x: eval(f"x {cmp} {value}"))
-                .sum(axis=1)
-                == number_of_values
-            ]
+        self._apply(mask)
+
+    def year(self, first: int, last: int = None, exclude: bool = False) -> None:
+        """Filter the data set based on the publication year in the PGD ID.
+
+        The year is the second component of the PGD ID, e.g., 1992 for the grain
+        `SiC-1992-AMA-000001`. Unpublished data have the year 0.
+
+        Note: Grains whose PGD ID contains no year are dropped from the dataset.
+        This behavior is independent of the value of `exclude`.
+
+        :param first: First year to select.
+        :param last: Last year to select (inclusive). If not given, only grains
+            from the year `first` are selected.
+        :param exclude: Exclude the given range of years from the data set.
+        """
+        if last is None:
+            last = first
+
+        def mask(df: pd.DataFrame) -> np.ndarray:
+            """Select grains by year, grains without year are always dropped."""
+            years = self.parent._id_parts_of(df)["Year"]
+            selected = years.between(first, last).to_numpy(dtype=bool, na_value=False)
+            return years.notna().to_numpy() & (selected != exclude)
+
+        self._apply(mask)
 
     def _filter_column(
         self, column: str, value: Union[str, List[str]], exclude: bool
@@ -205,10 +512,23 @@ class Filters:
         """
         if isinstance(value, str):
             value = [value]
+        self._apply(lambda df: df[column].isin(value), exclude)
+
+    def _apply(
+        self,
+        mask: Callable[[pd.DataFrame], Union[np.ndarray, pd.Series]],
+        exclude: bool = False,
+    ) -> None:
+        """Apply a filter to the parent, respecting the lazy mode.
+
+        :param mask: Function that returns a boolean mask of the grains to select
+            for a given database.
+        :param exclude: Invert the mask, i.e., exclude the selected grains.
+        """
         if exclude:
-            self.parent.db = self.parent.db[~self.parent.db[column].isin(value)]
+            self.parent._apply_mask(lambda df: ~np.asarray(mask(df), dtype=bool))
         else:
-            self.parent.db = self.parent.db[self.parent.db[column].isin(value)]
+            self.parent._apply_mask(mask)
 
 
 def _check_comparator(cmp: str) -> Union[str, None]:
@@ -222,7 +542,7 @@ def _check_comparator(cmp: str) -> Union[str, None]:
 
     :raises ValueError: Invalid comparator.
     """
-    if cmp in ("<", "<=", ">", ">=", "==", "!="):
+    if cmp in _COMPARATORS:
         return cmp
     elif cmp == "=":
         return "=="
@@ -234,3 +554,127 @@ def _check_comparator(cmp: str) -> Union[str, None]:
         return "<="
     else:
         raise ValueError("Invalid comparator. Please use one of: <, <=, >, >=, ==, !=")
+
+
+def _ellipse_band(
+    xval: np.ndarray,
+    xunc: Tuple[np.ndarray, np.ndarray],
+    yval: np.ndarray,
+    yunc: Tuple[np.ndarray, np.ndarray],
+    rho: np.ndarray,
+    line: np.ndarray,
+    width: float,
+    n_sigma: float,
+    within: bool,
+) -> np.ndarray:
+    """Check if error ellipses intersect or lie within a band around a line.
+
+    The vertical distance `d = y - intercept - slope * x` of the points of an
+    error ellipse ranges from `d - n_sigma * sigma_down` to `d + n_sigma * sigma_up`,
+    where sigma is the uncertainty of `d` towards the respective side.
+
+    :param xval: X values.
+    :param xunc: Positive and negative uncertainties of the x values.
+    :param yval: Y values.
+    :param yunc: Positive and negative uncertainties of the y values.
+    :param rho: Correlation coefficients between x and y.
+    :param line: Intercept and slope of the line.
+    :param width: Half width of the band (vertical distance).
+    :param n_sigma: Size of the error ellipses in standard deviations.
+    :param within: Check if the ellipses lie within the band, otherwise if they
+        intersect it.
+
+    :return: Boolean array, True for ellipses that fulfill the condition.
+    """
+    intercept, slope = line
+    dist = yval - intercept - slope * xval
+
+    def sigma(unc_x: np.ndarray, unc_y: np.ndarray) -> np.ndarray:
+        """Uncertainty of the vertical distance, see `classify._probability_slope`."""
+        return np.sqrt(unc_y**2 + slope**2 * unc_x**2 - 2 * slope * unc_x * unc_y * rho)
+
+    # the vertical distance increases towards larger y and, for slope > 0, smaller x
+    sigma_up = sigma(xunc[1] if slope > 0 else xunc[0], yunc[0])
+    sigma_down = sigma(xunc[0] if slope > 0 else xunc[1], yunc[1])
+    upper = dist + n_sigma * sigma_up
+    lower = dist - n_sigma * sigma_down
+
+    if within:
+        return (upper <= width) & (lower >= -width)
+    return (lower <= width) & (upper >= -width)
+
+
+def _ellipse_polygon(
+    xval: np.ndarray,
+    xunc: Tuple[np.ndarray, np.ndarray],
+    yval: np.ndarray,
+    yunc: Tuple[np.ndarray, np.ndarray],
+    rho: np.ndarray,
+    vertices: np.ndarray,
+    n_sigma: float,
+    within: bool,
+) -> np.ndarray:
+    """Check if error ellipses intersect or lie within a polygon.
+
+    An ellipse intersects the polygon if its center lies inside or if the
+    Mahalanobis distance from its center to an edge is at most `n_sigma`. It lies
+    within the polygon if its center lies inside and the distance to all edges is
+    larger than `n_sigma`. All grains and edges are computed at once.
+
+    For asymmetric uncertainties, the closest point on every edge is first
+    determined with the mean uncertainties. The distance is then calculated with
+    the uncertainties of the side that faces this point.
+
+    :param xval: X values.
+    :param xunc: Positive and negative uncertainties of the x values.
+    :param yval: Y values.
+    :param yunc: Positive and negative uncertainties of the y values.
+    :param rho: Correlation coefficients between x and y.
+    :param vertices: Vertices of the polygon, shape (number of vertices, 2).
+    :param n_sigma: Size of the error ellipses in standard deviations.
+    :param within: Check if the ellipses lie within the polygon, otherwise if they
+        intersect it.
+
+    :return: Boolean array, True for ellipses that fulfill the condition.
+    """
+    # grains along the first axis, edges along the second axis
+    start = vertices[np.newaxis, :, :]
+    edge = np.roll(vertices, -1, axis=0)[np.newaxis, :, :] - start
+    offset = start - np.stack([xval, yval], axis=-1)[:, np.newaxis, :]
+    rho = rho[:, np.newaxis]
+
+    def closest(unc_x: np.ndarray, unc_y: np.ndarray) -> Tuple[np.ndarray, ...]:
+        """Vector to the closest point on every edge and its Mahalanobis distance."""
+
+        def norm(vec: np.ndarray, other: np.ndarray) -> np.ndarray:
+            """Scalar product in the metric of the inverse covariance matrix."""
+            return (
+                vec[..., 0] * other[..., 0] / unc_x**2
+                + vec[..., 1] * other[..., 1] / unc_y**2
+                - rho
+                * (vec[..., 0] * other[..., 1] + vec[..., 1] * other[..., 0])
+                / (unc_x * unc_y)
+            ) / (1 - rho**2)
+
+        param = np.clip(-norm(offset, edge) / norm(edge, edge), 0, 1)
+        vec = offset + param[..., np.newaxis] * edge
+        return vec, np.sqrt(norm(vec, vec))
+
+    mean_x = ((xunc[0] + xunc[1]) / 2)[:, np.newaxis]
+    mean_y = ((yunc[0] + yunc[1]) / 2)[:, np.newaxis]
+    vec, _ = closest(mean_x, mean_y)
+    unc_x = np.where(vec[..., 0] > 0, xunc[0][:, np.newaxis], xunc[1][:, np.newaxis])
+    unc_y = np.where(vec[..., 1] > 0, yunc[0][:, np.newaxis], yunc[1][:, np.newaxis])
+    _, dist = closest(unc_x, unc_y)
+    dist_min = dist.min(axis=1)
+
+    # point in polygon: count crossings of a ray from the center towards +x
+    end = offset + edge
+    crosses = (offset[..., 1] > 0) != (end[..., 1] > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_cross = offset[..., 0] - offset[..., 1] * edge[..., 0] / edge[..., 1]
+    inside = (crosses & (x_cross > 0)).sum(axis=1) % 2 == 1
+
+    if within:
+        return inside & (dist_min > n_sigma)
+    return inside | (dist_min <= n_sigma)
@@ -1,20 +1,43 @@
 """Sub tool to search the header for information."""
 
-from typing import List, Tuple, Union
+import re
+from typing import Dict, Iterable, List, Tuple, Union
 
 import pgdtools
 import pgdtools.sub_tools.utilities as utl
+import pgdtools.sub_tools.virtual
+
+# isotope as written in the database header, e.g., "29Si"
+_ISO = r"(\d+[A-Z][a-z]?)"
+
+# header patterns: ratio or delta value, uncertainty, and correlation coefficient
+_RATIO_RE = re.compile(rf"^(d\()?{_ISO}/{_ISO}(?(1)\))$")
+_UNCERTAINTY_RE = re.compile(rf"^err([+-]?)\[(d\()?{_ISO}/{_ISO}(?(2)\))\]$")
+_CORRELATION_RE = re.compile(rf"^rho\[{_ISO}-{_ISO}\]$")
 
 
 class Headers:
-    """Class to search all header information for an isotope ratio."""
+    """Class to search all header information for an isotope ratio.
 
-    def __init__(self, parent: "pgdtools.PresolarGrains", iso1: str, iso2: str) -> None:
+    Isotope ratios that are not stored in the database are derived from the stored
+    ones if possible, see `pgdtools.sub_tools.virtual`. Their headers are the names
+    of virtual columns.
+    """
+
+    def __init__(
+        self,
+        parent: "pgdtools.PresolarGrains",
+        iso1: str,
+        iso2: str,
+        delta: bool = None,
+    ) -> None:
         """Initialize the SearchHeader class.
 
         :param parent: Parent class, must be of type ``PresolarGrains``.
         :param iso1: Isotope 1 (nominator).
         :param iso2: Isotope 2 (denominator).
+        :param delta: Search for the delta value (`True`) or the isotope ratio
+            (`False`). By default, the one stored in the database is used.
 
         :raises TypeError: Parent class is not of type ``PresolarGrains``.
         """
@@ -24,6 +47,7 @@ class Headers:
         self.parent = parent
         self.iso1 = utl.Isotope(iso1)
         self.iso2 = utl.Isotope(iso2)
+        self.delta = delta
 
     @property
     def correlation(self) -> Union[None, str]:
@@ -33,8 +57,7 @@ class Headers:
 
         :return: Header information for the given isotope correlation.
         """
-        search_str = f"rho[{self.iso1}-{self.iso2}]"
-        return search_str if search_str in self.parent.db.columns else None
+        return self.parent._schema.correlations.get(self._key)
 
     @property
     def ratio(self) -> Tuple[str, bool]:
@@ -46,18 +69,17 @@ class Headers:
 
         :raise ValueError: Isotope ratio not found in header.
         """
-        iso_rat = self._iso_ratio
-        hdrs = [hdr for hdr in self.parent.db.columns if iso_rat in hdr]
-        hdr = None
-        for hdr in hdrs:
-            if "err" not in hdr and "rho" not in hdr:
-                break
-
-        if hdr is None:
-            raise ValueError(f"Isotope ratio {iso_rat} not found in header.")
-        else:
-            delta = True if hdr.lower().startswith("d") else False
-            return hdr, delta
+        stored = self._stored
+        if stored is not None:
+            return stored
+
+        virtual = self._virtual
+        if virtual is None:
+            raise ValueError(
+                f"Isotope ratio {self._iso_ratio} not found in header and cannot be "
+                f"derived from other isotope ratios."
+            )
+        return virtual.header, virtual.delta
 
     @property
     def uncertainty(self) -> List[Union[str, None]]:
@@ -72,24 +94,18 @@ class Headers:
 
         :raise ValueError: No uncertainties found.
         """
-        iso_rat = self._iso_ratio
-        hdrs = [hdr for hdr in self.parent.db.columns if iso_rat in hdr]
-        return_hdr = [None, None, None]
-
-        for hdr in hdrs:
-            if "err[" in hdr:
-                return_hdr[0] = hdr
-            elif "err+[" in hdr:
-                return_hdr[1] = hdr
-            elif "err-[" in hdr:
-                return_hdr[2] = hdr
-
-        if all(v is None for v in return_hdr):
+        if self._stored is not None:
+            return_hdr = self.parent._schema.uncertainties.get(self._key)
+        else:
+            virtual = self._virtual
+            return_hdr = None if virtual is None else virtual.uncertainty
+
+        if return_hdr is None:
             raise ValueError(
-                f"No uncertainties found in header for isotope ratio {iso_rat}."
+                f"No uncertainties found in header for isotope ratio {self._iso_ratio}."
             )
 
-        return return_hdr
+        return list(return_hdr)
 
     @property
     def _iso_ratio(self) -> str:
@@ -101,3 +117,140 @@ class Headers:
         :return: Correct formatting for finding given isotope ratio.
         """
         return f"{self.iso1}/{self.iso2}"
+
+    @property
+    def _key(self) -> Tuple[str, str]:
+        """Key of the isotope ratio in the header schema.
+
+        :return: Tuple of the nominator and denominator isotope.
+        """
+        return str(self.iso1), str(self.iso2)
+
+    @property
+    def _stored(self) -> Union[Tuple[str, bool], None]:
+        """Header of the isotope ratio if it is stored in the requested form.
+
+        :return: Name and bool if delta, None if not stored.
+        """
+        stored = self.parent._schema.ratios.get(self._key)
+        if stored is None or self.delta not in (None, stored[1]):
+            return None
+        return stored
+
+    @property
+    def _virtual(self) -> Union["pgdtools.sub_tools.virtual.VirtualRatio", None]:
+        """Virtual isotope ratio that is derived from the stored ones.
+
+        :return: Virtual ratio or None if it cannot be derived.
+        """
+        return self.parent._schema.virtual_ratio(*self._key, self.delta)
+
+
+class HeaderSchema:
+    """Parsed header of a database for fast lookups of isotope ratio columns.
+
+    All columns are parsed once when the schema is created. Columns that are not
+    isotope ratios, delta values, uncertainties, or correlation coefficients are
+    ignored. All lookups are done with isotopes formatted as in the database header,
+    e.g., "29Si", or with element symbols, e.g., "Si".
+    """
+
+    def __init__(self, columns: Iterable[str]) -> None:
+        """Initialize the header schema.
+
+        :param columns: Column names of the database.
+        """
+        # (iso1, iso2) -> (header, delta)
+        self.ratios: Dict[Tuple[str, str], Tuple[str, bool]] = {}
+        # (iso1, iso2) -> [symmetric, asymmetric (+), asymmetric (-)]
+        self.uncertainties: Dict[Tuple[str, str], List[Union[str, None]]] = {}
+        # (iso1, iso2) -> header, stored for both orders of the isotopes
+        self.correlations: Dict[Tuple[str, str], str] = {}
+
+        # isotope or element -> ratios / correlations, in the order of the columns
+        self._ratios_by_iso: Dict[str, List[Tuple[str, bool]]] = {}
+        self._correlations_by_iso: Dict[str, List[str]] = {}
+
+        # virtual column name -> virtual ratio, for all ratios derived so far
+        self.virtual: Dict[str, "pgdtools.sub_tools.virtual.VirtualRatio"] = {}
+        # (iso1, iso2, delta) -> virtual ratio or None if it cannot be derived
+        self._virtual_ratios: Dict[tuple, object] = {}
+
+        for column in columns:
+            self._parse(column)
+
+    def correlations_with(self, iso: str) -> List[str]:
+        """Get all correlation headers that contain a given isotope or element.
+
+        :param iso: Isotope, e.g., "29Si", or element, e.g., "Si".
+
+        :return: Correlation headers, empty if none are found.
+        """
+        return list(self._correlations_by_iso.get(iso, []))
+
+    def ratios_with(self, iso: str) -> List[Tuple[str, bool]]:
+        """Get all isotope ratio headers that contain a given isotope or element.
+
+        :param iso: Isotope, e.g., "29Si", or element, e.g., "Si".
+
+        :return: Tuples of isotope ratio header and if it is a delta value,
+            empty if none are found.
+        """
+        return list(self._ratios_by_iso.get(iso, []))
+
+    def virtual_ratio(
+        self, iso1: str, iso2: str, delta: bool = None
+    ) -> Union["pgdtools.sub_tools.virtual.VirtualRatio", None]:
+        """Get an isotope ratio that is derived from the stored isotope ratios.
+
+        Derived ratios are resolved once and their columns are registered in
+        `virtual`.
+
+        :param iso1: Isotope 1 (nominator), formatted as in the database.
+        :param iso2: Isotope 2 (denominator), formatted as in the database.
+        :param delta: Derive a delta value or an isotope ratio, see
+            `pgdtools.sub_tools.virtual.resolve`.
+
+        :return: Virtual ratio or None if it cannot be derived.
+        """
+        key = (iso1, iso2, delta)
+        if key not in self._virtual_ratios:
+            ratio = pgdtools.sub_tools.virtual.resolve(self, iso1, iso2, delta)
+            self._virtual_ratios[key] = ratio
+            if ratio is not None:
+                self.virtual.update(dict.fromkeys(ratio.columns, ratio))
+        return self._virtual_ratios[key]
+
+    def _parse(self, column: str) -> None:
+        """Parse a column name and add it to the schema.
+
+        :param column: Column name.
+        """
+        if match := _RATIO_RE.match(column):
+            delta, iso1, iso2 = match.groups()
+            ratio = (column, delta is not None)
+            self.ratios[(iso1, iso2)] = ratio
+            for key in _lookup_keys(iso1, iso2):
+                self._ratios_by_iso.setdefault(key, []).append(ratio)
+        elif match := _UNCERTAINTY_RE.match(column):
+            sign, _, iso1, iso2 = match.groups()
+            uncertainties = self.uncertainties.setdefault((iso1, iso2), [None] * 3)
+            uncertainties[("", "+", "-").index(sign)] = column
+        elif match := _CORRELATION_RE.match(column):
+            iso1, iso2 = match.groups()
+            self.correlations[(iso1, iso2)] = column
+            self.correlations.setdefault((iso2, iso1), column)
+            for key in _lookup_keys(iso1, iso2):
+                self._correlations_by_iso.setdefault(key, []).append(column)
+
+
+def _lookup_keys(iso1: str, iso2: str) -> List[str]:
+    """Get the unique isotopes and elements that a header can be looked up with.
+
+    :param iso1: First isotope in the header.
+    :param iso2: Second isotope in the header.
+
+    :return: Isotopes and elements, without duplicates.
+    """
+    isos = (utl.Isotope(iso1), utl.Isotope(iso2))
+    return list(dict.fromkeys([str(iso) for iso in isos] + [iso.ele for iso in isos]))
@@ -27,11 +27,10 @@ class Info:
     @property
     def dbs(self) -> Tuple["pgdtools.PresolarGrains.DataBase", ...]:
         """Get/print what databases are currently in the selection."""
-        index_start = set()
-        for ind in self.parent.db.index:
-            index_start.add(ind.split("-")[0])
-
-        dbs = tuple(pgdtools.PresolarGrains.DataBase(x) for x in index_start)
+        counts = self.parent._id_parts["Database"].value_counts(sort=False)
+        dbs = tuple(
+            pgdtools.PresolarGrains.DataBase(x) for x in counts.index[counts > 0]
+        )
         print("Currently available databases are:")
         if len(dbs) == 0:
             print("- None")
@@ -70,12 +69,18 @@ class Info:
     # METHODS #
 
     def correlations(self, inp: str) -> Union[None, List[str]]:
-        """Get/print available correlations for a given element or isotope."""
+        """Get/print available correlations for a given element or isotope.
+
+        Elements and isotopes are matched against the isotopes of each header,
+        e.g., "C" matches correlations of carbon isotopes, but not of calcium.
+
+        :param inp: Input isotope or element.
+
+        :return: Correlation headers or None if none are found.
+        """
         iso = str(utl.Isotope(inp, allow_element=True))
 
-        entries = [
-            x for x in self.parent.db.columns if iso in x and x.startswith("rho")
-        ]
+        entries = self.parent._schema.correlations_with(iso)
 
         if len(entries) == 0:
             print(f"No correlations for {iso} found.")
@@ -89,20 +94,16 @@ class Info:
     def ratios(self, inp: str) -> Union[None, List[Tuple[str, bool]]]:
         """Get/print available ratios for a given element or isotope.
 
+        Elements and isotopes are matched against the isotopes of each header,
+        e.g., "C" matches 12C/13C, but not d(42Ca/40Ca).
+
         :param inp: Input isotope or element.
 
         :return: A tuple of tuples. In the latter, each entry consists of available
             isotope ratio and a boolean value to indicate if this is a delta-value.
         """
-        excl_startswith = ("err", "rho")
-
         iso = str(utl.Isotope(inp, allow_element=True))
-        all_in_hdr = (x for x in self.parent.db.columns if iso in x)
-        flt_hdr = [
-            (x, x.startswith("d"))
-            for x in all_in_hdr
-            if all([not x.startswith(y) for y in excl_startswith]) and "/" in x
-        ]
+        flt_hdr = self.parent._schema.ratios_with(iso)
 
         if len(flt_hdr) == 0:
             print(f"No isotope ratios containing {iso} found.")
@@ -0,0 +1,437 @@
+"""Expression language to select grains with a single vectorized mask.
+
+An expression combines comparisons of database columns with boolean operators,
+e.g.::
+
+    d(29Si/28Si) > 50 and err(29Si/28Si) < 20 or not isnull(12C/13C)
+
+The following terms are available:
+
+- Isotope ratios, e.g., `12C/13C`, `d(29Si/28Si)`, or `Si29/Si28`. Delta values and
+  ratios are resolved the same way as in `pgd.data.ratio`, i.e., the ratio is
+  resolved to the delta value if the database contains the delta value.
+  Written as `d(...)`, the delta value is used, converted with the solar ratio if
+  the database contains the isotope ratio. Ratios that are not in the database are
+  derived from the ones that are, see `pgdtools.sub_tools.virtual`.
+- Uncertainties of isotope ratios, e.g., `err+(12C/13C)` or `err-(12C/13C)`.
+  Asymmetric uncertainties are filled with the symmetric uncertainty as in
+  `pgd.data.ratio`. `err(12C/13C)` is the larger one of the two.
+- Any other column of the database, e.g., `PGD Type`. Names that contain spaces
+  are matched against the columns of the database, the longest matching column
+  name is used. Column names can also be written in backticks, e.g.,
+  `` `PGD Type` ``, which is required if they do not start with a letter.
+- Numbers, e.g., `-1.5e3`, and strings in quotes, e.g., `"X"`.
+
+Terms are compared with `<`, `<=`, `>`, `>=`, `==`, `!=`, or with
+`term between low and high` (inclusive). `isnull(term)` and `notnull(term)` check
+for empty values. Comparisons are combined with `and` / `&`, `or` / `|`, and
+`not` / `~`, and can be grouped with parentheses.
+
+Comparisons with empty values are always false, including `!=`, as in the other
+filters. Note that `not` therefore selects grains without a value, e.g.,
+`not 12C/13C > 50` selects grains without a 12C/13C ratio as well.
+
+The expression is parsed by a small recursive descent parser, Python's `eval` is
+never used. If `numexpr` is installed, the resulting mask is computed with it.
+"""
+
+import importlib.util
+import re
+from typing import Any, Dict, Iterable, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+import pgdtools
+import pgdtools.sub_tools.utilities as utl
+
+# isotope in any notation that `utilities.Isotope` can parse, e.g., "29Si", "Si-29"
+_ISO = r"(?:\d+[A-Za-z]{1,2}|[A-Za-z]{1,2}-?\d+)"
+_RATIO = rf"(?:d\(\s*{_ISO}\s*/\s*{_ISO}\s*\)|{_ISO}\s*/\s*{_ISO})"
+
+# tokens of the expression language, the first matching alternative is used
+_TOKEN_RE = re.compile(
+    rf"""\s*(?:
+    (?P<err>err[+-]?\s*[\(\[]\s*{_RATIO}\s*[\)\]])
+    |(?P<ratio>{_RATIO})
+    |(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+    |(?P<string>"[^"]*"|'[^']*')
+    |(?P<column>`[^`]+`)
+    |(?P<op><=|>=|==|!=|=>|=<|<>|=|<|>|&|\||~|\(|\)|-)
+    |(?P<word>[A-Za-z_]+)
+    )""",
+    re.VERBOSE,
+)
+
+# keywords of the language and the operators they are equivalent to
+_KEYWORDS = {"and": "&", "or": "|", "not": "~", "between": "between"}
+_FUNCTIONS = ("isnull", "notnull")
+_OPERATORS = ("(", ")", "&", "|", "~", "-")  # operators that are no comparators
+
+
+class Query:
+    """Parsed query expression that computes a mask for a given database.
+
+    All terms are resolved when the query is created, such that errors in the
+    expression are raised right away, even if the mask is computed later.
+    """
+
+    def __init__(self, parent: "pgdtools.PresolarGrains", expr: str) -> None:
+        """Parse the expression and resolve its terms.
+
+        :param parent: Parent class, must be of type ``PresolarGrains``.
+        :param expr: Query expression, see module documentation.
+
+        :raises TypeError: Parent class is not of type ``PresolarGrains``.
+        :raises ValueError: Invalid expression or term not found in the database.
+        """
+        if not isinstance(parent, pgdtools.PresolarGrains):
+            raise TypeError("Parent class must be of type PresolarGrains.")
+
+        self.parent = parent
+        self.expr = expr
+        self.resolved: Dict[str, Union[str, List[str]]] = {}
+
+        self._columns: List[str] = []  # all columns that the mask needs
+        self._tokens = _tokenize(expr, parent._columns)
+        self._pos = 0
+        self._tree = self._parse_or()
+        if self._pos < len(self._tokens):
+            raise ValueError(f"Unexpected {self._tokens[self._pos][1]!r} in query.")
+
+    def mask(self, df: pd.DataFrame) -> np.ndarray:
+        """Compute the mask of the grains that fulfill the query.
+
+        :param df: Database to compute the mask for.
+
+        :return: Boolean mask of the selected grains.
+        """
+        variables: Dict[str, Any] = {}
+        df = self.parent._with_virtual(df, self._columns)
+        if numexpr_available():
+            import numexpr
+
+            expression = self._to_numexpr(self._tree, df, variables)
+            mask = numexpr.evaluate(expression, local_dict=variables)
+        else:
+            mask = self._evaluate(self._tree, df)
+        return np.broadcast_to(np.asarray(mask, dtype=bool), (len(df),))
+
+    # PARSER #
+
+    def _expect(self, value: str) -> None:
+        """Consume the next token, which must have the given value.
+
+        :param value: Expected value of the token.
+
+        :raises ValueError: Next token has a different value.
+        """
+        token = self._peek()
+        if token is None or token[1] != value:
+            found = "end of query" if token is None else repr(token[1])
+            raise ValueError(f"Expected {value!r} in query, found {found}.")
+        self._pos += 1
+
+    def _parse_or(self) -> tuple:
+        """Parse terms combined with `or`."""
+        tree = self._parse_and()
+        while self._peek_value() == "|":
+            self._pos += 1
+            tree = ("|", tree, self._parse_and())
+        return tree
+
+    def _parse_and(self) -> tuple:
+        """Parse terms combined with `and`."""
+        tree = self._parse_not()
+        while self._peek_value() == "&":
+            self._pos += 1
+            tree = ("&", tree, self._parse_not())
+        return tree
+
+    def _parse_not(self) -> tuple:
+        """Parse negated terms."""
+        if self._peek_value() == "~":
+            self._pos += 1
+            return ("~", self._parse_not())
+        return self._parse_comparison()
+
+    def _parse_comparison(self) -> tuple:
+        """Parse a comparison, a function call, or an expression in parentheses."""
+        if self._peek_value() == "(":
+            self._pos += 1
+            tree = self._parse_or()
+            self._expect(")")
+            return tree
+
+        if self._peek_value() in _FUNCTIONS:
+            function = self._tokens[self._pos][1]
+            self._pos += 1
+            self._expect("(")
+            operand = self._parse_operand()
+            self._expect(")")
+            return (function, operand)
+
+        left = self._parse_operand()
+        token = self._peek()
+        if token is not None and token[1] == "between":
+            self._pos += 1
+            low = self._parse_operand()
+            self._expect("&")
+            return ("between", left, low, self._parse_operand())
+        if token is not None and token[0] == "op" and token[1] not in _OPERATORS:
+            self._pos += 1
+            cmp = pgdtools.sub_tools.filters._check_comparator(token[1])
+            return ("cmp", cmp, left, self._parse_operand())
+
+        found = "end of query" if token is None else repr(token[1])
+        raise ValueError(f"Expected a comparison in query, found {found}.")
+
+    def _parse_operand(self) -> tuple:
+        """Parse a term, number, or string and resolve terms to database columns."""
+        token = self._peek()
+        if token is None:
+            raise ValueError("Unexpected end of query.")
+        kind, value = token
+        self._pos += 1
+
+        if kind == "op" and value == "-":  # negative number
+            operand = self._parse_operand()
+            if operand[0] != "number":
+                raise ValueError("Only numbers can be negated in query.")
+            return ("number", -operand[1])
+        if kind == "number":
+            return ("number", float(value))
+        if kind == "string":
+            return ("string", value[1:-1])
+        if kind == "column":
+            column = value.strip("`")
+            if column not in self.parent._columns:
+                raise ValueError(f"Column {column} not found in the database.")
+            self.resolved[value] = column
+            self._columns.append(column)
+            return ("column", column)
+        if kind == "ratio":
+            header = self._header(value)
+            self.resolved[value] = header.ratio[0]
+            self._columns.append(header.ratio[0])
+            return ("column", header.ratio[0])
+        if kind == "err":
+            sign = value[3] if value[3] in "+-" else ""
+            columns = self._header(re.sub(r"^err[+-]?\s*", "", value)[1:-1]).uncertainty
+            used = columns if not sign else [columns[0], columns["+-".index(sign) + 1]]
+            self.resolved[value] = [col for col in used if col is not None]
+            self._columns += [col for col in columns if col is not None]
+            return ("err", sign, columns)
+
+        raise ValueError(f"Unexpected {value!r} in query.")
+
+    def _header(self, ratio: str) -> "pgdtools.sub_tools.headers.Headers":
+        """Get the header of an isotope ratio written as, e.g., `d(29Si/28Si)`.
+
+        :param ratio: Isotope ratio as written in the query.
+
+        :return: Headers of the isotope ratio.
+        """
+        delta = True if ratio.startswith("d(") else None
+        iso1, iso2 = re.sub(r"^d\(|\)$|\s", "", ratio).split("/")
+        return self.parent._header(iso1, iso2, delta)
+
+    def _peek(self) -> Union[Tuple[str, str], None]:
+        """Return the next token without consuming it, None at the end."""
+        return self._tokens[self._pos] if self._pos < len(self._tokens) else None
+
+    def _peek_value(self) -> Union[str, None]:
+        """Return the value of the next token without consuming it."""
+        token = self._peek()
+        return None if token is None else token[1]
+
+    # EVALUATION #
+
+    def _evaluate(self, tree: tuple, df: pd.DataFrame) -> np.ndarray:
+        """Evaluate a parsed expression with NumPy.
+
+        :param tree: Parsed expression.
+        :param df: Database to evaluate the expression for.
+
+        :return: Boolean mask.
+        """
+        kind = tree[0]
+        if kind == "|":
+            return self._evaluate(tree[1], df) | self._evaluate(tree[2], df)
+        if kind == "&":
+            return self._evaluate(tree[1], df) & self._evaluate(tree[2], df)
+        if kind == "~":
+            return ~self._evaluate(tree[1], df)
+        if kind in _FUNCTIONS:
+            isnull = pd.isna(_values(tree[1], df))
+            return isnull if kind == "isnull" else ~isnull
+        if kind == "between":
+            values = _values(tree[1], df)
+            low, high = _values(tree[2], df), _values(tree[3], df)
+            return _compare(">=", values, low) & _compare("<=", values, high)
+
+        _, cmp, left, right = tree
+        return _compare(cmp, _values(left, df), _values(right, df))
+
+    def _to_numexpr(
+        self, tree: tuple, df: pd.DataFrame, variables: Dict[str, Any]
+    ) -> str:
+        """Translate a parsed expression into a numexpr expression.
+
+        All values are passed as variables, such that the expression only contains
+        variable names and operators. String comparisons are evaluated with NumPy.
+
+        :param tree: Parsed expression.
+        :param df: Database to evaluate the expression for.
+        :param variables: Variables of the numexpr expression, filled in place.
+
+        :return: Expression for `numexpr.evaluate`.
+        """
+
+        def variable(value: Any) -> str:
+            """Add a value to the variables and return its name."""
+            name = f"v{len(variables)}"
+            variables[name] = value
+            return name
+
+        kind = tree[0]
+        if kind in ("|", "&"):
+            left = self._to_numexpr(tree[1], df, variables)
+            right = self._to_numexpr(tree[2], df, variables)
+            return f"({left} {kind} {right})"
+        if kind == "~":
+            return f"(~{self._to_numexpr(tree[1], df, variables)})"
+        if kind == "between":
+            values = variable(_values(tree[1], df))
+            low, high = variable(_values(tree[2], df)), variable(_values(tree[3], df))
+            return f"(({values} >= {low}) & ({values} <= {high}))"
+
+        operands = tree[1:2] if kind in _FUNCTIONS else tree[2:]
+        values = [_values(operand, df) for operand in operands]
+        if any(value.dtype.kind not in "biuf" for value in values):
+            return variable(np.asarray(self._evaluate(tree, df), dtype=bool))
+
+        names = [variable(value) for value in values]
+        if kind in _FUNCTIONS:
+            cmp = "!=" if kind == "isnull" else "=="
+            return f"({names[0]} {cmp} {names[0]})"
+        notna = [f" & ({name} == {name})" for name in names]  # false for NaN
+        return f"(({names[0]} {tree[1]} {names[1]}){''.join(notna)})"
+
+
+def numexpr_available() -> bool:
+    """Check if `numexpr` is installed, without importing it.
+
+    :return: True if `numexpr` can be imported.
+    """
+    return importlib.util.find_spec("numexpr") is not None
+
+
+def _compare(cmp: str, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Compare two operands, comparisons with empty values are always false.
+
+    :param cmp: Comparator, see `filters._COMPARATORS`.
+    :param left: Values of the left operand.
+    :param right: Values of the right operand.
+
+    :return: Boolean mask.
+
+    :raises ValueError: Values cannot be compared, e.g., strings with numbers.
+    """
+    left, right = np.broadcast_arrays(left, right)
+    valid = ~(pd.isna(left) | pd.isna(right))
+    mask = np.zeros(valid.shape, dtype=bool)
+    compare = pgdtools.sub_tools.filters._COMPARATORS[cmp]
+    try:
+        mask[valid] = compare(left[valid], right[valid])
+    except TypeError as err:
+        raise ValueError(f"Cannot compare values with {cmp!r} in query.") from err
+    return mask
+
+
+def _match_column(expr: str, pos: int, columns: Iterable[str]) -> str:
+    """Find the longest column name at a given position of an expression.
+
+    The column name must end at a word boundary, e.g., `PGD Type` does not match
+    `PGD Types`.
+
+    :param expr: Query expression.
+    :param pos: Position of the column name in the expression.
+    :param columns: Column names of the database.
+
+    :return: Column name.
+
+    :raises ValueError: No column name matches.
+    """
+    matches = [
+        col
+        for col in columns
+        if expr.startswith(col, pos)
+        and not re.match(r"\w", expr[pos + len(col) : pos + len(col) + 1])
+    ]
+    if not matches:
+        word = re.match(r"\w+", expr[pos:]).group()
+        raise ValueError(f"Unknown word {word!r} in query.")
+    return max(matches, key=len)
+
+
+def _tokenize(expr: str, columns: Iterable[str] = ()) -> List[Tuple[str, str]]:
+    """Split an expression into tokens.
+
+    Keywords are replaced with the operators they are equivalent to. Other words
+    are resolved to the longest column name that starts with them.
+
+    :param expr: Query expression.
+    :param columns: Column names of the database.
+
+    :return: List of (kind, value) tuples.
+
+    :raises ValueError: Expression contains invalid characters or words.
+    """
+    tokens = []
+    pos = 0
+    expr = expr.rstrip()
+    while pos < len(expr):
+        match = _TOKEN_RE.match(expr, pos)
+        if match is None or match.end() == pos:
+            raise ValueError(f"Invalid query at position {pos}: {expr[pos:]!r}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        pos = match.end()
+        if kind == "word":
+            if value.lower() in _KEYWORDS:
+                kind, value = "op", _KEYWORDS[value.lower()]
+            elif value.lower() in _FUNCTIONS:
+                value = value.lower()
+            else:
+                start = match.start(kind)
+                kind, value = "column", _match_column(expr, start, columns)
+                pos = start + len(value)
+        tokens.append((kind, value))
+    return tokens
+
+
+def _values(operand: tuple, df: pd.DataFrame) -> np.ndarray:
+    """Get the values of an operand for the given database.
+
+    :param operand: Parsed operand: number, string, column, or uncertainty.
+    :param df: Database to get the values from.
+
+    :return: Values as an array, numbers and strings as 0-dimensional arrays.
+    """
+    kind = operand[0]
+    if kind in ("number", "string"):
+        return np.asarray(operand[1])
+    if kind == "column":
+        column = utl.dense(df[operand[1]])
+        if pd.api.types.is_numeric_dtype(column.dtype):
+            return column.to_numpy(dtype=float, na_value=np.nan)
+        return column.to_numpy(dtype=object)
+
+    _, sign, columns = operand
+    unc_plus, unc_minus = utl.uncertainty_arrays(df, columns)
+    if sign == "+":
+        return unc_plus
+    if sign == "-":
+        return unc_minus
+    return np.fmax(unc_plus, unc_minus)
@@ -1,12 +1,12 @@
 """Sub tool to gather references for data sets and return them."""
 
-import json
 from typing import List, Set
 
 import pandas as pd
 
 import pgdtools
 from pgdtools import db
+import pgdtools.sub_tools.utilities as utl
 
 
 class References:
@@ -24,8 +24,7 @@ class References:
 
         self.parent = parent
 
-        self._reference_json = None
-        self._get_reference_json()
+        self._reference_json = db.registry.references()
 
     def __repr__(self) -> str:
         """Return a string representation of the class.
@@ -37,15 +36,14 @@ class References:
 
         :return: String representation of the class.
         """
-        ret_val = ""
-        for it, (key, value) in enumerate(self.dict.items()):
-            ret_val += f"{key}: {value['Reference - short']}"
+        lines = []
+        for key, value in self.dict.items():
+            line = f"{key}: {value['Reference - short']}"
             if value["DOI"]:
-                ret_val += f" ({value['DOI']})"
-            if it != len(self.dict) - 1:
-                ret_val += "\n"
+                line += f" ({value['DOI']})"
+            lines.append(line)
 
-        return ret_val
+        return "\n".join(lines)
 
     def __eq__(self, other) -> bool:
         """Check if the references are equal.
@@ -96,7 +94,10 @@ class References:
 
         :return: Dictionary representation of the class.
         """
-        return {key: self._reference_json[key] for key in self._create_ref_keys_set}
+        return {
+            key: db.registry.to_dict(self._reference_json[key])
+            for key in self._create_ref_keys_set
+        }
 
     @property
     def doi(self) -> Set[str]:
@@ -121,18 +122,19 @@ class References:
 
         :return: Full reference table for every grain.
         """
-        indexes = self.parent.db.index
-        series = [
-            pd.Series(self._reference_json[ref_id], name=indexes[it])
-            for it, ref_id in enumerate(self._create_ref_keys_list)
-        ]
-        return pd.DataFrame(series)
+        keys = self.parent._reference_keys
+        table = utl.lookup_table(self._reference_json).loc[keys.to_numpy()]
+        table.index = keys.index.rename(None)
+        return table
 
     @property
     def table_set(self) -> pd.DataFrame:
         """Return a set of references for all grains in dataset in table format."""
-        table_set = self.table_full.drop_duplicates()
-        return table_set.set_index([self._create_ref_keys(table_set.index)])
+        keys = self.parent._reference_keys
+        unique_keys = keys.drop_duplicates().to_numpy()  # in order of the grains
+        table = utl.lookup_table(self._reference_json).loc[unique_keys]
+        table.index = pd.Index(unique_keys.astype(object))
+        return table
 
     @property
     def _create_ref_keys_list(self) -> List[str]:
@@ -140,12 +142,12 @@ class References:
 
         :return: List of all the reference IDs.
         """
-        return self._create_ref_keys(self.parent.db.index)
+        return self.parent._reference_keys.tolist()
 
     @property
     def _create_ref_keys_set(self) -> Set[str]:
         """Create the reference key as a set."""
-        return set(self._create_ref_keys_list)
+        return set(self.parent._reference_keys.unique())
 
     def search(self, search_str: str) -> List[str]:
         """Search all references information (except for notes) for keywords.
@@ -190,20 +192,24 @@ class References:
                 print(f"- {entry}")
         return ret_list
 
-    def _get_reference_json(self):
-        """Load and store the reference JSON file."""
-        with open(db.LOCAL_REF_JSON, "r") as file:
-            self._reference_json = json.load(file)
-
     @staticmethod
     def _create_ref_keys(pgd_ids: List[str]) -> List[str]:
         """Create reference keys from a PGD IDs.
 
         :param pgd_ids: List of PGD IDs to create reference keys from.
         """
-        ref_keys = []
-        for pgd_id in pgd_ids:
-            name_parts = pgd_id.split("-")
-            name_parts[-1] = name_parts[-1][0]
-            ref_keys.append("-".join(name_parts))
-        return ref_keys
+        return reference_keys(pd.Index(pgd_ids)).tolist()
+
+
+def reference_keys(pgd_ids: pd.Index) -> pd.Categorical:
+    """Derive the reference keys from PGD IDs.
+
+    The reference key is the PGD ID with only the first character of its last part,
+    e.g., "SiC-2005-NIT-000926" has the reference key "SiC-2005-NIT-0".
+
+    :param pgd_ids: PGD IDs.
+
+    :return: Reference keys in the order of the PGD IDs.
+    """
+    keys = pgd_ids.str.replace(r"((?:^|-).)[^-]*$", r"\1", regex=True)
+    return pd.Categorical(keys)
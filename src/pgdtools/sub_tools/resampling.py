@@ -0,0 +1,307 @@
+"""Monte Carlo resampling of grains within their uncertainties.
+
+Samples are drawn for every grain from a split-normal distribution around the
+measured value: Below the value, the negative uncertainty is used as standard
+deviation, above the value the positive one. Half of the samples lie on either
+side of the measured value, such that the uncertainties are the bounds of the
+central 68% interval. Correlations between the isotope ratios are taken into
+account by drawing correlated standard normal variables first, using the
+correlation coefficients of the database.
+
+Samples are generated in chunks of grains, such that the samples of all grains
+are never in memory at the same time. The chunks are summarized by reducers,
+which keep only one result per grain:
+
+Example:
+    >>> from pgdtools import pgd
+    >>> from pgdtools.sub_tools.resampling import Mean, Quantiles
+    >>> samples = pgd.data.resample([("29Si", "28Si"), ("30Si", "28Si")], 10000)
+    >>> means, quantiles = samples.reduce(Mean(), Quantiles([0.16, 0.5, 0.84]))
+"""
+
+from abc import ABC, abstractmethod
+from typing import Callable, Iterator, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+# default maximum number of samples in one chunk
+CHUNK_SAMPLES = 2**20
+
+
+class Samples:
+    """Samples of the isotope ratios of many grains, generated chunk by chunk.
+
+    Iterating over the samples yields the PGD IDs of a chunk of grains and their
+    samples as an array of shape (grains, draws, ratios). The samples are the same
+    every time they are iterated over.
+    """
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        headers: List[str],
+        values: np.ndarray,
+        unc_plus: np.ndarray,
+        unc_minus: np.ndarray,
+        rho: np.ndarray,
+        n_draws: int,
+        seed: Union[int, None] = None,
+        chunk_size: int = None,
+    ) -> None:
+        """Initialize the samples.
+
+        :param ids: PGD IDs of the grains, shape (n,).
+        :param headers: Headers of the isotope ratios, one per ratio (N).
+        :param values: Measured values, shape (n, N).
+        :param unc_plus: Positive uncertainties, shape (n, N).
+        :param unc_minus: Negative uncertainties, shape (n, N).
+        :param rho: Correlation matrices, shape (n, N, N).
+        :param n_draws: Number of samples per grain.
+        :param seed: Seed of the random number generator.
+        :param chunk_size: Number of grains per chunk. By default, a chunk contains
+            at most `CHUNK_SAMPLES` samples.
+
+        :raises ValueError: Number of draws or chunk size is not positive.
+        """
+        if n_draws < 1:
+            raise ValueError("Number of draws must be positive.")
+        if chunk_size is None:
+            chunk_size = max(1, CHUNK_SAMPLES // (n_draws * len(headers)))
+        elif chunk_size < 1:
+            raise ValueError("Chunk size must be positive.")
+
+        self.ids = ids
+        self.headers = headers
+        self.n_draws = n_draws
+        self.chunk_size = chunk_size
+
+        self._values = values
+        self._unc_plus = unc_plus
+        self._unc_minus = unc_minus
+        self._rho = rho
+        self._seed = np.random.SeedSequence(seed)  # fixed entropy if seed is None
+
+    def __iter__(self) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Generate the samples chunk by chunk.
+
+        :return: Generator of the PGD IDs of the chunk and the samples of shape
+            (grains, draws, ratios).
+        """
+        rng = np.random.default_rng(self._seed)
+        for start in range(0, len(self.ids), self.chunk_size):
+            chunk = slice(start, start + self.chunk_size)
+            yield self.ids[chunk], self._draw(rng, chunk)
+
+    def __len__(self) -> int:
+        """Return the number of grains."""
+        return len(self.ids)
+
+    def reduce(self, *reducers: "Reducer") -> Union[pd.DataFrame, Tuple]:
+        """Summarize the samples with one or more reducers in one pass.
+
+        :param reducers: Reducers, e.g., `Mean()`.
+
+        :return: Result of the reducer or, for multiple reducers, a tuple of the
+            results. See the individual reducers for details.
+        """
+        for reducer in reducers:
+            reducer.reset()
+        for _, samples in self:
+            for reducer in reducers:
+                reducer.update(samples)
+
+        results = tuple(reducer.result(self.ids, self.headers) for reducer in reducers)
+        return results[0] if len(results) == 1 else results
+
+    def _draw(self, rng: np.random.Generator, chunk: slice) -> np.ndarray:
+        """Draw the samples of a chunk of grains.
+
+        :param rng: Random number generator.
+        :param chunk: Grains to draw samples for.
+
+        :return: Samples of shape (grains, draws, ratios).
+        """
+        values = self._values[chunk]
+        # square root of the correlation matrices, robust to rounded coefficients
+        eigval, eigvec = np.linalg.eigh(self._rho[chunk])
+        factor = eigvec * np.sqrt(np.clip(eigval, 0, None))[:, np.newaxis, :]
+
+        normal = rng.standard_normal((len(values), self.n_draws, values.shape[1]))
+        normal = np.matmul(normal, factor.transpose(0, 2, 1))
+        normal *= np.where(
+            normal > 0,
+            self._unc_plus[chunk][:, np.newaxis, :],
+            self._unc_minus[chunk][:, np.newaxis, :],
+        )
+        normal += values[:, np.newaxis, :]
+        return normal
+
+
+class Reducer(ABC):
+    """Base class of reducers that summarize the samples of every grain.
+
+    Subclasses must implement `result` and `_reduce`.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the reducer."""
+        self._chunks = []
+
+    def reset(self) -> None:
+        """Discard all results of previous chunks."""
+        self._chunks = []
+
+    def update(self, samples: np.ndarray) -> None:
+        """Summarize the samples of a chunk of grains.
+
+        :param samples: Samples of shape (grains, draws, ratios).
+        """
+        self._chunks.append(self._reduce(samples))
+
+    @abstractmethod
+    def result(self, ids: np.ndarray, headers: List[str]) -> pd.DataFrame:
+        """Get the result of all chunks.
+
+        :param ids: PGD IDs of all grains.
+        :param headers: Headers of the isotope ratios.
+
+        :return: Result, the index is the PGD ID.
+        """
+
+    @abstractmethod
+    def _reduce(self, samples: np.ndarray):
+        """Summarize the samples of a chunk of grains.
+
+        :param samples: Samples of shape (grains, draws, ratios).
+
+        :return: Summary of the chunk.
+        """
+
+
+class Frequencies(Reducer):
+    """Frequencies of the classes that the samples of every grain are assigned to.
+
+    Example:
+        >>> from pgdtools import classify_sic_grains, pgd
+        >>> from pgdtools.sub_tools.resampling import Frequencies
+        >>> def classify(x):
+        ...     return classify_sic_grains(x[:, 0], x[:, 1], x[:, 2], x[:, 3])[0]
+        >>> ratios = [("12C", "13C"), ("14N", "15N")]
+        >>> ratios += [("29Si", "28Si"), ("30Si", "28Si")]
+        >>> samples = pgd.data.resample(ratios, 1000)
+        >>> frequencies = samples.reduce(Frequencies(classify))
+    """
+
+    def __init__(self, classify: Callable[[np.ndarray], np.ndarray]) -> None:
+        """Initialize the reducer.
+
+        :param classify: Function that takes samples of shape (samples, ratios),
+            with the ratios in the order they were resampled, and returns one
+            class label per sample.
+        """
+        super().__init__()
+        self.classify = classify
+
+    def result(self, ids: np.ndarray, headers: List[str]) -> pd.DataFrame:
+        """Get the frequencies of all classes.
+
+        :param ids: PGD IDs of all grains.
+        :param headers: Headers of the isotope ratios.
+
+        :return: Fraction of the samples of every grain in every class, one column
+            per class label.
+        """
+        labels = sorted({label for chunk in self._chunks for label in chunk[0]})
+        fractions = np.zeros((len(ids), len(labels)))
+        start = 0
+        for chunk_labels, chunk_fractions in self._chunks:
+            columns = [labels.index(label) for label in chunk_labels]
+            fractions[start : start + len(chunk_fractions), columns] = chunk_fractions
+            start += len(chunk_fractions)
+        return pd.DataFrame(fractions, index=_index(ids), columns=labels)
+
+    def _reduce(self, samples: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Classify the samples and count the classes of every grain.
+
+        :param samples: Samples of shape (grains, draws, ratios).
+
+        :return: Class labels and fractions of shape (grains, labels).
+        """
+        n_grains, n_draws, n_ratios = samples.shape
+        labels = np.asarray(self.classify(samples.reshape(-1, n_ratios)))
+        unique, inverse = np.unique(labels, return_inverse=True)
+        inverse = inverse.reshape(n_grains, n_draws)
+        counts = np.stack([(inverse == it).sum(axis=1) for it in range(len(unique))])
+        return unique, counts.T / n_draws
+
+
+class Mean(Reducer):
+    """Mean of the samples of every grain."""
+
+    def result(self, ids: np.ndarray, headers: List[str]) -> pd.DataFrame:
+        """Get the means.
+
+        :param ids: PGD IDs of all grains.
+        :param headers: Headers of the isotope ratios.
+
+        :return: Mean of every isotope ratio, one column per ratio.
+        """
+        return pd.DataFrame(
+            np.concatenate(self._chunks), index=_index(ids), columns=headers
+        )
+
+    def _reduce(self, samples: np.ndarray) -> np.ndarray:
+        """Average the samples of every grain.
+
+        :param samples: Samples of shape (grains, draws, ratios).
+
+        :return: Means of shape (grains, ratios).
+        """
+        return samples.mean(axis=1)
+
+
+class Quantiles(Reducer):
+    """Quantiles of the samples of every grain."""
+
+    def __init__(self, q: List[float]) -> None:
+        """Initialize the reducer.
+
+        :param q: Quantiles to compute, between 0 and 1.
+        """
+        super().__init__()
+        self.q = list(q)
+
+    def result(self, ids: np.ndarray, headers: List[str]) -> pd.DataFrame:
+        """Get the quantiles.
+
+        :param ids: PGD IDs of all grains.
+        :param headers: Headers of the isotope ratios.
+
+        :return: Quantiles of every isotope ratio, the columns are the header of
+            the ratio and the quantile.
+        """
+        quantiles = np.concatenate(self._chunks)
+        columns = pd.MultiIndex.from_product([headers, self.q], names=["Ratio", "q"])
+        return pd.DataFrame(
+            quantiles.reshape(len(quantiles), -1), index=_index(ids), columns=columns
+        )
+
+    def _reduce(self, samples: np.ndarray) -> np.ndarray:
+        """Compute the quantiles of the samples of every grain.
+
+        :param samples: Samples of shape (grains, draws, ratios).
+
+        :return: Quantiles of shape (grains, ratios, quantiles).
+        """
+        return np.quantile(samples, self.q, axis=1).transpose(1, 2, 0)
+
+
+def _index(ids: np.ndarray) -> pd.Index:
+    """Create the index of the results.
+
+    :param ids: PGD IDs.
+
+    :return: Index named as the index of the database.
+    """
+    return pd.Index(ids, name="PGD ID")
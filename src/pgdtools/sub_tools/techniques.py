@@ -1,14 +1,15 @@
 """Sub tool to gather used techniques for data sets and return them."""
 
-import itertools
-import json
-from typing import List, Set
-import re
+from typing import Set
 
 import pandas as pd
 
 import pgdtools
 from pgdtools import db
+import pgdtools.sub_tools.utilities as utl
+
+# separators between multiple techniques of one grain in the "Technique" column
+SEPARATORS = ["&", "and/or"]
 
 
 class Techniques:
@@ -24,13 +25,9 @@ class Techniques:
         if not isinstance(parent, pgdtools.PresolarGrains):
             raise TypeError("Parent class must be of type PresolarGrains.")
 
-        # list of separators for splitting techniques
-        self._separators = ["&", "and/or"]
-
         self.parent = parent
 
-        self._techniques_json = None
-        self._get_techniques_json()
+        self._techniques_json = db.registry.techniques()
 
     def __repr__(self) -> str:
         """Return a string representation of the class.
@@ -89,7 +86,8 @@ class Techniques:
 
         :return: Dictionary of techniques.
         """
-        return {key: self._techniques_json[key] for key in self._create_ref_keys_set}
+        keys = self.parent._technique_keys.unique()
+        return {key: db.registry.to_dict(self._techniques_json[key]) for key in keys}
 
     @property
     def table_full(self) -> pd.DataFrame:
@@ -106,46 +104,45 @@ class Techniques:
 
         :return: Full reference table for every grain.
         """
-        indexes = self.parent.db.index
-
-        series = []
-        for ind, key_list in enumerate(self._create_ref_keys_list):
-            for key in key_list:
-                lst = {"PGD Technique": key}
-                lst.update(self._techniques_json[key])
-                ser = pd.Series(lst, name=indexes[ind])
-                series.append(ser)
-        ret_frame = pd.DataFrame(series)
-
-        return ret_frame
+        keys = self.parent._technique_keys
+        table = utl.lookup_table(self._techniques_json).loc[keys.to_numpy()]
+        table.insert(0, "PGD Technique", keys.to_numpy().astype(object))
+        table.index = keys.index.rename(None)
+        return table
 
     @property
     def table_set(self) -> pd.DataFrame:
         """Return a set of techniques for all grains in dataset in table format."""
-        series = [
-            pd.Series(self._techniques_json[key], name=key)
-            for key in self._create_ref_keys_set
-        ]
-        ret_frame = pd.DataFrame(series)
-        return ret_frame
-
-    @property
-    def _create_ref_keys_list(self) -> List[List[str]]:
-        """Create the techniques key as a list (in order).
-
-        :return: List of all the reference IDs.
-        """
-        ref_keys = self.parent.db["Technique"].to_list()
-        seps = "|".join(self._separators)
-        ret_keys = [[x.strip() for x in re.split(seps, y)] for y in ref_keys]
-        return ret_keys
+        unique_keys = self.parent._technique_keys.unique()  # in order of the grains
+        table = utl.lookup_table(self._techniques_json).loc[unique_keys]
+        table.index = pd.Index(unique_keys.astype(object))
+        return table
 
     @property
     def _create_ref_keys_set(self) -> Set[str]:
         """Create the techniques key as a set."""
-        return set(itertools.chain.from_iterable(self._create_ref_keys_list))
+        return set(self.parent._technique_keys.unique())
+
+
+def technique_keys(techniques: pd.Series) -> pd.Series:
+    """Split the techniques of the grains into individual technique keys.
+
+    Grains that were measured with multiple techniques list them separated by one
+    of the `SEPARATORS`, e.g., "NanoSIMS-1 & RIMS-1".
+
+    Example:
+        >>> technique_keys(pd.Series(["A & B", "C"]))
+        0    A
+        0    B
+        1    C
+        dtype: category
+        Categories (3, object): ['A', 'B', 'C']
+
+    :param techniques: "Technique" column of the database.
 
-    def _get_techniques_json(self):
-        """Load and store the techniques JSON file."""
-        with open(db.LOCAL_TECH_JSON, "r") as file:
-            self._techniques_json = json.load(file)
+    :return: Categorical technique keys in long format, i.e., one row per grain and
+        technique. The index is the position of the grain in the given column.
+    """
+    techniques = pd.Series(techniques.to_numpy(dtype=object))
+    keys = techniques.str.split("|".join(SEPARATORS), regex=True).explode()
+    return keys.str.strip().astype("category")
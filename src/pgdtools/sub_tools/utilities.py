@@ -1,6 +1,16 @@
 """Utilities for all tool modules in pgdtools."""
 
-from typing import Iterable
+from typing import Dict, Iterable, List, Mapping, Tuple, TypeVar, Union
+
+import numpy as np
+
+import pandas as pd
+
+PandasObject = TypeVar("PandasObject", pd.Series, pd.DataFrame)
+
+# lookup tables of the configuration files: id of the mapping -> (mapping, table)
+_LOOKUP_TABLES: Dict[int, Tuple[Mapping, pd.DataFrame]] = {}
+_MAX_LOOKUP_TABLES = 4  # oldest tables are dropped, e.g., after a file changed
 
 
 class Isotope:
@@ -100,3 +110,105 @@ def check_iso_rat(rat: Iterable[str]) -> None:
 
     for iso in rat:
         Isotope(iso)  # raised errors will be passed through
+
+
+def dense(obj: PandasObject) -> PandasObject:
+    """Convert sparse columns of a Series or DataFrame to dense columns.
+
+    Databases that are loaded in compact mode store mostly empty columns as sparse
+    columns. Data that is returned to the user should always be dense.
+
+    :param obj: Series or DataFrame.
+
+    :return: Object without sparse columns, the object itself if it has none.
+    """
+    if isinstance(obj, pd.Series):
+        return obj.sparse.to_dense() if isinstance(obj.dtype, pd.SparseDtype) else obj
+
+    dtypes = {
+        col: dtype.subtype
+        for col, dtype in obj.dtypes.items()
+        if isinstance(dtype, pd.SparseDtype)
+    }
+    return obj.astype(dtypes) if dtypes else obj
+
+
+def uncertainty_arrays(
+    df: pd.DataFrame, headers: List[Union[str, None]]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Get the positive and negative uncertainties of an isotope ratio as arrays.
+
+    Asymmetric uncertainties are filled with the symmetric uncertainty where they
+    are missing, or replaced by it if they are not available, as in
+    `pgd.data.ratio`.
+
+    :param df: Database to get the uncertainties from.
+    :param headers: Headers of the symmetric, positive, and negative uncertainty,
+        see `Headers.uncertainty`.
+
+    :return: Positive and negative uncertainties.
+    """
+    sym = (
+        dense(df[headers[0]]).to_numpy(dtype=float, na_value=np.nan)
+        if headers[0] is not None
+        else None
+    )
+    uncertainties = []
+    for header in headers[1:]:
+        if header is None:
+            uncertainties.append(sym)
+            continue
+        unc = dense(df[header]).to_numpy(dtype=float, na_value=np.nan)
+        uncertainties.append(unc if sym is None else np.where(np.isnan(unc), sym, unc))
+    return uncertainties[0], uncertainties[1]
+
+
+def id_parts(pgd_ids: pd.Index) -> pd.DataFrame:
+    """Parse the components of PGD IDs, e.g., `SiC-1992-AMA-000001`.
+
+    Columns of the returned table:
+    - Database: Abbreviation of the database the grain is from, e.g., "SiC".
+    - Year: Publication year of the data, 0 if unpublished.
+    - Author: Author code of the publication, e.g., "AMA".
+    - Number: Running number of the grain.
+
+    Components of IDs that do not follow this format are missing values.
+
+    :param pgd_ids: PGD IDs.
+
+    :return: Table of the ID components, the index are the PGD IDs.
+    """
+    parts = pd.Index(pgd_ids).str.extract(
+        r"^(?P<Database>[^-]*)(?:-(?P<Year>\d+)-(?P<Author>[^-]+)-(?P<Number>\d+))?$"
+    )
+    parts.index = pgd_ids
+    return parts.astype(
+        {
+            "Database": "category",
+            "Year": "Int16",
+            "Author": "category",
+            "Number": "Int32",
+        }
+    )
+
+
+def lookup_table(entries: Mapping) -> pd.DataFrame:
+    """Convert the entries of a configuration file into a table.
+
+    The table is cached for the given mapping, such that the references or
+    techniques are only converted once per loaded `references.json` or
+    `techniques.json` file.
+
+    :param entries: Mapping of keys to entries as read from the configuration file.
+
+    :return: Table with the keys as index and one column per field of the entries.
+    """
+    cached = _LOOKUP_TABLES.get(id(entries))
+    if cached is None or cached[0] is not entries:
+        table = pd.DataFrame.from_dict(
+            {key: dict(value) for key, value in entries.items()}, orient="index"
+        )
+        if len(_LOOKUP_TABLES) >= _MAX_LOOKUP_TABLES:
+            _LOOKUP_TABLES.pop(next(iter(_LOOKUP_TABLES)))
+        cached = _LOOKUP_TABLES[id(entries)] = (entries, table)
+    return cached[1]
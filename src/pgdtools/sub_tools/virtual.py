@@ -0,0 +1,232 @@
+"""Isotope ratios that are derived from the isotope ratios stored in the database.
+
+Many isotope ratios are not stored directly, but can be computed from stored ones:
+
+- Inverted ratios, e.g., 13C/12C from 12C/13C.
+- Ratios with a common isotope, e.g., d(29Si/30Si) from d(29Si/28Si) and
+  d(30Si/28Si).
+- Conversions between isotope ratios and delta values, using the solar isotope
+  ratios from `iniabu`.
+
+All stored ratios are first normalized to the solar ratio, i.e., delta values `d`
+are converted to `1 + d / 1000` and isotope ratios `R` to `R / R_solar`.
+Solar ratios are only needed if ratios and delta values are mixed, otherwise they
+cancel out. The derived ratio is the product of the normalized ratios, raised to
+the power of +1 or -1. Uncertainties are propagated linearly for every side of
+asymmetric uncertainties separately, using the correlation coefficient of the
+stored ratios if it is available.
+
+The derived values are available as virtual columns with the same names as they
+would have in the database, e.g., `d(29Si/30Si)`, `err+[d(29Si/30Si)]`, and
+`err-[d(29Si/30Si)]`.
+"""
+
+import functools
+from typing import Iterator, List, Tuple, Union
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import pgdtools
+import pgdtools.sub_tools.utilities as utl
+
+
+class VirtualRatio:
+    """Recipe to compute an isotope ratio from isotope ratios in the database."""
+
+    def __init__(
+        self,
+        schema: "pgdtools.sub_tools.headers.HeaderSchema",
+        iso1: str,
+        iso2: str,
+        delta: bool,
+        terms: List[Tuple[Tuple[str, str], int]],
+    ) -> None:
+        """Initialize the virtual ratio.
+
+        :param schema: Schema of the database that contains the stored ratios.
+        :param iso1: Isotope 1 (nominator).
+        :param iso2: Isotope 2 (denominator).
+        :param delta: Compute a delta value instead of an isotope ratio.
+        :param terms: Stored ratios and their exponent (+1 or -1) in the product.
+
+        :raises ValueError: A solar isotope ratio is required but not available.
+        """
+        self.delta = delta
+        self.header = f"d({iso1}/{iso2})" if delta else f"{iso1}/{iso2}"
+
+        deltas = {schema.ratios[key][1] for key, _ in terms} | {delta}
+        solar = len(deltas) > 1  # ratios and delta values are mixed
+
+        # (ratio header, delta, uncertainty headers, exponent, solar ratio)
+        self._terms = [
+            (
+                *schema.ratios[key],
+                schema.uncertainties[key],
+                exponent,
+                _solar_ratio(*key) if solar else 1.0,
+            )
+            for key, exponent in terms
+        ]
+        self._solar = _solar_ratio(iso1, iso2) if solar else 1.0
+
+        self._correlation = None
+        if len(terms) == 2 and terms[0][0][1] == terms[1][0][1]:
+            self._correlation = schema.correlations.get(
+                (terms[0][0][0], terms[1][0][0])
+            )
+
+    @property
+    def columns(self) -> List[str]:
+        """Get the names of the virtual columns.
+
+        :return: Names of the value, the positive, and the negative uncertainty.
+        """
+        return [self.header] + self.uncertainty[1:]
+
+    @property
+    def uncertainty(self) -> List[Union[str, None]]:
+        """Get the uncertainty headers as in `Headers.uncertainty`.
+
+        :return: No symmetric uncertainty, positive, and negative uncertainty.
+        """
+        return [None, f"err+[{self.header}]", f"err-[{self.header}]"]
+
+    def compute(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Compute the virtual columns for all rows of a frame.
+
+        :param frame: Database or a selection of it.
+
+        :return: Value, positive, and negative uncertainty, the index is the index
+            of the frame.
+        """
+        value = np.ones(len(frame))
+        relative = []  # relative uncertainties of the terms, oriented as the product
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for header, delta, uncertainty, exponent, solar in self._terms:
+                values = utl.dense(frame[header]).to_numpy(float, na_value=np.nan)
+                unc_plus, unc_minus = utl.uncertainty_arrays(frame, uncertainty)
+                scale = 1000.0 if delta else solar
+                normalized = values / scale + (1.0 if delta else 0.0)
+                value = value * normalized**exponent
+
+                norm = np.abs(normalized) * scale
+                if exponent < 0:
+                    unc_plus, unc_minus = unc_minus, unc_plus
+                relative.append((unc_plus / norm, unc_minus / norm, exponent))
+
+        var_plus = sum(rel[0] ** 2 for rel in relative)
+        var_minus = sum(rel[1] ** 2 for rel in relative)
+        if self._correlation is not None:
+            rho = utl.dense(frame[self._correlation]).to_numpy(float, na_value=np.nan)
+            rho = np.nan_to_num(rho) * relative[0][2] * relative[1][2]
+            var_plus = var_plus + 2 * rho * relative[0][0] * relative[1][0]
+            var_minus = var_minus + 2 * rho * relative[0][1] * relative[1][1]
+
+        scale = 1000.0 if self.delta else self._solar
+        unc_plus = np.abs(value) * np.sqrt(np.maximum(var_plus, 0)) * scale
+        unc_minus = np.abs(value) * np.sqrt(np.maximum(var_minus, 0)) * scale
+        value = (value - 1.0) * 1000.0 if self.delta else value * self._solar
+
+        return pd.DataFrame(
+            dict(zip(self.columns, [value, unc_plus, unc_minus])), index=frame.index
+        )
+
+
+def resolve(
+    schema: "pgdtools.sub_tools.headers.HeaderSchema",
+    iso1: str,
+    iso2: str,
+    delta: bool = None,
+) -> Union[VirtualRatio, None]:
+    """Find a way to derive an isotope ratio from the stored isotope ratios.
+
+    Inverting a stored ratio is preferred over combining two stored ratios.
+    Ratios with a common denominator are preferred over other combinations,
+    since their correlation coefficients are stored in the database.
+    Only stored ratios with uncertainties are used.
+
+    :param schema: Schema of the database.
+    :param iso1: Isotope 1 (nominator), formatted as in the database, e.g., "29Si".
+    :param iso2: Isotope 2 (denominator).
+    :param delta: Derive a delta value (`True`) or an isotope ratio (`False`).
+        By default, a delta value is derived if all used ratios are delta values.
+
+    :return: Virtual ratio or None if the ratio cannot be derived.
+    """
+    for terms in _candidates(schema, iso1, iso2, delta):
+        if any(key not in schema.uncertainties for key, _ in terms):
+            continue
+        ret_delta = delta
+        if ret_delta is None:
+            ret_delta = all(schema.ratios[key][1] for key, _ in terms)
+        try:
+            return VirtualRatio(schema, iso1, iso2, ret_delta, terms)
+        except ValueError:  # solar ratio not available, e.g., for radioactive isotopes
+            continue
+    return None
+
+
+def _candidates(
+    schema: "pgdtools.sub_tools.headers.HeaderSchema",
+    iso1: str,
+    iso2: str,
+    delta: Union[bool, None],
+) -> Iterator[List[Tuple[Tuple[str, str], int]]]:
+    """Generate the combinations of stored ratios that give an isotope ratio.
+
+    :param schema: Schema of the database.
+    :param iso1: Isotope 1 (nominator).
+    :param iso2: Isotope 2 (denominator).
+    :param delta: Requested representation, see `resolve`.
+
+    :return: Generator of stored ratios with their exponents, in order of
+        preference.
+    """
+    stored = schema.ratios.get((iso1, iso2))
+    if stored is not None and delta is not None and stored[1] != delta:
+        yield [((iso1, iso2), 1)]
+    if (iso2, iso1) in schema.ratios:
+        yield [((iso2, iso1), -1)]
+
+    # common isotope -> (stored ratio, exponent) for iso1 and iso2
+    links1, links2 = {}, {}
+    for nom, den in schema.ratios:
+        for iso, links, sign in ((iso1, links1, 1), (iso2, links2, -1)):
+            if nom == iso and den not in (iso1, iso2):
+                links[den] = ((nom, den), sign)
+            elif den == iso and nom not in (iso1, iso2):
+                links.setdefault(nom, ((nom, den), -sign))
+
+    common = [iso for iso in links1 if iso in links2]
+    common.sort(key=lambda iso: links1[iso][1] != 1 or links2[iso][1] != -1)
+    for iso in common:
+        yield [links1[iso], links2[iso]]
+
+
+@functools.lru_cache(maxsize=None)
+def _solar_ratio(iso1: str, iso2: str) -> float:
+    """Get the solar isotope number ratio from `iniabu`.
+
+    :param iso1: Isotope 1 (nominator), formatted as in the database, e.g., "29Si".
+    :param iso2: Isotope 2 (denominator).
+
+    :return: Solar isotope ratio.
+
+    :raises ValueError: Solar isotope ratio is not available.
+    """
+    # imported here, since iniabu is slow to import and rarely needed
+    from iniabu import ini
+
+    isos = [utl.Isotope(iso) for iso in (iso1, iso2)]
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            ratio = ini.iso_ratio(*(f"{iso.ele}-{iso.a}" for iso in isos))
+    except LookupError:
+        ratio = np.nan
+
+    if not np.isfinite(ratio) or ratio <= 0:
+        raise ValueError(f"No solar isotope ratio available for {iso1}/{iso2}.")
+    return float(ratio)
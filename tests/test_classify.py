@@ -3,7 +3,12 @@
 import numpy as np
 import pytest
 
-from pgdtools import classify as cl, classify_sic_grain, PresolarGrains
+from pgdtools import (
+    classify as cl,
+    classify_sic_grain,
+    classify_sic_grains,
+    PresolarGrains,
+)
 
 # grains to test, following definitions:
 # [
@@ -103,6 +108,89 @@ def test_classify_grain(grain):
     assert received == expected
 
 
+@pytest.mark.parametrize("grain", GRAIN_EXAMPLES)
+def test_classify_grains_single(grain):
+    """Classify grain examples with the vectorized routine, one at a time."""
+    data, rho_si, expected = grain
+    rho_si = 0 if rho_si is None else rho_si
+    if all(msr is None for msr in data):
+        with pytest.raises(ValueError):
+            classify_sic_grains(*data, rho_si)
+        return
+
+    gtypes, subtypes, probs = classify_sic_grains(*data, rho_si)
+    probs_exp = classify_sic_grain(*data, rho_si, ret_probabilities=True)
+
+    assert (gtypes[0], subtypes[0]) == expected
+    np.testing.assert_array_equal(
+        probs[0], [probs_exp[key] for key in cl.SIC_GRAIN_TYPES]
+    )
+
+
+def test_classify_grains_db(pgd):
+    """Ensure vectorized classification gives same results as single grain one."""
+    pgd.filter.db(pgd.DataBase.SiC)
+    pgd.db = pgd.db.iloc[::40]  # about 500 grains
+
+    ratios = [("12C", "13C"), ("14N", "15N"), ("29Si", "28Si"), ("30Si", "28Si")]
+    data = [pgd.data.ratio(rat, dropnan=False) for rat in ratios]
+    data.append(pgd.data.ratio(("26Al", "27Al"), dropnan=False))
+    rho_si = pgd.db["rho[30Si-29Si]"].fillna(0).to_numpy()
+
+    msrs = [
+        (data[0][0], (data[0][1], data[0][2])),
+        (data[1][0], (data[1][1], data[1][2])),
+        (data[2][0], data[2][1]),
+        (data[3][0], data[3][1]),
+        (data[4][0], data[4][1]),
+    ]
+    gtypes, subtypes, probs = classify_sic_grains(*msrs, rho_si=rho_si)
+
+    for it in range(len(pgd)):
+        msrs_grain = []
+        for val, unc in msrs:
+            if np.isnan(val.iloc[it]):
+                msrs_grain.append(None)
+            elif isinstance(unc, tuple):
+                msrs_grain.append((val.iloc[it], (unc[0].iloc[it], unc[1].iloc[it])))
+            else:
+                msrs_grain.append((val.iloc[it], unc.iloc[it]))
+
+        expected = classify_sic_grain(*msrs_grain, rho_si[it])
+        probs_exp = classify_sic_grain(*msrs_grain, rho_si[it], ret_probabilities=True)
+
+        assert (gtypes[it], subtypes[it]) == expected
+        np.testing.assert_array_equal(
+            probs[it], [probs_exp[key] for key in cl.SIC_GRAIN_TYPES]
+        )
+
+
+def test_classify_grains_asymmetric_dataframe():
+    """Asymmetric uncertainties can be given as two column arrays."""
+    c12_c13 = np.array([52.3, 4.1, 258.2])
+    c12_c13_unc = np.array([[1.3, 0.7], [0.1, 0.2], [8.8, 8.8]])
+    d29si = np.array([12.3, 30.2, np.nan])
+    d30si = np.array([0.3, 50.1, 134.98])
+
+    received = classify_sic_grains(
+        (c12_c13, c12_c13_unc), None, (d29si, 0.7), (d30si, 1.5)
+    )
+    expected = classify_sic_grains(
+        (c12_c13, (c12_c13_unc[:, 0], c12_c13_unc[:, 1])),
+        None,
+        (d29si, 0.7),
+        (d30si, 1.5),
+    )
+    for rec, exp in zip(received, expected):
+        np.testing.assert_array_equal(rec, exp)
+
+
+def test_classify_grains_asymmetric_silicon():
+    """Raise ValueError if asymmetric uncertainties are given for silicon."""
+    with pytest.raises(ValueError):
+        classify_sic_grains(d29si=(np.array([1.0]), (np.array([1.0]), np.array([2.0]))))
+
+
 @pytest.mark.skip(reason="Takes too long.")
 def test_classify_grain_whole_db():
     """Test classification of all grains in the whole database."""
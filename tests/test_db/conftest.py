@@ -1,7 +1,9 @@
 """Configuration tests for db management tests."""
 
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import json
 from pathlib import Path
+import threading
 from typing import Tuple
 
 import pytest
@@ -44,3 +46,76 @@ def mock_update(mocker, tmpdir_home, data_files_dir) -> Tuple:
     db_json.write_text(data_files_dir.joinpath("db.json").read_text())
 
     return mock_get, mock_clean, mock_download
+
+
+class FileServer(ThreadingHTTPServer):
+    """Local HTTP server that serves files from memory and supports range requests.
+
+    Files to serve are added to the `files` dictionary (path -> content), all
+    received requests are logged in `requests` as tuples of path and headers.
+    The ETag of a file is the hash of its content, conditional requests with
+    `If-None-Match` are answered with 304 if the file did not change. Range requests
+    with an `If-Range` ETag that does not match are answered with the whole file.
+    """
+
+    def __init__(self):
+        """Start the server on a free local port."""
+        super().__init__(("127.0.0.1", 0), FileRequestHandler)
+        self.files = {}
+        self.requests = []
+
+    def url(self, path: str) -> str:
+        """Return the URL for a given path on the server."""
+        return f"http://127.0.0.1:{self.server_address[1]}/{path}"
+
+
+class FileRequestHandler(BaseHTTPRequestHandler):
+    """Request handler for the local file server."""
+
+    def do_GET(self):
+        """Serve a file, or the requested range of it."""
+        self.server.requests.append((self.path, dict(self.headers)))
+        content = self.server.files.get(self.path.lstrip("/"))
+        if content is None:
+            self.send_error(404)
+            return
+
+        etag = f'"{hash(content)}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        start = 0
+        range_header = self.headers.get("Range")
+        if self.headers.get("If-Range", etag) != etag:
+            range_header = None
+        if range_header:
+            start = int(range_header.split("=")[1].split("-")[0])
+            if start >= len(content):
+                self.send_error(416)
+                return
+            self.send_response(206)
+            self.send_header(
+                "Content-Range", f"bytes {start}-{len(content) - 1}/{len(content)}"
+            )
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(content) - start))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(content[start:])
+
+    def log_message(self, *args):
+        """Do not log requests to stderr."""
+
+
+@pytest.fixture
+def file_server() -> FileServer:
+    """Run a local HTTP server to download files from."""
+    server = FileServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,97 @@
+"""Tests for the columnar cache of the database CSV files."""
+
+import os
+
+import pandas as pd
+import pytest
+
+from pgdtools.db import cache
+
+CSV_CONTENT = (
+    "PGD ID,PGD Type,Notes,12C/13C,err[12C/13C],d(29Si/28Si)\n"
+    "SiC-1992-AMA-000001,X,,12.5,0.3,\n"
+    "SiC-1992-AMA-000002,M,some note,55.0,,-12.4\n"
+    "SiC-1992-AMA-000003,,,,,\n"
+)
+
+
+@pytest.fixture
+def csv_file(tmpdir_home):
+    """Write a small database CSV file and return its path."""
+    csv_file = tmpdir_home.joinpath("csv/PGD_SiC_2000-01-01.csv")
+    csv_file.write_text(CSV_CONTENT)
+    return csv_file
+
+
+def test_read_csv(csv_file):
+    """Write the cache on first read, identical frames on first and second read."""
+    pytest.importorskip("pyarrow")
+    df_exp = pd.read_csv(csv_file, index_col=0)
+
+    df_first = cache.read_csv(csv_file)
+    assert cache.cache_path(csv_file).is_file()
+
+    df_second = cache.read_csv(csv_file)
+
+    pd.testing.assert_frame_equal(df_first, df_exp)
+    pd.testing.assert_frame_equal(df_second, df_exp)
+    assert isinstance(df_second["Notes"].iloc[0], float)  # np.nan, not None
+
+
+def test_read_csv_uses_cache(csv_file, mocker):
+    """Do not parse the CSV file again if the cache is valid."""
+    pytest.importorskip("pyarrow")
+    cache.read_csv(csv_file)
+
+    spy = mocker.spy(cache.pd, "read_csv")
+    cache.read_csv(csv_file)
+    spy.assert_not_called()
+
+
+def test_read_csv_modified(csv_file):
+    """Rebuild the cache if the CSV file was changed."""
+    pytest.importorskip("pyarrow")
+    cache.read_csv(csv_file)
+
+    csv_file.write_text(CSV_CONTENT.replace("12.5", "13.5"))
+
+    df = cache.read_csv(csv_file)
+    assert df.loc["SiC-1992-AMA-000001", "12C/13C"] == 13.5
+
+
+def test_read_csv_touched(csv_file, mocker):
+    """Use the cache if only the modification time of the CSV file changed."""
+    pytest.importorskip("pyarrow")
+    cache.read_csv(csv_file)
+
+    stat = csv_file.stat()
+    os.utime(csv_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    spy = mocker.spy(cache.pd, "read_csv")
+    df = cache.read_csv(csv_file)
+    spy.assert_not_called()
+    pd.testing.assert_frame_equal(df, pd.read_csv(csv_file, index_col=0))
+
+    # metadata updated: no hash calculation anymore
+    spy_hash = mocker.spy(cache, "_sha256")
+    cache.read_csv(csv_file)
+    spy_hash.assert_not_called()
+
+
+def test_read_csv_corrupt_cache(csv_file):
+    """Ignore a cache file that cannot be read."""
+    pytest.importorskip("pyarrow")
+    cache.cache_path(csv_file).write_text("not a feather file")
+
+    df = cache.read_csv(csv_file)
+    pd.testing.assert_frame_equal(df, pd.read_csv(csv_file, index_col=0))
+
+
+def test_read_csv_no_pyarrow(csv_file, mocker):
+    """Fall back to reading the CSV file if pyarrow is not available."""
+    mocker.patch.object(cache, "pyarrow_available", return_value=False)
+
+    df = cache.read_csv(csv_file)
+
+    pd.testing.assert_frame_equal(df, pd.read_csv(csv_file, index_col=0))
+    assert not cache.cache_path(csv_file).exists()
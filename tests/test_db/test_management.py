@@ -1,5 +1,7 @@
 """Tests for database management tools."""
 
+import hashlib
+import json
 from pathlib import Path
 
 import pytest
@@ -52,7 +54,7 @@ def test_set_current_key_error(current_file, conf_files):
         mgmt.set_current("sic", "DOI", "10.5281/zenodo.1234567")
 
 
-def test_update(mock_update):
+def test_update(mock_update, mocker):
     """Ensure update calls the correct functions and downloads the files."""
     _, _, mock_update = mock_update
     get_all = False
@@ -64,12 +66,58 @@ def test_update(mock_update):
     assert mock_update.call_count == len(urls)
     for url in urls:
         local_file = db.LOCAL_PATH.joinpath(f"csv/{Path(url).name}")
-        mock_update.assert_any_call(url, local_file)
+        mock_update.assert_any_call(url, local_file, sha256=None, session=mocker.ANY)
 
     assert db.LOCAL_PATH.joinpath("current.json").is_file()
     assert db.current()["sic"] == db.current()["sic"].absolute()
 
 
+def test_update_download_and_skip(file_server, tmpdir_home, mocker):
+    """Download all databases in parallel, verify and skip them the next time."""
+    mocker.patch.object(mgmt, "_get_online_config")
+    contents = {f"PGD_{it}.csv": f"PGD ID\nSiC-{it}\n".encode() for it in range(3)}
+    file_server.files.update(contents)
+
+    versions = [
+        {
+            "Date": f"2020-01-0{it + 1}",
+            "URL": file_server.url(name),
+            "SHA256": hashlib.sha256(content).hexdigest(),
+        }
+        for it, (name, content) in enumerate(contents.items())
+    ]
+    db.LOCAL_DB_JSON.write_text(
+        json.dumps({"sic": {"db_name": "Silicon Carbide", "versions": versions}})
+    )
+
+    mgmt.update(get_all=True)
+
+    assert len(file_server.requests) == len(contents)
+    for name, content in contents.items():
+        assert tmpdir_home.joinpath(f"csv/{name}").read_bytes() == content
+    assert db.current()["sic"].name == "PGD_2.csv"
+
+    mgmt.update(get_all=True)
+    assert len(file_server.requests) == len(contents)
+
+
+def test_update_offline(mock_update, tmpdir_home):
+    """Do not access the network in offline mode, raise if databases are missing."""
+    mock_get, _, mock_download = mock_update
+    urls = DataBases().urls()
+
+    with pytest.raises(FileNotFoundError):
+        mgmt.update(offline=True)
+
+    for url in urls:
+        tmpdir_home.joinpath(f"csv/{Path(url).name}").write_text("PGD ID\n")
+    mgmt.update(offline=True)
+
+    mock_get.assert_not_called()
+    mock_download.assert_not_called()
+    assert db.current()["sic"].name == Path(urls[0]).name
+
+
 @pytest.mark.parametrize("clean", [True, False])
 @pytest.mark.parametrize("get_config", [True, False])
 def test_update_clean_config(mock_update, clean, get_config):
@@ -90,12 +138,19 @@ def test_clean_local_db(tmpdir_home):
     csv_file = tmpdir_home.joinpath("csv/test.csv")
     other_file = tmpdir_home.joinpath("csv/README.md")
 
+    part_file = tmpdir_home.joinpath(f"csv/.test.csv{mgmt.PART_SUFFIX}")
+    part_validators = part_file.with_name(f"{part_file.name}{mgmt.VALIDATORS_SUFFIX}")
+
     csv_file.write_text("test")
     other_file.write_text("test")
+    part_file.write_text("te")
+    part_validators.write_text("{}")
 
     mgmt._clean_local_db()
 
     assert not csv_file.exists()
+    assert not part_file.exists()
+    assert not part_validators.exists()
     assert other_file.exists()
 
 
@@ -145,3 +200,112 @@ def test_download_file_connection_error(tmpdir_home):
 
         with pytest.raises(ConnectionError):
             mgmt._download_file(url, local_file)
+
+
+def test_download_file_resume(file_server, tmpdir_home, mocker):
+    """Resume an interrupted download with a range request for the same version."""
+    content = b"PGD ID,PGD Type\nSiC-1,M\nSiC-2,X\n"
+    file_server.files["test.csv"] = content
+    local_file = tmpdir_home.joinpath("csv/test.csv")
+    part_file = mgmt._part_path(local_file)
+
+    def interrupted(*args, **kwargs):
+        """Yield the first chunk of the file, then lose the connection."""
+        yield content[:10]
+        raise ConnectionError
+
+    mocker.patch("requests.Response.iter_content", interrupted)
+    with pytest.raises(ConnectionError):
+        mgmt._download_file(file_server.url("test.csv"), local_file)
+    mocker.stopall()
+    assert part_file.read_bytes() == content[:10]
+
+    mgmt._download_file(
+        file_server.url("test.csv"),
+        local_file,
+        sha256=hashlib.sha256(content).hexdigest(),
+    )
+
+    assert local_file.read_bytes() == content
+    assert not part_file.exists()
+    assert file_server.requests[1][1]["Range"] == "bytes=10-"
+    assert file_server.requests[1][1]["If-Range"] == f'"{hash(content)}"'
+
+
+def test_download_file_resume_changed(file_server, tmpdir_home):
+    """Download the whole file again if it changed since the partial download."""
+    content = b"PGD ID\nSiC-1\n"
+    file_server.files["test.csv"] = content
+    local_file = tmpdir_home.joinpath("csv/test.csv")
+    part_file = mgmt._part_path(local_file)
+    part_file.write_bytes(b"PGD ID\nSiC-0")
+    part_file.with_name(f"{part_file.name}{mgmt.VALIDATORS_SUFFIX}").write_text(
+        json.dumps({"ETag": '"old"'})
+    )
+
+    mgmt._download_file(file_server.url("test.csv"), local_file)
+
+    assert local_file.read_bytes() == content
+    assert len(file_server.requests) == 1
+    assert file_server.requests[0][1]["If-Range"] == '"old"'
+
+
+def test_download_file_resume_unknown_version(file_server, tmpdir_home):
+    """Restart the download if the version of the partial file is unknown."""
+    content = b"PGD ID\nSiC-1\n"
+    file_server.files["test.csv"] = content
+    local_file = tmpdir_home.joinpath("csv/test.csv")
+    mgmt._part_path(local_file).write_bytes(b"PGD ID\nSiC-0")
+
+    mgmt._download_file(file_server.url("test.csv"), local_file)
+
+    assert local_file.read_bytes() == content
+    assert "Range" not in file_server.requests[0][1]
+
+
+def test_download_file_resume_not_possible(file_server, tmpdir_home):
+    """Download the whole file again if the partial file cannot be resumed."""
+    content = b"PGD ID\nSiC-1\n"
+    file_server.files["test.csv"] = content
+    local_file = tmpdir_home.joinpath("csv/test.csv")
+    part_file = mgmt._part_path(local_file)
+    part_file.write_bytes(content + b"garbage")
+    part_file.with_name(f"{part_file.name}{mgmt.VALIDATORS_SUFFIX}").write_text(
+        json.dumps({"ETag": f'"{hash(content)}"'})
+    )
+
+    mgmt._download_file(file_server.url("test.csv"), local_file)
+
+    assert local_file.read_bytes() == content
+    assert len(file_server.requests) == 2
+
+
+def test_download_file_checksum_mismatch(file_server, tmpdir_home):
+    """Raise IOError and keep no file if the checksum does not match."""
+    file_server.files["test.csv"] = b"corrupt"
+    local_file = tmpdir_home.joinpath("csv/test.csv")
+
+    with pytest.raises(IOError):
+        mgmt._download_file(file_server.url("test.csv"), local_file, sha256="0" * 64)
+
+    assert not local_file.exists()
+    assert not mgmt._part_path(local_file).exists()
+
+
+def test_download_file_revalidate(file_server, tmpdir_home):
+    """Do not download a file again if it did not change on the server."""
+    file_server.files["db.json"] = b"{}"
+    local_file = tmpdir_home.joinpath("config/db.json")
+    url = file_server.url("db.json")
+
+    mgmt._download_file(url, local_file, revalidate=True)
+    assert mgmt._validators_path(local_file).is_file()
+    mtime = local_file.stat().st_mtime_ns
+
+    mgmt._download_file(url, local_file, revalidate=True)
+    assert file_server.requests[1][1]["If-None-Match"]
+    assert local_file.stat().st_mtime_ns == mtime
+
+    file_server.files["db.json"] = b'{"sic": {}}'
+    mgmt._download_file(url, local_file, revalidate=True)
+    assert local_file.read_bytes() == b'{"sic": {}}'
@@ -0,0 +1,84 @@
+"""Tests for the registry of the JSON configuration files."""
+
+import json
+import os
+import pickle
+
+import pytest
+
+from pgdtools import db
+from pgdtools.db import registry
+
+
+@pytest.fixture
+def json_file(tmpdir_home):
+    """Write a small JSON file and return its path."""
+    json_file = tmpdir_home.joinpath("config/test.json")
+    json_file.write_text(json.dumps({"key": {"DOI": "doi", "list": [1, 2]}}))
+    return json_file
+
+
+def test_load_json_read_only(json_file):
+    """Return a read-only view of the JSON content."""
+    content = registry.load_json(json_file)
+
+    assert content == {"key": {"DOI": "doi", "list": (1, 2)}}
+    with pytest.raises(TypeError):
+        content["key"]["DOI"] = "other"
+
+
+def test_load_json_cached(json_file, mocker):
+    """Parse the file only once as long as it does not change."""
+    content = registry.load_json(json_file)
+
+    spy = mocker.spy(registry.json, "load")
+    assert registry.load_json(json_file) is content
+    spy.assert_not_called()
+
+
+def test_load_json_modified(json_file):
+    """Read the file again if it changed."""
+    content = registry.load_json(json_file)
+
+    json_file.write_text(json.dumps({"key": "new value"}))
+    stat = json_file.stat()
+    os.utime(json_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert registry.load_json(json_file) is not content
+    assert registry.load_json(json_file)["key"] == "new value"
+
+
+def test_load_json_not_found(tmpdir_home):
+    """Raise FileNotFoundError if the file does not exist."""
+    with pytest.raises(FileNotFoundError):
+        registry.load_json(tmpdir_home.joinpath("config/missing.json"))
+
+
+def test_references_techniques(pgd):
+    """Share the references and techniques between instances."""
+    assert pgd.reference._reference_json is registry.references()
+    assert pgd.reference._reference_json is pgd.reference._reference_json
+    assert pgd.technique._techniques_json is registry.techniques()
+    assert registry.databases() is registry.load_json(db.LOCAL_DB_JSON)
+
+
+def test_to_dict(json_file):
+    """Convert read-only content into mutable dictionaries and lists."""
+    content = registry.to_dict(registry.load_json(json_file))
+    assert content == {"key": {"DOI": "doi", "list": [1, 2]}}
+    assert isinstance(content["key"], dict)
+    assert isinstance(content["key"]["list"], list)
+
+    content["key"]["DOI"] = "changed"
+    assert registry.load_json(json_file)["key"]["DOI"] == "doi"
+
+
+def test_public_dicts_mutable(pgd):
+    """Return plain dictionaries from the references and techniques."""
+    for entries in (pgd.reference.dict, pgd.technique.dict):
+        assert all(isinstance(value, dict) for value in entries.values())
+        assert pickle.loads(pickle.dumps(entries)) == entries
+
+    key = next(iter(pgd.reference.dict))
+    pgd.reference.dict[key]["DOI"] = "changed"
+    assert registry.references()[key]["DOI"] != "changed"
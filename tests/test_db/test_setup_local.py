@@ -4,7 +4,7 @@ from pathlib import Path
 
 import pytest
 
-from pgdtools.db.setup_local import setup_path
+from pgdtools.db.setup_local import local_path, setup_path
 
 
 @pytest.mark.parametrize("platform", ["win32", "cygwin", "linux", "darwin", "unknown"])
@@ -27,3 +27,14 @@ def test_setup_path(mocker, platform: str, tmpdir_home: Path):
 
     # run again to ensure no error
     setup_path()
+
+
+def test_local_path_no_folders(tmpdir_home: Path):
+    """Getting the local path does not create any folders."""
+    tmpdir_home.joinpath("csv").rmdir()
+    tmpdir_home.joinpath("config").rmdir()
+
+    app_local_path = local_path()
+
+    assert app_local_path == tmpdir_home.joinpath(".config/pgdtools/")
+    assert not app_local_path.exists()
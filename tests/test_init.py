@@ -0,0 +1,63 @@
+"""Tests for the lazy loading of the package and the module level `pgd` instance."""
+
+import subprocess
+import sys
+
+import pytest
+
+import pgdtools
+from pgdtools import PresolarGrains
+
+
+def test_import_no_heavy_modules_no_io(tmp_path):
+    """Importing the package neither imports heavy modules nor touches the disk."""
+    code = (
+        "import sys, pgdtools; "
+        "print(sorted(m for m in ('pandas', 'scipy', 'requests', 'matplotlib') "
+        "if m in sys.modules))"
+    )
+    home = tmp_path.joinpath("home")
+    env = {"HOME": str(home), "USERPROFILE": str(home), "APPDATA": str(home)}
+
+    ret = subprocess.run(
+        [sys.executable, "-c", code], env=env, capture_output=True, text=True
+    )
+
+    assert ret.returncode == 0, ret.stderr
+    assert ret.stdout.strip() == "[]"
+    assert not home.exists()
+
+
+def test_lazy_attributes():
+    """Lazy attributes are available and listed."""
+    assert pgdtools.PresolarGrains is PresolarGrains
+    assert callable(pgdtools.classify_sic_grains)
+    assert "db" in dir(pgdtools)
+
+
+def test_lazy_attribute_error():
+    """Raise AttributeError for attributes that do not exist."""
+    with pytest.raises(AttributeError, match="does_not_exist"):
+        _ = pgdtools.does_not_exist
+
+
+def test_pgd_proxy(pgd_setup):
+    """Load the database only on first access of the proxy and forward everything."""
+    proxy = pgdtools._PresolarGrainsProxy()
+    assert object.__getattribute__(proxy, "_instance") is None
+    assert isinstance(proxy, PresolarGrains)
+
+    pgd = PresolarGrains()
+    assert len(proxy) == len(pgd)
+    assert proxy == pgd
+    assert object.__getattribute__(proxy, "_instance") is not None
+
+    proxy.db = proxy.db.head(10)
+    assert len(proxy) == 10
+    assert len(list(proxy)) == 10
+    assert repr(proxy) == repr(proxy.db)
+
+    proxy.filter.pgd_type("M")
+    assert proxy.info.pgd_types <= {"M"}
+    proxy.reset()
+    assert len(proxy) == len(pgd)
@@ -1,5 +1,6 @@
 """Tests for the Maintainer Excel tools."""
 
+import hashlib
 import json
 from pathlib import Path
 
@@ -20,6 +21,10 @@ def test_append_to_db_json(excel_file, excel_file_gra, db_json, grain_type):
     mt.append_to_db_json(ex_file, doi, db_json=db_json)
     assert doi in db_json.read_text()
 
+    entry = json.loads(db_json.read_text())[grain_type]["versions"][-1]
+    sha256 = hashlib.sha256(ex_file.with_suffix(".csv").read_bytes()).hexdigest()
+    assert entry["SHA256"] == sha256
+
 
 def test_append_to_db_json_astromat(excel_file, db_json):
     """Append the information to the db.json file and ensure that doi is now in file."""
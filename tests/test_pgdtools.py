@@ -1,7 +1,10 @@
 """Functional tests for the PGD tools."""
 
+import numpy as np
+import pandas as pd
 import pytest
 
+from pgdtools import PresolarGrains
 import pgdtools.sub_tools.headers
 import pgdtools.sub_tools.utilities as utl
 
@@ -30,6 +33,87 @@ def test_iso_value_error():
         _ = utl.Isotope(123)
 
 
+# PRESOLAR GRAINS CLASS #
+
+
+def test_init_frame(pgd):
+    """Initialize the database from a given frame, which is not modified."""
+    frame = pgd.db.head(10)
+    pgd_frame = PresolarGrains(frame)
+
+    assert pgd_frame.db.equals(frame)
+    pgd_frame.filter.pgd_type("M", exclude=True)
+    pgd_frame.reset()
+    assert pgd_frame.db.equals(frame)
+
+
+def test_compact(pgd):
+    """Store the database compact, filters and data give the same results."""
+    pgd_compact = PresolarGrains(compact=True)
+
+    memory = pgd._db.memory_usage(deep=True).sum()
+    memory_compact = pgd_compact._db.memory_usage(deep=True).sum()
+    assert memory_compact < memory / 2
+    assert isinstance(pgd_compact._db["PGD Type"].dtype, pd.CategoricalDtype)
+    assert isinstance(pgd_compact._db["d(138Ba/136Ba)"].dtype, pd.SparseDtype)
+
+    ratio = ("29Si", "28Si")
+    for inst in (pgd, pgd_compact):
+        inst.filter.db(PresolarGrains.DataBase.SiC)
+        inst.filter.pgd_type(["M", "X"])
+        inst.filter.ratio(ratio, ">", -100)
+        inst.filter.uncertainty(ratio, "<", 20)
+
+    assert pgd_compact.info.pgd_types == pgd.info.pgd_types
+    for ser, ser_compact in zip(pgd.data.ratio(ratio), pgd_compact.data.ratio(ratio)):
+        pd.testing.assert_series_equal(ser_compact, ser)
+    pd.testing.assert_frame_equal(pgd_compact.data.size_all, pgd.data.size_all)
+
+
+def test_reset_no_copy(pgd):
+    """Reset only resets the selection, the full database is not modified."""
+    full_db = pgd._db
+    pgd.filter.pgd_type("X")
+    assert len(pgd) == len(pgd._rows)
+    pgd.reset()
+
+    assert pgd._db is full_db
+    assert pgd._rows is None
+    assert pgd.db is not full_db
+    assert np.shares_memory(pgd.db["12C/13C"].to_numpy(), full_db["12C/13C"].to_numpy())
+    pgd.db.drop(columns="PGD Type", inplace=True)
+    assert "PGD Type" in full_db.columns
+
+
+@pytest.mark.parametrize("filtered", [False, True])
+def test_added_column_kept(pgd, filtered):
+    """Keep columns added to the current selection when filtering further."""
+    if filtered:
+        pgd.filter.db(pgd.DataBase.SiC)
+    pgd.db["flag"] = np.arange(len(pgd))
+    pgd.filter.pgd_type("M")
+
+    assert "flag" in pgd.db.columns
+    assert pgd.db["flag"].notna().all()
+    pgd.filter.query("flag > 10")
+    assert (pgd.db["flag"] > 10).all()
+
+    pgd.reset()
+    assert "flag" not in pgd.db.columns
+
+
+def test_select_ids(pgd):
+    """Select grains by PGD ID in the given order and raise for unknown IDs."""
+    ids = pgd.db.index[[5, 2, 7]].tolist()
+    pgd._select_ids(ids)
+    assert pgd.db.index.tolist() == ids
+    pgd._select_ids(ids[1:])
+    assert pgd.db.index.tolist() == ids[1:]
+
+    with pytest.raises(KeyError):
+        pgd._select_ids(ids[:1])
+
+
 # SEARCH HEADER CLASS #
 
 
@@ -37,3 +121,51 @@ def test_search_header_type_error(pgd):
     """Raise a type error if the parent is not of type PresolarGrains."""
     with pytest.raises(TypeError):
         _ = pgdtools.sub_tools.headers.Headers("test")
+
+
+# CLASSIFICATION #
+
+
+def test_classify(pgd):
+    """Classify the SiC grains and compare with the types in the database."""
+    pgd.filter.db(pgd.DataBase.SiC)
+    classes = pgd.classify()
+
+    assert len(classes) == len(pgd)
+    assert "Computed Type" in pgd.db.columns
+    assert (classes["Computed Type"] == pgd.db["PGD Type"]).all()
+    pd.testing.assert_series_equal(
+        classes["Computed p(M)"], pgd.db["p(M)"], check_names=False
+    )
+
+
+def test_classify_cached(pgd, mocker):
+    """Classify the whole database once per instance and reuse it after filtering."""
+    spy = mocker.spy(pgd, "_classify_all_sic")
+    classes_all = pgd.classify()
+    pgd.filter.pgd_type("X")
+    classes = pgd.classify()
+
+    assert spy.call_count == 1
+    assert (classes["Computed Type"] == "X").all()
+    pd.testing.assert_frame_equal(classes, classes_all.loc[pgd.db.index])
+
+    pgd.reset()
+    assert "Computed Type" not in pgd.db.columns
+    pd.testing.assert_frame_equal(pgd.classify(), classes_all)
+    assert spy.call_count == 1
+
+    pgd_frame = PresolarGrains(pgd.db.head(10))
+    spy_frame = mocker.spy(pgd_frame, "_classify_all_sic")
+    classes_frame = pgd_frame.classify()
+    assert spy_frame.call_count == 1
+    assert pgd_frame._classification_cache[1].index.equals(pgd_frame._db.index)
+    pd.testing.assert_frame_equal(classes_frame, classes_all.head(10))
+
+
+def test_classify_graphite(pgd):
+    """Graphite grains are not classified."""
+    pgd.filter.db(pgd.DataBase.Graphite)
+    classes = pgd.classify()
+
+    assert classes.isna().all().all()
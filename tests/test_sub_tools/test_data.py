@@ -1,6 +1,7 @@
 """Functional tests for the data sub tool."""
 
 import numpy as np
+import pandas as pd
 import pytest
 
 import pgdtools
@@ -11,6 +12,8 @@ def test_info_type_error():
     """Raise a type error if the parent is not of type PresolarGrains."""
     with pytest.raises(TypeError):
         _ = pgdtools.sub_tools.data.Data("test")
+    with pytest.raises(TypeError):
+        _ = pgdtools.sub_tools.data.Arrays("test")
 
 
 # PROPERTIES #
@@ -22,6 +25,57 @@ def test_notes(pgd_head):
     assert pgd_head.data.notes.isna().sum() == 0
 
 
+@pytest.mark.parametrize("scale", [None, [1.0, 10.0, 5.0]])
+def test_nearest(pgd, scale):
+    """Find the nearest grains, compared with a brute force search."""
+    ratios = [("12C", "13C"), ("14N", "15N"), ("29Si", "28Si")]
+    composition = [50.0, 300.0, 100.0]
+    nearest = pgd.data.nearest(composition, ratios, k=5, scale=scale)
+
+    values = pd.concat(
+        [pgd.data.ratio(rat, dropnan=False)[0] for rat in ratios], axis=1
+    )
+    values = values.dropna()
+    if scale is None:
+        uncs = [pgd.data.ratio(rat, dropnan=False)[1:] for rat in ratios]
+        scale = [((unc[0] + unc[1]) / 2).loc[values.index].median() for unc in uncs]
+    distances = np.sqrt(((values - composition) ** 2 / np.square(scale)).sum(axis=1))
+    expected = distances.sort_values().head(5)
+
+    assert nearest.index.tolist() == expected.index.tolist()
+    np.testing.assert_allclose(nearest["Distance"], expected)
+    assert nearest.columns.tolist()[1:] == values.columns.tolist()
+
+
+def test_nearest_batch_cached(pgd, mocker):
+    """Query many grains at once, the tree is cached per selection."""
+    ratios = [("29Si", "28Si"), ("30Si", "28Si")]
+    compositions = np.array([[0.0, 0.0], [100.0, 80.0], [-300.0, -400.0]])
+    spy = mocker.spy(pgdtools.sub_tools.data, "_build_tree")
+
+    nearest = pgd.data.nearest(compositions, ratios, k=4)
+    assert nearest.shape == (12, 2)
+    assert nearest.index.names == ["Query", "Rank"]
+    for it, composition in enumerate(compositions):
+        single = pgd.data.nearest(composition, ratios, k=4)
+        assert nearest.loc[it, "PGD ID"].tolist() == single.index.tolist()
+    assert spy.call_count == 1
+
+    pgd.filter.pgd_type("X")
+    nearest_x = pgd.data.nearest(compositions[0], ratios, k=100000)
+    assert spy.call_count == 2
+    assert set(nearest_x.index) == set(pgd.data.ratio_xy(*ratios)[0].index)
+
+
+def test_nearest_value_error(pgd):
+    """Raise a value error for wrong compositions or if no grain has all ratios."""
+    with pytest.raises(ValueError):
+        pgd.data.nearest([1.0, 2.0], [("12C", "13C")])
+    pgd.filter.pgd_type("not a type")
+    with pytest.raises(ValueError):
+        pgd.data.nearest([1.0, 2.0], [("12C", "13C"), ("14N", "15N")])
+
+
 @pytest.mark.parametrize(
     "grain",
     [
@@ -119,3 +173,115 @@ def test_size(pgd):
     assert len(sizes) < len(sizes_all)
 
     assert sizes.isna().sum().sum() == 0
+
+
+def test_ratio_virtual(pgd):
+    """Derive ratios that are not stored and keep them for the next selection."""
+    pgd.filter.db(pgd.DataBase.SiC)
+    data, unc_plus, unc_minus = pgd.data.ratio(("13C", "12C"))
+    ratio, _, ratio_minus = pgd.data.ratio(("12C", "13C"))
+    pd.testing.assert_series_equal(data, 1 / ratio, check_names=False)
+    pd.testing.assert_series_equal(unc_plus, ratio_minus / ratio**2, check_names=False)
+    assert data.name == "13C/12C"
+    assert unc_minus.name == "err-[13C/12C]"
+
+    columns = pgd._virtual_cache[1]["13C/12C"]
+    assert len(columns) == len(pgd._source)
+    pgd.filter.pgd_type("X")
+    data_x, _, _ = pgd.data.ratio(("13C", "12C"))
+    assert pgd._virtual_cache[1]["13C/12C"] is columns
+    pd.testing.assert_series_equal(data_x, data.loc[data_x.index])
+
+    delta, _, _ = pgd.data.ratio(("12C", "13C"), delta=True)
+    assert delta.name == "d(12C/13C)"
+
+
+def test_ratios(pgd):
+    """Get many ratios aligned, consistent with ratio and ratio_xy."""
+    rats = [("30Si", "28Si"), ("29Si", "28Si"), ("12C", "13C")]
+    df = pgd.data.ratios(rats)
+    assert len(df) > 0
+    assert not df.isna().any().any()
+
+    xdat, _, _, yunc, corr = pgd.data.ratio_xy(*rats[:2])
+    xdat, corr = xdat.loc[df.index], corr.loc[df.index]
+    pd.testing.assert_series_equal(df["d(30Si/28Si)"], xdat)
+    pd.testing.assert_frame_equal(df[yunc.columns], yunc.loc[df.index])
+    pd.testing.assert_series_equal(df["rho[30Si-29Si]"], corr)
+
+    ratio, unc_plus, _ = pgd.data.ratio(rats[2])
+    pd.testing.assert_series_equal(df["12C/13C"], ratio.loc[df.index])
+    pd.testing.assert_series_equal(df["err+[12C/13C]"], unc_plus.loc[df.index])
+
+
+def test_ratios_numpy(pgd):
+    """Get many ratios as NumPy arrays with correlation matrices."""
+    rats = [("30Si", "28Si"), ("29Si", "28Si"), ("12C", "13C")]
+    df = pgd.data.ratios(rats)
+    ids, values, _, unc_minus, rho = pgd.data.ratios(rats, as_numpy=True)
+
+    assert ids.tolist() == df.index.tolist()
+    np.testing.assert_array_equal(values[:, 1], df["d(29Si/28Si)"])
+    np.testing.assert_array_equal(unc_minus[:, 2], df["err-[12C/13C]"])
+    assert rho.shape == (len(df), 3, 3)
+    np.testing.assert_array_equal(rho[:, 0, 1], df["rho[30Si-29Si]"])
+    np.testing.assert_array_equal(rho[:, 1, 0], df["rho[30Si-29Si]"])
+    np.testing.assert_array_equal(rho[:, 2, 2], 1)
+    np.testing.assert_array_equal(rho[:, 0, 2], 0)
+
+    assert len(pgd.data.ratios(rats, corr=False, as_numpy=True)) == 4
+    assert "rho[30Si-29Si]" not in pgd.data.ratios(rats, corr=False)
+
+
+def test_arrays_ratio(pgd):
+    """Get a ratio as arrays, consistent with ratio and without a copy."""
+    rat = ("12C", "13C")
+    values, unc_plus, unc_minus, valid = pgd.data.arrays.ratio(rat)
+    ratio, ratio_plus, ratio_minus = pgd.data.ratio(rat, dropnan=False)
+
+    assert values.dtype == np.float64 and values.flags.c_contiguous
+    assert np.shares_memory(values, pgd._source["12C/13C"].to_numpy())
+    assert not values.flags.writeable
+    np.testing.assert_array_equal(values, ratio)
+    np.testing.assert_array_equal(unc_plus, ratio_plus)
+    np.testing.assert_array_equal(unc_minus, ratio_minus)
+    np.testing.assert_array_equal(valid, ratio.notna())
+
+
+def test_arrays_filtered(pgd):
+    """Get arrays of the selected rows only."""
+    pgd.filter.db(pgd.DataBase.Graphite)
+    values = pgd.data.arrays.column("12C/13C")
+    np.testing.assert_array_equal(values, pgd.db["12C/13C"])
+
+    size_a, size_b, valid = pgd.data.arrays.size()
+    sizes = pgd.data.size_all
+    np.testing.assert_array_equal(size_a, sizes["Size a (µm)"])
+    np.testing.assert_array_equal(size_b, sizes["Size b (µm)"])
+    assert valid.sum() == sizes["Size a (µm)"].notna().sum()
+
+
+def test_arrays_ratio_xy(pgd):
+    """Get two ratios as arrays, the valid rows agree with ratio_xy."""
+    rat_x, rat_y = ("30Si", "28Si"), ("29Si", "28Si")
+    arrays = pgd.data.arrays.ratio_xy(rat_x, rat_y)
+    xdat, _, _, yunc, corr = pgd.data.ratio_xy(rat_x, rat_y)
+
+    valid = arrays[-1]
+    np.testing.assert_array_equal(arrays[0][valid], xdat)
+    np.testing.assert_array_equal(arrays[5][valid], yunc.iloc[:, 1])
+    np.testing.assert_array_equal(arrays[6][valid], corr)
+
+
+def test_arrays_table(pgd):
+    """Wrap columns in an Arrow table and hand it off via the interchange protocol."""
+    pytest.importorskip("pyarrow")
+    pgd.filter.db(pgd.DataBase.Graphite)
+    table = pgd.data.arrays.table(["12C/13C", "14N/15N"])
+    assert table.column_names == ["PGD ID", "12C/13C", "14N/15N"]
+    assert table.column("PGD ID").to_pylist() == pgd.db.index.tolist()
+    np.testing.assert_array_equal(table.column("14N/15N").to_numpy(), pgd.db["14N/15N"])
+
+    df = pd.api.interchange.from_dataframe(pgd.data.arrays)
+    assert len(df) == len(pgd.db)
+    assert "12C/13C" in df.columns
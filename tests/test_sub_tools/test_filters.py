@@ -1,5 +1,8 @@
 """Test the filters sub tool."""
 
+import operator
+
+import numpy as np
 import pandas as pd
 import pytest
 
@@ -20,6 +23,18 @@ def test_init_type_error():
 # METHODS #
 
 
+@pytest.mark.parametrize("exclude", [False, True])
+def test_author_code(pgd, exclude):
+    """Filter the data based on the author code in the PGD ID."""
+    codes = ["AMA", "NGU"]
+    pgd.filter.author_code(codes, exclude=exclude)
+
+    authors = set(pgd.db.index.str.split("-").str[2])
+    assert len(pgd) > 0
+    assert (authors <= set(codes)) != exclude
+    assert authors.isdisjoint(codes) == exclude
+
+
 @pytest.mark.parametrize(
     "dbs",
     [
@@ -43,6 +58,15 @@ def test_db(pgd, dbs, exclude):
             any(pgd.db.index.to_series().apply(lambda x: x.startswith(db.value)))
 
 
+def test_db_materialized(pgd):
+    """Filter the database on a materialized selection and reordered grains."""
+    ids = [pgd.db.index[-1], pgd.db.index[0], pgd.db.index[-2]]
+    pgd.filter.pgd_id(ids)
+    _ = pgd.db
+    pgd.filter.db(pgd.DataBase.Graphite)
+    assert pgd.db.index.tolist() == [ids[0], ids[2]]
+
+
 def test_db_type_error(pgd):
     """Raise a type error if the database is not of type PresolarGrains.DataBase."""
     with pytest.raises(TypeError):
@@ -124,6 +148,49 @@ def test_ratio(pgd_head):
     pd.testing.assert_frame_equal(arr1, arr2)
 
 
+@pytest.mark.parametrize(
+    "cmp, op",
+    [
+        ("<", operator.lt),
+        ("<=", operator.le),
+        (">", operator.gt),
+        (">=", operator.ge),
+        ("==", operator.eq),
+        ("!=", operator.ne),
+    ],
+)
+@pytest.mark.parametrize("exclude", [True, False])
+def test_ratio_comparators(pgd, cmp, op, exclude):
+    """Filter with all comparators, rows with NaN values are always dropped."""
+    value = 89.0
+    col = pgd.db["12C/13C"].dropna()
+    expected = col.index[op(col, value) != exclude]
+
+    pgd.filter.ratio(("12C", "13C"), cmp, value, exclude=exclude)
+
+    assert pgd.db.index.equals(expected)
+
+
+def test_ratio_virtual(pgd):
+    """Filter on derived isotope ratios, also on a materialized selection."""
+    pgd.filter.pgd_type("X")
+    _ = pgd.db
+    pgd.filter.ratio(("13C", "12C"), ">", 0.05)
+    assert len(pgd.db) > 0
+    assert (pgd.db["12C/13C"] < 20).all()
+
+    data, _, _ = pgd.data.ratio(("29Si", "28Si"), delta=False)
+    pgd.filter.ratio(("29Si", "28Si"), "<", data.median(), delta=False)
+    assert pgd.db.index.equals(data.index[data < data.median()])
+
+    with pgd.filter.lazy():
+        pgd.filter.uncertainty(("29Si", "30Si"), "<", 50)
+        pgd.filter.significance(("29Si", "30Si"), 1)
+    unc = pgd.data.ratio(("29Si", "30Si"))[1]
+    assert len(unc) == len(pgd.db)
+    assert (unc < 50).all()
+
+
 @pytest.mark.parametrize("rat", [(2, 3, 4), ("C12", "C13", "c14"), "string", "st"])
 def test_ratio_invalid_rat(pgd_head, rat):
     """Raise a value error if an invalid isotope ratio was presented."""
@@ -143,6 +210,60 @@ def test_ratio_isos_na(pgd_head):
         pgd_head.filter.ratio(("C532", "C789"), "<", 1.0)
 
 
+def test_lazy(pgd):
+    """Apply lazy filters at once when accessing the data, same result as eager."""
+    ratio = ("12C", "13C")
+
+    def apply_filters():
+        pgd.filter.db(PresolarGrains.DataBase.SiC)
+        pgd.filter.pgd_type(["X", "M"])
+        pgd.filter.ratio(ratio, "<", 50)
+        pgd.filter.uncertainty(ratio, "<", 1.0, exclude=True)
+        pgd.filter.pgd_id("SiC-1996-HOP-200183", exclude=True)
+
+    apply_filters()
+    expected = pgd.db.copy()
+
+    pgd.reset()
+    with pgd.filter.lazy():
+        apply_filters()
+        assert len(pgd._pending) == 5
+        assert pgd._rows is None  # nothing applied yet
+    assert len(pgd._pending) == 5
+
+    pd.testing.assert_frame_equal(pgd.db, expected)
+    assert len(pgd._pending) == 0
+
+
+def test_lazy_materialize_inside(pgd):
+    """Accessing the data inside the lazy context applies the pending filters."""
+    with pgd.filter.lazy():
+        pgd.filter.pgd_type("X")
+        assert pgd.info.pgd_types == {"X"}
+        pgd.filter.pgd_type("X", exclude=True)
+        assert len(pgd._pending) == 1
+    assert len(pgd) == 0
+
+
+def test_lazy_pgd_id(pgd):
+    """Selecting PGD IDs is applied immediately and keeps the order of the IDs."""
+    ids = ["SiC-2005-NIT-000926", "SiC-2005-NIT-000924"]
+    with pgd.filter.lazy():
+        pgd.filter.db(PresolarGrains.DataBase.SiC)
+        pgd.filter.pgd_id(ids)
+        assert len(pgd._pending) == 0
+    assert pgd.db.index.tolist() == ids
+
+
+def test_lazy_reset(pgd):
+    """Reset discards pending filters."""
+    length = len(pgd)
+    with pgd.filter.lazy():
+        pgd.filter.pgd_type("X")
+        pgd.reset()
+    assert len(pgd) == length
+
+
 def test_reference(pgd_head):
     """Filter the data based on references."""
     ref = "Amari (1992) unpublished"  # in head data
@@ -164,6 +285,36 @@ def test_reset(pgd_head):
     assert len(pgd_head) > initial_length
 
 
+@pytest.mark.parametrize("exclude", [False, True])
+def test_technique(pgd, exclude):
+    """Filter grains measured with a technique, also if multiple are listed."""
+    tech = "CIW 6f"
+    selected = pgd.db["Technique"].str.contains(tech, regex=False) != exclude
+    pgd.filter.pgd_type("M")  # filter the materialized selection
+    _ = pgd.db
+    pgd.filter.technique(tech, exclude=exclude)
+
+    expected = selected[selected].index.intersection(pgd.db.index)
+    assert len(pgd) > 0
+    assert pgd.db.index.equals(expected)
+    assert ("CIW NanoSIMS & CIW 6f" in pgd.db["Technique"].values) != exclude
+
+
+def test_technique_lazy(pgd):
+    """Filter for techniques in lazy mode, masks are evaluated on the database."""
+    techs = ["ANL RIMS", "CHILI"]
+    with pgd.filter.lazy():
+        pgd.filter.technique(techs)
+    assert pgd._pending
+    assert len(pgd) > 0
+    assert all(
+        any(tech in techs for tech in keys)
+        for keys in pgd.technique.table_full.groupby(level=0)["PGD Technique"]
+        .agg(list)
+        .values
+    )
+
+
 def test_uncertainty_carbon(pgd):
     """Filter on carbon uncertainty of a ratio measurement symmetric and asymmetric."""
     isos = ("C12", "C13")
@@ -221,6 +372,44 @@ def test_uncertainty_silicon(pgd):
     assert pgd_id_gra in pgd.db.index
 
 
+@pytest.mark.parametrize(
+    "cmp, op",
+    [
+        ("<", operator.lt),
+        ("<=", operator.le),
+        (">", operator.gt),
+        (">=", operator.ge),
+        ("==", operator.eq),
+        ("!=", operator.ne),
+    ],
+)
+def test_uncertainty_comparators(cmp, op):
+    """Filter uncertainties with all comparators on symmetric and asymmetric values.
+
+    Comparisons with NaN are only true for "!=", as in NumPy.
+    """
+    nan = np.nan
+    frame = pd.DataFrame(
+        {
+            "12C/13C": [90.0, 40.0, 15.0, 60.0, nan],
+            "err[12C/13C]": [1.0, nan, 3.0, nan, nan],
+            "err+[12C/13C]": [nan, 2.0, nan, 1.0, nan],
+            "err-[12C/13C]": [nan, 1.0, nan, 3.0, nan],
+        },
+        index=pd.Index([f"SiC-2000-TST-00000{it}" for it in range(5)], name="PGD ID"),
+    )
+    pgd = PresolarGrains(frame)
+    errors = frame.iloc[:4, 1:]
+    matches = op(errors, 2.0).sum(axis=1)
+
+    pgd.filter.uncertainty(("12C", "13C"), cmp, 2.0)
+    assert pgd.db.index.equals(errors.index[matches == errors.notna().sum(axis=1)])
+
+    pgd.reset()
+    pgd.filter.uncertainty(("12C", "13C"), cmp, 2.0, exclude=True)
+    assert pgd.db.index.equals(errors.index[matches == 0])
+
+
 @pytest.mark.parametrize("unc", [(2, 3, 4), "string", "st"])
 def test_uncertainty_invalid_rat(pgd_head, unc):
     """Raise a value error if an invalid isotope ratio was presented."""
@@ -258,3 +447,112 @@ def test_check_comparator_invalid():
     """Check if an invalid comparator raises a ValueError."""
     with pytest.raises(ValueError):
         flt._check_comparator("INV")
+
+
+@pytest.mark.parametrize(
+    "years", [[(1995, 2010), False], [(2012, None), False], [(1995, 2010), True]]
+)
+def test_year(pgd, years):
+    """Filter the data based on the publication year in the PGD ID."""
+    (first, last), exclude = years
+    pgd.filter.year(first, last, exclude=exclude)
+
+    selected = pgd.db.index.str.split("-").str[1].astype(int)
+    last = first if last is None else last
+    assert len(pgd) > 0
+    assert ((selected >= first) & (selected <= last)).all() != exclude
+
+
+@pytest.mark.parametrize("exclude", [False, True])
+def test_relative_uncertainty(pgd, exclude):
+    """Filter on the relative uncertainty, for deltas relative to the ratio."""
+    pgd.filter.relative_uncertainty(("12C", "13C"), "<", 0.01, exclude=exclude)
+    ratio, unc_plus, unc_minus = pgd.data.ratio(("12C", "13C"), dropnan=False)
+    assert len(pgd) > 0
+    assert (((unc_plus / ratio < 0.01) & (unc_minus / ratio < 0.01)) != exclude).all()
+
+    pgd.reset()
+    pgd.filter.relative_uncertainty(("29Si", "28Si"), "<=", 0.005)
+    delta, unc_plus, _ = pgd.data.ratio(("29Si", "28Si"), dropnan=False)
+    assert len(pgd) > 0
+    assert (unc_plus / (delta + 1000) <= 0.005).all()
+
+
+@pytest.mark.parametrize("exclude", [False, True])
+def test_significance(pgd, exclude):
+    """Select grains that differ from solar, using the uncertainty facing solar."""
+    pgd.filter.significance(("29Si", "28Si"), 3, exclude=exclude)
+    delta, unc_plus, unc_minus = pgd.data.ratio(("29Si", "28Si"), dropnan=False)
+    significant = (delta > 3 * unc_minus) | (-delta > 3 * unc_plus)
+    assert len(pgd) > 0
+    assert (significant != exclude).all()
+
+
+def test_significance_asymmetric(pgd):
+    """Use the negative uncertainty above and the positive one below the reference."""
+    frame = pd.DataFrame(
+        {
+            "12C/13C": [100.0, 100.0, 60.0, 60.0],
+            "err+[12C/13C]": [1.0, 1.0, 1.0, 10.0],
+            "err-[12C/13C]": [5.0, 1.0, 1.0, 1.0],
+        },
+        index=pd.Index([f"SiC-2000-TST-00000{it}" for it in range(4)], name="PGD ID"),
+    )
+    pgd_frame = PresolarGrains(frame)
+    pgd_frame.filter.significance(("12C", "13C"), 3, reference=89)
+    assert pgd_frame.db.index.tolist() == frame.index[[1, 2]].tolist()
+
+
+@pytest.mark.parametrize("within", [False, True])
+def test_region2d_line(pgd, within):
+    """Select grains whose error ellipse intersects or lies within a band."""
+    rat_x, rat_y = ("30Si", "28Si"), ("29Si", "28Si")
+    mainstream = (-19, 1.342)
+    xdat, xunc, ydat, yunc, corr = pgd.data.ratio_xy(rat_x, rat_y)
+    pgd.filter.region2d(rat_x, rat_y, mainstream, n_sigma=2, width=50, within=within)
+
+    # symmetric uncertainties only, compare with the definition in classify
+    dist = ydat - mainstream[0] - mainstream[1] * xdat
+    sigma = np.sqrt(
+        yunc.iloc[:, 0] ** 2
+        + mainstream[1] ** 2 * xunc.iloc[:, 0] ** 2
+        - 2 * mainstream[1] * xunc.iloc[:, 0] * yunc.iloc[:, 0] * corr
+    )
+    if within:
+        expected = dist.abs() + 2 * sigma <= 50
+    else:
+        expected = dist.abs() - 2 * sigma <= 50
+    assert len(pgd) > 0
+    assert pgd.db.index.equals(expected[expected].index)
+
+
+def test_region2d_polygon():
+    """Use the Mahalanobis distance and the side of the uncertainty facing the shape."""
+    square = [(0, 0), (1, 0), (1, 1), (0, 1)]
+    frame = pd.DataFrame(
+        {
+            "d(29Si/28Si)": [0.5, 1.2, 1.2, 2.0, 0.5],
+            "err+[d(29Si/28Si)]": [0.1, 0.05, 0.1, 0.1, 0.3],
+            "err-[d(29Si/28Si)]": [0.1, 0.15, 0.05, 0.1, 0.3],
+            "d(30Si/28Si)": [0.5, 0.5, 0.5, 2.0, 0.5],
+            "err[d(30Si/28Si)]": [0.1, 0.1, 0.1, 0.1, 0.1],
+            "rho[29Si-30Si]": [0.0, 0.0, 0.0, 0.0, np.nan],
+        },
+        index=pd.Index([f"SiC-2000-TST-00000{it}" for it in range(5)], name="PGD ID"),
+    )
+    pgd_frame = PresolarGrains(frame)
+    rat_x, rat_y = ("30Si", "28Si"), ("29Si", "28Si")
+
+    pgd_frame.filter.region2d(rat_x, rat_y, square, n_sigma=2)
+    assert pgd_frame.db.index.tolist() == frame.index[[0, 1, 4]].tolist()
+
+    pgd_frame.reset()
+    pgd_frame.filter.region2d(rat_x, rat_y, square, n_sigma=2, within=True)
+    assert pgd_frame.db.index.tolist() == frame.index[[0]].tolist()
+
+
+@pytest.mark.parametrize("shape", [(1, 2, 3), [(0, 0), (1, 1)], "square"])
+def test_region2d_invalid_shape(pgd, shape):
+    """Raise a value error if the shape is neither a line nor a polygon."""
+    with pytest.raises(ValueError):
+        pgd.filter.region2d(("30Si", "28Si"), ("29Si", "28Si"), shape)
@@ -29,6 +29,24 @@ def test_ratio_not_found(pgd):
         pgd._header("C532", "C789").ratio
 
 
+@pytest.mark.parametrize(
+    "isos",
+    [
+        [("13C", "12C", None), ("13C/12C", False)],
+        [("29Si", "30Si", None), ("d(29Si/30Si)", True)],
+        [("12C", "13C", True), ("d(12C/13C)", True)],
+        [("29Si", "28Si", False), ("29Si/28Si", False)],
+    ],
+)
+def test_ratio_virtual(pgd, isos):
+    """Derive isotope ratios that are not stored and register their columns."""
+    header = pgd._header(*isos[0])
+    assert header.ratio == isos[1]
+    name = isos[1][0]
+    assert header.uncertainty == [None, f"err+[{name}]", f"err-[{name}]"]
+    assert pgd._schema.virtual[f"err-[{name}]"].header == name
+
+
 @pytest.mark.parametrize(
     "isos",
     [
@@ -59,3 +77,35 @@ def test_rho(pgd, isos):
     hdr_exp = isos[1]
 
     assert pgd._header(iso1, iso2).correlation == hdr_exp
+
+
+def test_rho_either_order(pgd):
+    """Find the correlation of two isotopes independent of their order."""
+    assert pgd._header("Si29", "Si30").correlation == "rho[30Si-29Si]"
+
+
+def test_rho_virtual(pgd):
+    """Derived isotope ratios have no correlation coefficients."""
+    assert pgd._correlation(("29Si", "28Si"), ("30Si", "28Si")) == "rho[30Si-29Si]"
+    assert pgd._correlation(("29Si", "30Si"), ("30Si", "28Si")) is None
+
+
+def test_schema_cached(pgd):
+    """Parse the header only once and rebuild it when the columns change."""
+    schema = pgd._schema
+    pgd.filter.pgd_type("X")
+    assert pgd._schema is schema
+
+    pgd.classify()
+    assert pgd._schema is not schema
+
+
+def test_schema_no_substring_match():
+    """Only match complete headers, not isotope ratios within other headers."""
+    schema = pgdtools.sub_tools.headers.HeaderSchema(
+        ["PGD ID", "Note 12C/13C", "err[d(12C/13C)]", "rho[12C-13C] (old)"]
+    )
+    assert schema.ratios == {}
+    assert schema.uncertainties == {("12C", "13C"): ["err[d(12C/13C)]", None, None]}
+    assert schema.correlations == {}
+    assert schema.ratios_with("C") == []
@@ -22,6 +22,14 @@ def test_dbs(pgd):
         assert en in dbs
 
 
+def test_dbs_filtered(pgd):
+    """Only return the databases that are in the current selection."""
+    pgd.filter.db(pgd.DataBase.Graphite)
+    assert pgd.info.dbs == (pgd.DataBase.Graphite,)
+    pgd.filter.pgd_type("not a type")
+    assert pgd.info.dbs == ()
+
+
 def test_number_of_grains(pgd_head):
     """Get number of grains in current database."""
     assert pgd_head.info.number_of_grains == 100
@@ -62,6 +70,17 @@ def test_ratio(pgd_head):
     assert pgd_head.info.ratios("29Si") == [("d(29Si/28Si)", True)]
 
 
+def test_ratio_element_exact(pgd):
+    """Match elements exactly, e.g., carbon does not match calcium."""
+    assert any("Ca" in hdr for hdr in pgd.db.columns)
+
+    ratios = [hdr for hdr, _ in pgd.info.ratios("C")]
+    assert "12C/13C" in ratios
+    assert not any("Ca" in hdr for hdr in ratios)
+    correlations = pgd.info.correlations("C") or []
+    assert not any("Ca" in hdr for hdr in correlations)
+
+
 def test_ratio_none(pgd_head):
     """Return None if ratios were not found."""
     assert pgd_head.info.ratios("275C") is None
@@ -0,0 +1,170 @@
+"""Test the query expression language."""
+
+import numpy as np
+import pytest
+
+from pgdtools.sub_tools import query, virtual
+
+
+def test_query_type_error():
+    """Raise type error if parent is not of type PresolarGrains."""
+    with pytest.raises(TypeError):
+        _ = query.Query("test", "12C/13C > 1")
+
+
+@pytest.mark.parametrize("use_numexpr", [False, True])
+def test_query_chained_filters(pgd, mocker, use_numexpr):
+    """Select the same grains as the chained filters, with and without numexpr."""
+    if use_numexpr:
+        pytest.importorskip("numexpr")
+    else:
+        mocker.patch("pgdtools.sub_tools.query.numexpr_available", return_value=False)
+    rat = ("29Si", "28Si")
+
+    resolved = pgd.filter.query(
+        "`PGD Type` == 'X' and d(29Si/28Si) between -500 and 0 and err(Si29/Si28) < 50"
+    )
+    ids = pgd.db.index
+    pgd.reset()
+    pgd.filter.pgd_type("X")
+    pgd.filter.ratio(rat, ">=", -500)
+    pgd.filter.ratio(rat, "<=", 0)
+    pgd.filter.uncertainty(rat, "<", 50)
+
+    assert len(ids) > 0
+    assert ids.equals(pgd.db.index)
+    assert resolved == {
+        "`PGD Type`": "PGD Type",
+        "d(29Si/28Si)": "d(29Si/28Si)",
+        "err(Si29/Si28)": ["err[d(29Si/28Si)]"],
+    }
+
+
+@pytest.mark.parametrize("use_numexpr", [False, True])
+def test_query_combinators(pgd, mocker, use_numexpr):
+    """Combine comparisons with boolean operators, parentheses, and functions."""
+    if use_numexpr:
+        pytest.importorskip("numexpr")
+    else:
+        mocker.patch("pgdtools.sub_tools.query.numexpr_available", return_value=False)
+    expr = (
+        "12C/13C > 100 & (err+(C12/C13) < 1 or isnull(14N/15N)) and not 12C/13C >= 1e4"
+    )
+    resolved = pgd.filter.query(expr)
+
+    db = pgd.db
+    assert len(db) > 0
+    assert ((db["12C/13C"] > 100) & (db["12C/13C"] < 1e4)).all()
+    err_plus = db["err+[12C/13C]"].fillna(db["err[12C/13C]"])
+    assert ((err_plus < 1) | db["14N/15N"].isna()).all()
+    assert resolved["err+(C12/C13)"] == ["err[12C/13C]", "err+[12C/13C]"]
+
+
+def test_query_bare_columns(pgd):
+    """Resolve column names without backticks to the longest matching column."""
+    resolved = pgd.filter.query("d(29Si/28Si) < 100 & PGD Type == 'M'")
+    ids = pgd.db.index
+    pgd.reset()
+    pgd.filter.query("d(29Si/28Si) < 100 & `PGD Type` == 'M'")
+
+    assert len(ids) > 0
+    assert ids.equals(pgd.db.index)
+    assert resolved["PGD Type"] == "PGD Type"
+
+
+@pytest.mark.parametrize("use_numexpr", [False, True])
+def test_query_not_equal_nan(pgd, mocker, use_numexpr):
+    """Drop grains without a value in `!=` comparisons, as the ratio filter does."""
+    if use_numexpr:
+        pytest.importorskip("numexpr")
+    else:
+        mocker.patch("pgdtools.sub_tools.query.numexpr_available", return_value=False)
+    assert pgd.db["d(29Si/28Si)"].isna().any()
+
+    pgd.filter.query("d(29Si/28Si) != 100")
+    ids = pgd.db.index
+    pgd.reset()
+    pgd.filter.ratio(("29Si", "28Si"), "!=", 100)
+
+    assert ids.equals(pgd.db.index)
+    assert pgd.db["d(29Si/28Si)"].notna().all()
+
+
+def test_query_object_nan(pgd):
+    """Compare columns with empty strings only where values are available."""
+    pgd.filter.query("`PGD Subtype` > 'A'")
+    assert len(pgd.db) > 0
+    assert (pgd.db["PGD Subtype"] > "A").all()
+
+
+def test_query_virtual(pgd):
+    """Resolve delta values of stored ratios and derived ratios in a query."""
+    resolved = pgd.filter.query("d(12C/13C) > 0 and err(13C/12C) < 1")
+    assert resolved == {
+        "d(12C/13C)": "d(12C/13C)",
+        "err(13C/12C)": ["err+[13C/12C]", "err-[13C/12C]"],
+    }
+    assert len(pgd.db) > 0
+    assert (pgd.db["12C/13C"] > virtual._solar_ratio("12C", "13C")).all()
+
+
+def test_query_lazy(pgd):
+    """Resolve the terms right away, but compute the mask lazily."""
+    with pgd.filter.lazy():
+        pgd.filter.query("notnull(`PGD Subtype`)")
+        assert pgd._pending
+    assert pgd.db["PGD Subtype"].notna().all()
+
+
+@pytest.mark.parametrize(
+    "expr",
+    [
+        "12C/13C >",
+        "12C/13C > 5 and",
+        "(12C/13C > 5",
+        "12C/13C 5",
+        "foo > 3",
+        "PGD Types == 'M'",
+        "12C/13C ** 3",
+        "`not a column` == 1",
+        "300Si/28Si > 1",
+        "-`PGD Type` == 1",
+        "`PGD Type` > 1",
+        "__import__('os')",
+    ],
+)
+def test_query_invalid(pgd, expr):
+    """Raise a value error for invalid expressions and unknown terms."""
+    with pytest.raises(ValueError):
+        pgd.filter.query(expr)
+
+
+def test_tokenize():
+    """Split expressions into tokens and replace keywords with operators."""
+    tokens = query._tokenize(
+        "d(29Si/28Si) between -1.5e2 AND 3 or err-[12C/13C]!=2 and PGD Type=='M'",
+        ["PGD", "PGD Type", "PGD Types"],
+    )
+    assert tokens == [
+        ("ratio", "d(29Si/28Si)"),
+        ("op", "between"),
+        ("op", "-"),
+        ("number", "1.5e2"),
+        ("op", "&"),
+        ("number", "3"),
+        ("op", "|"),
+        ("err", "err-[12C/13C]"),
+        ("op", "!="),
+        ("number", "2"),
+        ("op", "&"),
+        ("column", "PGD Type"),
+        ("op", "=="),
+        ("string", "'M'"),
+    ]
+
+
+def test_mask_constant(pgd):
+    """Broadcast expressions without columns to all grains."""
+    mask = query.Query(pgd, "-3 < 2").mask(pgd.db)
+    assert mask.shape == (len(pgd),)
+    assert np.all(mask)
@@ -1,5 +1,6 @@
 """Test the references sub tool."""
 
+import pandas as pd
 import pytest
 
 from pgdtools.sub_tools import References
@@ -100,3 +101,45 @@ def test_table_set(pgd_head):
     result = pgd_head.reference.table_set
     assert result.shape[0] < 100
     assert result.shape[1] == 5
+
+
+def test_reference_keys(pgd):
+    """Derive the reference keys once and select them for the current selection."""
+    keys = pgd._reference_keys
+    assert isinstance(keys.dtype, pd.CategoricalDtype)
+    assert keys.index.equals(pgd.db.index)
+
+    pgd.filter.db(pgd.DataBase.Graphite)
+    keys_gra = pgd._reference_keys
+    assert keys_gra.index.equals(pgd.db.index)
+    assert pgd._ref_keys_cache[1] is keys
+    assert all(key.startswith("Gra-") for key in keys_gra)
+
+
+@pytest.mark.parametrize(
+    "ids",
+    [
+        [
+            ["SiC-2005-NIT-000926", "Gra-2023-NGU-100010"],
+            ["SiC-2005-NIT-0", "Gra-2023-NGU-1"],
+        ],
+        [["SiC-2005-NIT"], ["SiC-2005-N"]],
+    ],
+)
+def test_create_ref_keys(ids):
+    """Create the reference keys from PGD IDs."""
+    pgd_ids, keys_exp = ids
+    assert References._create_ref_keys(pgd_ids) == keys_exp
+
+
+def test_table_full_entries(pgd):
+    """Every row of the reference table is the entry of the grain's reference."""
+    pgd.filter.db(pgd.DataBase.Graphite)
+    pgd.filter.pgd_id(pgd.db.index[[5, 3, 100]].tolist())
+    ref = pgd.reference
+    table = ref.table_full
+
+    assert table.index.equals(pgd.db.index)
+    for pgd_id, key in zip(table.index, ref._create_ref_keys_list):
+        assert table.loc[pgd_id].to_dict() == dict(ref._reference_json[key])
+    assert list(ref.table_set.index) == list(dict.fromkeys(ref._create_ref_keys_list))
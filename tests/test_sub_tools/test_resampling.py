@@ -0,0 +1,108 @@
+"""Test the Monte Carlo resampling of grains."""
+
+import numpy as np
+import pytest
+
+from pgdtools.sub_tools.resampling import Frequencies, Mean, Quantiles, Reducer, Samples
+
+
+@pytest.fixture
+def samples():
+    """Samples of two grains with asymmetric and correlated uncertainties."""
+    values = np.array([[10.0, -5.0], [100.0, 50.0]])
+    unc_plus = np.array([[1.0, 2.0], [10.0, 5.0]])
+    unc_minus = np.array([[2.0, 2.0], [5.0, 5.0]])
+    rho = np.array([[[1.0, 0.8], [0.8, 1.0]], [[1.0, -0.5], [-0.5, 1.0]]])
+    return Samples(
+        np.array(["a", "b"]),
+        ["x", "y"],
+        values,
+        unc_plus,
+        unc_minus,
+        rho,
+        n_draws=20000,
+        seed=42,
+        chunk_size=1,
+    )
+
+
+def test_samples_chunks(samples):
+    """Generate reproducible chunks of grains."""
+    chunks = list(samples)
+    assert [ids.tolist() for ids, _ in chunks] == [["a"], ["b"]]
+    assert chunks[0][1].shape == (1, 20000, 2)
+    np.testing.assert_array_equal(next(iter(samples))[1], chunks[0][1])
+
+
+def test_samples_distribution(samples):
+    """Draw split-normal, correlated samples."""
+    quantiles = samples.reduce(Quantiles([0.158655, 0.5, 0.841345]))
+    expected = [[8, 10, 11, -7, -5, -3], [95, 100, 110, 45, 50, 55]]
+    np.testing.assert_allclose(quantiles.to_numpy(), expected, rtol=0.02, atol=0.1)
+    assert quantiles.columns.get_level_values(0).tolist() == ["x"] * 3 + ["y"] * 3
+
+    _, draws = next(iter(samples))
+    deviation = draws[0] - [10, -5]
+    normal = deviation / np.where(deviation > 0, [1, 2], [2, 2])
+    assert np.corrcoef(normal.T)[0, 1] == pytest.approx(0.8, abs=0.02)
+
+
+def test_samples_reduce(samples):
+    """Reduce with several reducers at once, results are indexed by PGD ID."""
+    means, frequencies = samples.reduce(
+        Mean(), Frequencies(lambda x: np.where(x[:, 0] > 10, "high", "low"))
+    )
+    assert means.index.tolist() == ["a", "b"]
+    assert means.index.name == "PGD ID"
+    # half of the samples are on either side, the mean shifts to the larger side
+    assert means.loc["a", "x"] == pytest.approx(10 - 1 / np.sqrt(2 * np.pi), abs=0.05)
+    assert frequencies.columns.tolist() == ["high", "low"]
+    assert frequencies.loc["a", "high"] == pytest.approx(0.5, abs=0.02)
+    assert frequencies.loc["b", "high"] == 1
+
+    means_again = samples.reduce(Mean())
+    assert means_again.equals(means)
+
+
+@pytest.mark.parametrize("kwargs", [{"n_draws": 0}, {"n_draws": 10, "chunk_size": 0}])
+def test_samples_invalid(kwargs):
+    """Raise a value error for invalid numbers of draws or chunk sizes."""
+    with pytest.raises(ValueError):
+        Samples(
+            np.array([]), ["x"], *[np.empty((0, 1))] * 3, np.empty((0, 1, 1)), **kwargs
+        )
+
+
+def test_resample(pgd):
+    """Resample the grains of the selection that have all ratios."""
+    rats = [("29Si", "28Si"), ("30Si", "28Si")]
+    pgd.filter.pgd_type("X")
+    samples = pgd.data.resample(rats, n_draws=100, seed=1, chunk_size=50)
+    ratios = pgd.data.ratios(rats)
+
+    assert samples.ids.tolist() == ratios.index.tolist()
+    assert samples.headers == ["d(29Si/28Si)", "d(30Si/28Si)"]
+    medians = samples.reduce(Quantiles([0.5]))
+    np.testing.assert_allclose(
+        medians[("d(29Si/28Si)", 0.5)],
+        ratios["d(29Si/28Si)"],
+        atol=0.5 * ratios["err+[d(29Si/28Si)]"].max(),
+    )
+
+    pgd.filter.pgd_type("not a type")
+    with pytest.raises(ValueError):
+        pgd.data.resample(rats)
+
+
+def test_reducer_abstract():
+    """Raise a type error when creating a reducer without all methods."""
+
+    class Incomplete(Reducer):
+        """Reducer without a result."""
+
+        def _reduce(self, samples):
+            """Average the samples."""
+            return samples.mean(axis=1)
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -1,8 +1,10 @@
 """Test the techniques sub tool."""
 
+import pandas as pd
 import pytest
 
 from pgdtools.sub_tools import Techniques
+from pgdtools.sub_tools.techniques import technique_keys
 
 
 # DUNDER METHODS #
@@ -76,3 +78,26 @@ def test_table_set(pgd_head):
     result = pgd_head.technique.table_set
     assert result.shape[0] < 100
     assert result.shape[1] == 5
+
+
+def test_table_full_selection(pgd):
+    """Select the entries of grains with multiple techniques in the given order."""
+    multiple = pgd.db.index[pgd.db["Technique"].str.contains("&")]
+    ids = [multiple[3], pgd.db.index[0], multiple[0]]
+    pgd.filter.pgd_id(ids)
+    table = pgd.technique.table_full
+
+    assert table.index.unique().tolist() == ids
+    for pgd_id, techniques in zip(ids, pgd.db["Technique"]):
+        assert " & ".join(table.loc[[pgd_id], "PGD Technique"]) == techniques
+    assert table.columns[0] == "PGD Technique"
+
+
+def test_technique_keys():
+    """Split multiple techniques per grain into the long format."""
+    keys = technique_keys(
+        pd.Series(["A & B", "C", "D and/or A"], index=["x", "y", "z"])
+    )
+    assert keys.tolist() == ["A", "B", "C", "D", "A"]
+    assert keys.index.tolist() == [0, 0, 1, 2, 2]
+    assert isinstance(keys.dtype, pd.CategoricalDtype)
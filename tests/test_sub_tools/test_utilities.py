@@ -1,5 +1,7 @@
 """Test the utilities sub tool."""
 
+import numpy as np
+import pandas as pd
 import pytest
 
 from pgdtools.sub_tools import utilities as utl
@@ -48,3 +50,53 @@ def test_iso_element_allowed():
 
     with pytest.raises(ValueError):  # still fails for only atomic number
         _ = utl.Isotope("12", allow_element=True)
+
+
+# DENSE #
+
+
+def test_dense():
+    """Convert sparse columns to dense columns and leave others untouched."""
+    sparse = pd.arrays.SparseArray([1.0, np.nan, np.nan])
+    df = pd.DataFrame({"a": sparse, "b": ["x", "y", "z"]})
+
+    ret = utl.dense(df)
+    assert ret["a"].dtype == np.float64
+    assert ret["b"].equals(df["b"])
+    assert utl.dense(df["a"]).dtype == np.float64
+    assert utl.dense(ret) is ret
+
+
+# ID PARTS #
+
+
+def test_id_parts():
+    """Parse the components of the PGD IDs into typed columns."""
+    ids = pd.Index(["SiC-1992-AMA-000001", "Gra-2023-NGU-100010", "SiC"])
+    parts = utl.id_parts(ids)
+
+    assert parts.index.equals(ids)
+    assert parts["Database"].tolist() == ["SiC", "Gra", "SiC"]
+    assert parts["Year"].tolist() == [1992, 2023, pd.NA]
+    assert parts["Author"].tolist()[:2] == ["AMA", "NGU"]
+    assert parts["Number"].tolist() == [1, 100010, pd.NA]
+    assert isinstance(parts["Database"].dtype, pd.CategoricalDtype)
+    assert isinstance(parts["Author"].dtype, pd.CategoricalDtype)
+    assert parts["Year"].dtype == "Int16"
+
+
+# UNCERTAINTY ARRAYS #
+
+
+def test_uncertainty_arrays():
+    """Fill missing asymmetric uncertainties with the symmetric uncertainty."""
+    df = pd.DataFrame(
+        {"err": [1.0, 2.0, np.nan], "err+": [np.nan, 3.0, 4.0], "err-": [5.0] * 3}
+    )
+    unc_plus, unc_minus = utl.uncertainty_arrays(df, ["err", "err+", "err-"])
+    np.testing.assert_array_equal(unc_plus, [1.0, 3.0, 4.0])
+    np.testing.assert_array_equal(unc_minus, [5.0, 5.0, 5.0])
+
+    unc_plus, unc_minus = utl.uncertainty_arrays(df, ["err", None, None])
+    np.testing.assert_array_equal(unc_plus, df["err"])
+    np.testing.assert_array_equal(unc_minus, df["err"])
@@ -0,0 +1,106 @@
+"""Test the isotope ratios that are derived from the stored ones."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pgdtools.sub_tools import virtual
+from pgdtools.sub_tools.headers import HeaderSchema
+
+
+@pytest.fixture
+def frame():
+    """Database with delta values, isotope ratios, and a correlation."""
+    return pd.DataFrame(
+        {
+            "d(29Si/28Si)": [100.0, -200.0, np.nan],
+            "err[d(29Si/28Si)]": [10.0, 20.0, 5.0],
+            "d(30Si/28Si)": [50.0, -100.0, 10.0],
+            "err[d(30Si/28Si)]": [5.0, 10.0, 5.0],
+            "rho[30Si-29Si]": [0.5, np.nan, 0.1],
+            "12C/13C": [50.0, 100.0, 20.0],
+            "err+[12C/13C]": [2.0, 5.0, 1.0],
+            "err-[12C/13C]": [1.0, 4.0, 1.0],
+        },
+        index=["a", "b", "c"],
+    )
+
+
+def test_common_denominator(frame):
+    """Derive a delta value from two delta values with correlated uncertainties."""
+    ratio = virtual.resolve(HeaderSchema(frame.columns), "29Si", "30Si")
+    assert ratio.header == "d(29Si/30Si)"
+    assert ratio.delta
+
+    df = ratio.compute(frame)
+    assert list(df.columns) == [
+        "d(29Si/30Si)",
+        "err+[d(29Si/30Si)]",
+        "err-[d(29Si/30Si)]",
+    ]
+    norm = (1 + frame["d(29Si/28Si)"] / 1000) / (1 + frame["d(30Si/28Si)"] / 1000)
+    np.testing.assert_allclose(df["d(29Si/30Si)"], (norm - 1) * 1000)
+
+    rel29 = frame["err[d(29Si/28Si)]"] / (1000 + frame["d(29Si/28Si)"])
+    rel30 = frame["err[d(30Si/28Si)]"] / (1000 + frame["d(30Si/28Si)"])
+    rho = frame["rho[30Si-29Si]"].fillna(0)
+    unc = norm * 1000 * np.sqrt(rel29**2 + rel30**2 - 2 * rho * rel29 * rel30)
+    np.testing.assert_allclose(df["err+[d(29Si/30Si)]"], unc)
+    np.testing.assert_allclose(df["err-[d(29Si/30Si)]"], unc)
+    assert np.isnan(df.loc["c"]).all()
+
+
+def test_inverse(frame):
+    """Invert an isotope ratio, asymmetric uncertainties swap sides."""
+    ratio = virtual.resolve(HeaderSchema(frame.columns), "13C", "12C")
+    assert ratio.header == "13C/12C"
+    assert not ratio.delta
+
+    df = ratio.compute(frame)
+    np.testing.assert_allclose(df["13C/12C"], 1 / frame["12C/13C"])
+    np.testing.assert_allclose(
+        df["err+[13C/12C]"], frame["err-[12C/13C]"] / frame["12C/13C"] ** 2
+    )
+    np.testing.assert_allclose(
+        df["err-[13C/12C]"], frame["err+[12C/13C]"] / frame["12C/13C"] ** 2
+    )
+
+
+def test_delta_conversion(frame):
+    """Convert isotope ratios to delta values and back with the solar ratio."""
+    schema = HeaderSchema(frame.columns)
+    solar = virtual._solar_ratio("12C", "13C")
+    assert solar == pytest.approx(89, rel=0.01)
+
+    ratio = virtual.resolve(schema, "12C", "13C", delta=True)
+    assert ratio.header == "d(12C/13C)"
+    df = ratio.compute(frame)
+    np.testing.assert_allclose(
+        df["d(12C/13C)"], (frame["12C/13C"] / solar - 1) * 1000, rtol=1e-12
+    )
+    np.testing.assert_allclose(
+        df["err+[d(12C/13C)]"], frame["err+[12C/13C]"] / solar * 1000, rtol=1e-12
+    )
+
+    ratio = virtual.resolve(schema, "29Si", "28Si", delta=False)
+    df = ratio.compute(frame)
+    solar = virtual._solar_ratio("29Si", "28Si")
+    np.testing.assert_allclose(
+        df["29Si/28Si"], (frame["d(29Si/28Si)"] / 1000 + 1) * solar, rtol=1e-12
+    )
+
+
+@pytest.mark.parametrize(
+    "ratio",
+    [("12C", "29Si", None), ("12C", "13C", False), ("26Al", "27Al", True)],
+)
+def test_not_derivable(ratio):
+    """Return None if a ratio cannot be derived."""
+    schema = HeaderSchema(["12C/13C", "err[12C/13C]", "26Al/27Al", "err[26Al/27Al]"])
+    assert virtual.resolve(schema, *ratio) is None
+
+
+def test_solar_ratio_not_available():
+    """Raise a value error if no solar ratio is available."""
+    with pytest.raises(ValueError):
+        virtual._solar_ratio("26Al", "27Al")